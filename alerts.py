@@ -0,0 +1,265 @@
+"""
+Alertas avaliados a cada atualização dos dados, só sobre as células que mudaram desde a coleta anterior.
+
+As regras ficam em alertas.csv (DASHBOARD_ALERTS_FILE):
+    above / below     o valor passa a ficar acima / abaixo do limite
+    drop / rise       a variação % em relação ao ano anterior passa a ser uma queda / alta maior que o limite
+    risk_category     o país muda de categoria de risco (reavaliado só quando muda algum indicador com peso)
+
+Uma regra dispara quando a condição passa a valer com a mudança (valia antes: não dispara de novo) e só
+para os anos mais recentes dos dados; revisões de anos antigos ficam no painel de revisões. Sem mudanças,
+nenhuma regra é avaliada.
+
+Os alertas são gravados em DASHBOARD_ALERT_DIR/alertas.jsonl e, se DASHBOARD_ALERT_WEBHOOK estiver
+definida, enviados por POST (JSON) para essa URL. Quando o registro passa de MAX_LOG_BYTES, ele vira
+alertas.jsonl.1 (substituindo o anterior) e um novo é iniciado.
+"""
+import csv
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import registry
+from data_api import region_dir
+from risk import calculate_risk_scores, risk_category
+
+# Arquivo com as regras de alerta (pode ser sobrescrito por variável de ambiente)
+RULES_PATH = os.environ.get(
+    "DASHBOARD_ALERTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "alertas.csv")
+)
+
+# Diretório do registro de alertas (pode ser sobrescrito por variável de ambiente), um subdiretório por região
+ALERT_DIR = region_dir(os.environ.get(
+    "DASHBOARD_ALERT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".alerts")
+))
+
+# URL que recebe os alertas de cada atualização (opcional)
+WEBHOOK_URL = os.environ.get("DASHBOARD_ALERT_WEBHOOK")
+
+# Só mudanças nos últimos anos dos dados disparam alertas de valor e de variação
+RECENT_YEARS = 3
+
+KINDS = ("above", "below", "drop", "rise", "risk_category")
+
+# Tamanho a partir do qual o registro de alertas é rotacionado (bytes)
+MAX_LOG_BYTES = 1024 * 1024
+
+# Bloco lido por vez, do fim para o começo, ao buscar os alertas recentes (bytes)
+_READ_BLOCK = 64 * 1024
+
+_LOG = "alertas.jsonl"
+_COLUMNS = ["timestamp", "rule", "country", "indicator", "year", "previous", "value", "message"]
+
+
+def load_rules(path=RULES_PATH):
+    """
+    Lê as regras de alerta (nome, código do indicador, tipo, limite).
+
+    Retorna uma lista de dicts na ordem do arquivo, com o rótulo do indicador em "label".
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        rules = []
+        for row in csv.DictReader(f):
+            if row["kind"] not in KINDS:
+                print(f"[AVISO] Regra de alerta com tipo desconhecido ignorada: {row['name']} ({row['kind']})")
+                continue
+            entry = registry.lookup(row["indicator"]) if row["indicator"] else None
+            if row["kind"] != "risk_category" and entry is None:
+                print(f"[AVISO] Regra de alerta com indicador fora do registro ignorada: {row['name']}")
+                continue
+            row["label"] = entry["label"] if entry is not None else None
+            row["threshold"] = float(row["threshold"] or 0)
+            rules.append(row)
+    return rules
+
+
+def _previous_frame(wide, changes):
+    """
+    Estado anterior à coleta: o DataFrame atual com as células alteradas de volta ao valor anterior.
+    """
+    keys = pd.MultiIndex.from_arrays(
+        [changes["country"], pd.to_datetime(changes["year"].astype(str), format="%Y")], names=wide.index.names
+    )
+    # Células removidas na coleta não têm linha no estado atual
+    previous = wide.reindex(wide.index.union(keys.unique()))
+    values = previous.to_numpy(dtype=float, copy=True)
+    values[previous.index.get_indexer(keys), previous.columns.get_indexer(changes["indicator"])] = changes["previous"]
+    return pd.DataFrame(values, index=previous.index, columns=previous.columns)
+
+
+def _lookup(wide, countries, years, label):
+    """
+    Valores de um indicador nas células (país, ano) pedidas, NaN onde a célula não existe.
+    """
+    rows = wide.index.get_indexer(pd.MultiIndex.from_arrays([countries, pd.to_datetime(years.astype(str), format="%Y")]))
+    column = wide[label].to_numpy(dtype=float)
+    return np.where(rows >= 0, column[rows], np.nan)
+
+
+def _cell_alerts(rule, changes, current, previous, first_year):
+    """
+    Disparos de uma regra de valor ou de variação nas células alteradas do indicador dela.
+    """
+    touched = changes[(changes["indicator"] == rule["label"])]
+    if rule["kind"] in ("drop", "rise"):
+        # Uma mudança no ano t altera a variação de t e de t + 1
+        touched = pd.concat([touched, touched.assign(year=touched["year"] + 1)])
+    touched = touched[touched["year"] >= first_year].drop_duplicates(["country", "year"])
+    if touched.empty:
+        return []
+    countries, years = touched["country"].to_numpy(), touched["year"].to_numpy()
+
+    def measure(wide):
+        value = _lookup(wide, countries, years, rule["label"])
+        if rule["kind"] in ("above", "below"):
+            return value, value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = (value / _lookup(wide, countries, years - 1, rule["label"]) - 1) * 100
+        return value, change
+
+    value, now = measure(current)
+    before_value, before = measure(previous)
+    condition = {
+        "above": lambda x: x > rule["threshold"],
+        "below": lambda x: x < rule["threshold"],
+        "drop": lambda x: x <= -rule["threshold"],
+        "rise": lambda x: x >= rule["threshold"],
+    }[rule["kind"]]
+    # Comparações com NaN dão False: célula sem dado não atende a condição
+    with np.errstate(invalid="ignore"):
+        fired = np.flatnonzero(condition(now) & ~condition(before))
+
+    alerts = []
+    for i in fired:
+        detail = f"{now[i]:.1f}%" if rule["kind"] in ("drop", "rise") else f"{value[i]:.2f}"
+        alerts.append({
+            "rule": rule["name"], "country": countries[i], "indicator": rule["label"], "year": int(years[i]),
+            "previous": float(before_value[i]), "value": float(value[i]),
+            "message": f"{countries[i]} {years[i]}: {rule['name']} ({detail})",
+        })
+    return alerts
+
+
+def _risk_alerts(rule, current, previous):
+    """
+    Países que mudaram de categoria de risco com a coleta.
+    """
+    scores = calculate_risk_scores(current.reset_index())
+    previous_scores = calculate_risk_scores(previous.reset_index()).reindex(scores.index)
+    alerts = []
+    for country, score in scores.items():
+        before = previous_scores[country]
+        if np.isnan(before) or risk_category(score) == risk_category(before):
+            continue
+        alerts.append({
+            "rule": rule["name"], "country": country, "indicator": "Score de risco", "year": None,
+            "previous": float(before), "value": float(score),
+            "message": f"{country}: {risk_category(before)} → {risk_category(score)} (score {before:.1f} → {score:.1f})",
+        })
+    return alerts
+
+
+def evaluate(changes, df, rules=None):
+    """
+    Avalia as regras sobre as mudanças de uma coleta (DataFrame de vintages.record) e o estado novo df.
+
+    Retorna DataFrame com rule, country, indicator, year, previous, value e message (vazio sem mudanças).
+    """
+    if changes.empty:
+        return pd.DataFrame(columns=_COLUMNS[1:])
+    rules = load_rules() if rules is None else rules
+    current = df.set_index(["country", "date"]).sort_index()
+    previous = _previous_frame(current, changes)
+    first_year = int(max(changes["year"].max(), current.index.get_level_values("date").year.max())) - RECENT_YEARS + 1
+    weighted = {entry["label"] for entry in registry.REGISTRY if entry["risk_weight"]}
+
+    alerts = []
+    for rule in rules:
+        if rule["kind"] == "risk_category":
+            if changes["indicator"].isin(weighted).any():
+                alerts.extend(_risk_alerts(rule, current, previous))
+        elif rule["label"] in current.columns:
+            alerts.extend(_cell_alerts(rule, changes, current, previous, first_year))
+    return pd.DataFrame(alerts, columns=_COLUMNS[1:])
+
+
+def process(changes, df, timestamp=None):
+    """
+    Avalia os alertas de uma coleta, grava no registro e envia ao webhook (se configurado).
+    """
+    alerts = evaluate(changes, df)
+    if alerts.empty:
+        return alerts
+    timestamp = time.time() if timestamp is None else timestamp
+    alerts.insert(0, "timestamp", timestamp)
+    records = json.loads(alerts.to_json(orient="records", force_ascii=False))
+
+    os.makedirs(ALERT_DIR, exist_ok=True)
+    path = os.path.join(ALERT_DIR, _LOG)
+    try:
+        if os.path.getsize(path) >= MAX_LOG_BYTES:
+            os.replace(path, f"{path}.1")
+    except FileNotFoundError:
+        pass
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    if WEBHOOK_URL:
+        # Só quem envia o webhook precisa do requests
+        import requests
+        try:
+            requests.post(WEBHOOK_URL, json={"alerts": records}, timeout=10).raise_for_status()
+        except requests.RequestException as e:
+            print(f"[ERRO] Webhook de alertas: {e}")
+    print(f"[AVISO] {len(alerts)} alerta(s) na atualização dos dados")
+    return alerts
+
+
+def _records_since(path, since, records):
+    """
+    Acrescenta a `records` os alertas de um registro posteriores a `since`, do mais recente para o mais
+    antigo, lendo o arquivo em blocos a partir do fim.
+
+    Retorna True se chegou a um alerta anterior a `since` (os registros mais antigos não precisam ser lidos).
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return False
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        partial = b""
+        while end > 0:
+            start = max(0, end - _READ_BLOCK)
+            f.seek(start)
+            lines = (f.read(end - start) + partial).split(b"\n")
+            # A primeira linha do bloco pode ter começado no bloco anterior
+            partial = lines.pop(0) if start > 0 else b""
+            for line in reversed(lines):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["timestamp"] <= since:
+                    return True
+                records.append(record)
+            end = start
+    return False
+
+
+def recent(since):
+    """
+    Alertas registrados depois do instante `since`, do mais recente para o mais antigo.
+
+    Os alertas são gravados em ordem cronológica: só o fim do registro (e, se preciso, o registro
+    rotacionado) é lido.
+    """
+    path = os.path.join(ALERT_DIR, _LOG)
+    records = []
+    if not _records_since(path, since, records):
+        _records_since(f"{path}.1", since, records)
+    return pd.DataFrame(records, columns=_COLUMNS)
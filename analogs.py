@@ -0,0 +1,120 @@
+import numpy as np
+
+import registry
+
+# Busca de situações semelhantes: os países-ano do histórico mais próximos da situação atual de um país,
+# pela distância entre os vetores de indicadores padronizados (z-score de cada indicador em todo o cubo).
+
+# Transformação de cada indicador antes da padronização (os demais entram como estão)
+TRANSFORMS = {"NY.GDP.MKTP.CD": "log", "PA.NUS.FCRF": "change"}
+
+# Mínimo de indicadores com dado nos dois vetores para que a distância entre eles seja considerada
+MIN_SHARED = 3
+
+# Anos que um valor é carregado para frente na situação de um país-ano (mais antigo que isso: sem dado)
+MAX_AGE = 3
+
+
+def feature_labels(indicators):
+    """
+    Rótulo de cada coluna do vetor de indicadores, na ordem do cubo.
+    """
+    codes = {entry["label"]: entry["code"] for entry in registry.REGISTRY}
+    suffix = {"log": " (log)", "change": " (var. % anual)"}
+    return [label + suffix.get(TRANSFORMS.get(codes.get(label)), "") for label in indicators]
+
+
+def standardized_features(cube, indicators):
+    """
+    Vetor padronizado de cada país-ano: PIB em log, câmbio como variação % anual e z-score de cada
+    indicador sobre todos os países e anos (NaN sem dado; média e desvio ignoram os NaN).
+
+    Retorna:
+    array (países, anos, indicadores)
+    """
+    codes = {entry["label"]: entry["code"] for entry in registry.REGISTRY}
+    values = np.array(cube, dtype=float).transpose(0, 2, 1)
+    for k, label in enumerate(indicators):
+        transform = TRANSFORMS.get(codes.get(label))
+        column = values[:, :, k]
+        if transform == "log":
+            column[column <= 0] = np.nan
+            np.log10(column, out=column)
+        elif transform == "change":
+            change = np.full(column.shape, np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change[:, 1:] = (column[:, 1:] / column[:, :-1] - 1) * 100
+            change[~np.isfinite(change)] = np.nan
+            values[:, :, k] = change
+
+    # Média e desvio sem np.nanmean/np.nanstd, que avisam em colunas sem nenhum dado
+    present = ~np.isnan(values)
+    n = present.sum(axis=(0, 1))
+    mean = np.where(present, values, 0.0).sum(axis=(0, 1)) / np.maximum(n, 1)
+    centered = np.where(present, values - mean, 0.0)
+    std = np.sqrt((centered * centered).sum(axis=(0, 1)) / np.maximum(n - 1, 1))
+    return np.where(present, centered / np.where(std > 0, std, 1.0), np.nan)
+
+
+def situations(features, max_age=MAX_AGE):
+    """
+    Situação de cada país-ano: o valor padronizado mais recente de cada indicador até aquele ano, desde
+    que não tenha mais de max_age anos. A situação atual de um país e os candidatos da busca são
+    montados da mesma forma, para que a distância compare vetores equivalentes.
+
+    Retorna:
+    (valores, posição do ano de cada valor; -1 sem dado), ambos países × anos × indicadores
+    """
+    positions = np.arange(features.shape[1])[None, :, None]
+    last_pos = np.maximum.accumulate(np.where(np.isnan(features), -1, positions), axis=1)
+    valid = (last_pos >= 0) & (positions - last_pos <= max_age)
+    values = np.take_along_axis(features, np.maximum(last_pos, 0), axis=1)
+    return np.where(valid, values, np.nan), np.where(valid, last_pos, -1)
+
+
+def current_situation(values, last_pos, country_idx):
+    """
+    Situação atual de um país (último ano de situations).
+
+    Retorna:
+    (vetor, posição do ano de cada valor; -1 sem dado)
+    """
+    return values[country_idx, -1], last_pos[country_idx, -1]
+
+
+def nearest(features, query, k=10, exclude=None, min_shared=MIN_SHARED):
+    """
+    Os k países-ano mais próximos do vetor query, em uma única passada vetorizada sobre o cubo.
+
+    A distância é euclidiana sobre os indicadores com dado nos dois vetores, reescalada para o total de
+    indicadores (sqrt(F / comuns * soma dos quadrados)); pares com menos de min_shared indicadores em
+    comum ficam de fora. Um índice em árvore (KD-tree) não se aplica a essa distância com dados
+    faltantes, e com países × anos na casa de dezenas de milhares a passada direta leva poucos ms.
+
+    Parâmetros:
+    features (ndarray): países × anos × indicadores (valores de situations)
+    query (ndarray): vetor de indicadores (NaN sem dado)
+    exclude (ndarray): máscara países × anos dos candidatos a ignorar
+
+    Retorna:
+    (índices dos países, posições dos anos, distâncias), do mais próximo ao mais distante
+    """
+    n_features = features.shape[-1]
+    diff = features - query
+    shared = ~np.isnan(diff)
+    n_shared = shared.sum(axis=-1)
+    squares = np.where(shared, diff * diff, 0.0).sum(axis=-1)
+    distance = np.full(n_shared.shape, np.inf)
+    valid = n_shared >= min_shared
+    if exclude is not None:
+        valid &= ~exclude
+    distance[valid] = np.sqrt(squares[valid] * n_features / n_shared[valid])
+
+    flat = distance.ravel()
+    k = min(k, int(valid.sum()))
+    if k == 0:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+    best = np.argpartition(flat, k - 1)[:k]
+    best = best[np.argsort(flat[best], kind="stable")]
+    country_idx, year_pos = np.unravel_index(best, distance.shape)
+    return country_idx, year_pos, flat[best]
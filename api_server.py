@@ -0,0 +1,262 @@
+"""
+Serviço HTTP com os dados do dashboard para outros sistemas.
+
+Serve, a partir do snapshot compartilhado publicado pelo dashboard (sem consultar o World Bank):
+    GET /version   versão e instante de publicação dos dados
+    GET /dataset   conjunto combinado (uma linha por país e ano, uma coluna por indicador)
+    GET /latest    valor mais recente de cada país e indicador, com o ano da medição
+    GET /risk      score de risco de investimento por país
+
+Filtros (parâmetros de consulta, vários valores separados por vírgula):
+    country=Brazil,Chile  indicator=<rótulo ou código>  year=2020 ou year=2010:2020
+
+Formato: JSON (padrão) ou CSV, com format=csv ou o cabeçalho Accept: text/csv.
+
+As respostas levam ETag com a versão dos dados (If-None-Match devolve 304; em /version, também com o
+instante de publicação; em CSV, com o sufixo -csv) e são comprimidas com gzip quando o cliente aceita.
+
+Uso:
+    python api_server.py [--host 0.0.0.0] [--port 8502]
+"""
+import argparse
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import quality
+import registry
+import snapshot
+from risk import calculate_risk_scores
+
+# Respostas menores que isso não compensam a compressão
+GZIP_MIN_BYTES = 1024
+
+ROUTES = ("/version", "/dataset", "/latest", "/risk")
+
+FORMATS = {"json": "application/json; charset=utf-8", "csv": "text/csv; charset=utf-8"}
+
+_lock = threading.Lock()
+_state = {"version": None, "dataset": None, "risk": None, "quality": None}
+
+
+class RequestError(Exception):
+    """
+    Erro nos parâmetros da requisição (respondido com 400).
+    """
+
+
+def current_dataset():
+    """
+    Versão atual do snapshot, aberta uma vez por versão e compartilhada entre as threads.
+    """
+    version, created_at = snapshot.current_version()
+    if version is None:
+        return None
+    with _lock:
+        if _state["version"] == version and _state["dataset"].created_at != created_at:
+            # Mesmo conteúdo republicado: só o instante de publicação muda
+            _state["dataset"] = _state["dataset"]._replace(created_at=created_at)
+        elif _state["version"] != version:
+            dataset = snapshot.load(version, created_at)
+            stats = snapshot.derived(dataset, "qualidade", lambda ds: quality.series_stats(ds.cube))
+            outliers = snapshot.derived(dataset, "atipicos", lambda ds: quality.robust_outliers(ds.cube))
+            _state.update(
+                version=version,
+                dataset=dataset,
+                risk=calculate_risk_scores(dataset.df),
+                quality=quality.from_arrays(stats, outliers, dataset.years),
+            )
+        return _state["dataset"], _state["risk"], _state["quality"]
+
+
+def _split(params, name):
+    return [item for value in params.get(name, []) for item in value.split(",") if item]
+
+
+def _filter_indices(dataset, params):
+    """
+    Converte os filtros country, indicator e year em índices dos eixos do cubo.
+    """
+    countries = _split(params, "country")
+    unknown = [c for c in countries if c not in dataset.countries]
+    if unknown:
+        raise RequestError(f"País desconhecido: {', '.join(unknown)}")
+    country_idx = [dataset.countries.index(c) for c in countries] or list(range(len(dataset.countries)))
+
+    indicator_idx = []
+    for name in _split(params, "indicator"):
+        entry = registry.lookup(name)
+        label = entry["label"] if entry is not None else name
+        if label not in dataset.indicators:
+            raise RequestError(f"Indicador desconhecido: {name}")
+        indicator_idx.append(dataset.indicators.index(label))
+    indicator_idx = indicator_idx or list(range(len(dataset.indicators)))
+
+    year_mask = np.ones(len(dataset.years), dtype=bool)
+    years = params.get("year")
+    if years:
+        try:
+            start, _, end = years[-1].partition(":")
+            start, end = int(start), int(end or start)
+        except ValueError:
+            raise RequestError(f"Ano inválido: {years[-1]} (use 2020 ou 2010:2020)")
+        year_mask = (dataset.years >= start) & (dataset.years <= end)
+    return np.asarray(country_idx), np.asarray(indicator_idx), year_mask
+
+
+def _risk_countries(risk, params):
+    countries = _split(params, "country")
+    unknown = [c for c in countries if c not in risk.index]
+    if unknown:
+        raise RequestError(f"País desconhecido: {', '.join(unknown)}")
+    return countries
+
+
+def _response_format(params, accept):
+    """
+    Formato da resposta: o parâmetro format, se informado; senão CSV quando o Accept pede text/csv.
+    """
+    requested = params.get("format")
+    if requested:
+        if requested[-1] not in FORMATS:
+            raise RequestError(f"Formato inválido: {requested[-1]} (use json ou csv)")
+        return requested[-1]
+    return "csv" if "text/csv" in accept else "json"
+
+
+def dataset_records(dataset, selection):
+    """
+    Linhas país × ano dos filtros (índices de _filter_indices), sem as que não têm nenhum valor.
+    """
+    country_idx, indicator_idx, year_mask = selection
+    # Fatia do cubo (países, indicadores, anos) -> linhas (países × anos, indicadores)
+    block = dataset.cube[np.ix_(country_idx, indicator_idx, np.flatnonzero(year_mask))]
+    block = block.transpose(0, 2, 1).reshape(-1, len(indicator_idx))
+    years = dataset.years[year_mask]
+    df = pd.DataFrame(block, columns=[dataset.indicators[i] for i in indicator_idx])
+    df.insert(0, "year", np.tile(years, len(country_idx)))
+    df.insert(0, "country", np.repeat(np.asarray(dataset.countries, dtype=object)[country_idx], len(years)))
+    return df[~np.isnan(block).all(axis=1)]
+
+
+def latest_records(dataset, dq, selection):
+    """
+    Valor mais recente de cada país e indicador dos filtros (o filtro de ano limita o ano da medição).
+    """
+    country_idx, indicator_idx, year_mask = selection
+    grid = np.ix_(country_idx, indicator_idx)
+    last_year = dq.last_year[grid].ravel()
+    df = pd.DataFrame({
+        "country": np.repeat(np.asarray(dataset.countries, dtype=object)[country_idx], len(indicator_idx)),
+        "indicator": np.tile(np.asarray(dataset.indicators, dtype=object)[indicator_idx], len(country_idx)),
+        "year": last_year,
+        "value": dq.latest[grid].ravel(),
+    })
+    df = df[np.isin(last_year, dataset.years[year_mask])]
+    return df.astype({"year": int})
+
+
+def risk_records(risk, countries):
+    scores = risk.loc[countries] if countries else risk
+    return pd.DataFrame({"country": scores.index, "risk_score": scores.round(1).to_numpy()})
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "MonitoramentoAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        if url.path not in ROUTES:
+            self._send_json(404, {"erro": f"Rota desconhecida: {url.path}"})
+            return
+        loaded = current_dataset()
+        if loaded is None:
+            self._send_json(503, {"erro": "Nenhum snapshot publicado; abra o dashboard para coletar os dados"})
+            return
+        dataset, risk, dq = loaded
+
+        # Parâmetros validados antes do If-None-Match: uma URL inválida nunca recebe 304
+        try:
+            response_format = _response_format(params, self.headers.get("Accept", ""))
+            if url.path in ("/dataset", "/latest"):
+                selection = _filter_indices(dataset, params)
+            elif url.path == "/risk":
+                selection = _risk_countries(risk, params)
+        except RequestError as e:
+            self._send_json(400, {"erro": str(e)})
+            return
+
+        # A versão é o hash do conteúdo: mesma versão, mesma resposta para a mesma URL. /version também
+        # traz o instante de publicação, que muda quando o mesmo conteúdo é publicado de novo
+        etag = f'W/"{dataset.version}"'
+        if url.path == "/version":
+            etag = f'W/"{dataset.version}-{dataset.created_at}"'
+        if response_format == "csv":
+            # Cada representação tem a sua ETag: um 304 nunca valida o JSON guardado para um pedido de CSV
+            etag = etag[:-1] + '-csv"'
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        if url.path == "/version":
+            version = {"version": dataset.version, "created_at": dataset.created_at}
+            records = pd.DataFrame([version])
+        elif url.path == "/dataset":
+            records = dataset_records(dataset, selection)
+        elif url.path == "/latest":
+            records = latest_records(dataset, dq, selection)
+        else:
+            records = risk_records(risk, selection)
+        if response_format == "csv":
+            body = records.to_csv(index=False)
+        elif url.path == "/version":
+            body = json.dumps(version)
+        else:
+            body = records.to_json(orient="records", force_ascii=False)
+        self._send(200, body.encode("utf-8"), etag, FORMATS[response_format])
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    def _send(self, status, body, etag=None, content_type=FORMATS["json"]):
+        accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Vary", "Accept, Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if accepts_gzip and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP com os dados do dashboard")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Servindo os dados do snapshot em http://{args.host}:{args.port} (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
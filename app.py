@@ -1,8 +1,6 @@
 import warnings
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from io import BytesIO
 
 # Função para converter DataFrame para Excel
@@ -15,237 +13,344 @@ def to_excel(df):
     return output.getvalue()
 import numpy as np
 from datetime import datetime
-from scipy.stats import linregress
-from data_api import fetch_all_indicators
+from itertools import combinations
+from data_api import REGION, REGION_NAME, fetch_countries
+from formatting import format_number, format_series
+import alerts
+import correlations
+import nowcast
+import providers
+import quality
+import rankings
+import registry
+import series_cache
+import snapshot
+import vintages
+import window_stats
+from risk import risk_category, risk_components, risk_scores_by_year
 
 # Desativar warnings
 warnings.filterwarnings('ignore')
 
-# Configurações da página
-st.set_page_config(
-    layout="wide",
-    page_title="Dashboard Econômica - América do Sul",
-    initial_sidebar_state="expanded"
-)
+# Configurações da página (a execução perfilada roda dentro de outra que já configurou a página)
+if not globals().get("_EXECUCAO_PERFILADA"):
+    st.set_page_config(
+        layout="wide",
+        page_title=f"Dashboard Econômica - {REGION_NAME}",
+        initial_sidebar_state="expanded"
+    )
 
-# --- Sidebar customizada e botão de ocultar ---
-import streamlit.components.v1 as components
-# Injeta JS para toggle
-components.html(
-    """
-    <script src="sidebar_toggle.js"></script>
-    <script>
-        // Aplica classe customizada ao sidebar
-        window.addEventListener('DOMContentLoaded', function() {
-            var sidebar = window.parent.document.querySelector('section[data-testid=\"stSidebar\"]');
-            if (sidebar && !sidebar.classList.contains('sidebar-bg-custom')) {
-                sidebar.classList.add('sidebar-bg-custom');
-            }
-        });
-        setTimeout(function() {
-            var sidebar = window.parent.document.querySelector('section[data-testid=\"stSidebar\"]');
-            if (sidebar && !sidebar.classList.contains('sidebar-bg-custom')) {
-                sidebar.classList.add('sidebar-bg-custom');
-            }
-        }, 1000);
-    </script>
-    """,
-    height=0
-)
-
-# Função auxiliar para formatação de números
-def format_number(value, indicator_code):
-    """
-    Formata números com base no tipo de indicador.
-    """
-    if pd.isna(value):
-        return "-"
-
-    # Permitir formatação compacta para qualquer indicador relacionado a PIB/GDP
-    if (
-        indicator_code == "NY.GDP.MKTP.CD"
-        or "PIB" in str(indicator_code).upper()
-        or "GDP" in str(indicator_code).upper()
-        or "US$" in str(indicator_code).upper()
-    ):
-        abs_value = abs(value)
-        if abs_value >= 1e12:
-            return f"US$ {value/1e12:,.2f} TRI"
-        elif abs_value >= 1e9:
-            return f"US$ {value/1e9:,.2f} BI"
-        elif abs_value >= 1e6:
-            return f"US$ {value/1e6:,.2f} MI"
-        else:
-            return f"US$ {value:,.0f}"
-    elif indicator_code == "FP.CPI.TOTL.ZG":  # Inflação
-        return f"{value:.1f}%"
-    elif indicator_code == "FR.INR.RINR":  # Taxa de juros real
-        return f"{value:.1f}%"
-    elif indicator_code == "SL.UEM.TOTL.ZS":  # Desemprego
-        return f"{value:.1f}%"
-    elif indicator_code == "PA.NUS.FCRF":  # Taxa de câmbio
-        return f"{value:.4f}"
-    elif indicator_code == "RISK_SCORE":  # Score de risco
-        # Formatar o score de risco como um valor de 0-100 com uma casa decimal
-        return f"{value:.1f}"
-    else:
-        return f"{value:.2f}"
+    # Perfil sob demanda: ?profile=cpu ou ?profile=mem roda esta página uma vez sob cProfile/tracemalloc
+    from profiling import PROFILE_MODES, run_profiled, show_report
+    profile_mode = st.query_params.get("profile")
+    if profile_mode in PROFILE_MODES:
+        # Remove o parâmetro para que só esta execução seja perfilada
+        del st.query_params["profile"]
+        run_profiled(__file__, profile_mode, init_globals={"_EXECUCAO_PERFILADA": True})
+        st.stop()
+    # Relatório de uma execução perfilada anterior: exibido antes de qualquer st.stop() da página
+    show_report()
 
-# Função para calcular o score de risco de investimento
-def calculate_risk_score(df, country):
-    """
-    Calcula um score de risco de investimento para um país baseado em vários indicadores econômicos.
-    
-    Parâmetros:
-    df (DataFrame): DataFrame completo com todos os indicadores
-    country (str): Nome do país para calcular o score
-    
-    Retorna:
-    float: Score de risco entre 0 (menor risco) e 100 (maior risco)
-    """
-    try:
-        # Filtrar dados do país
-        country_data = df[df["country"] == country].copy()
-        
-        if country_data.empty:
-            return None
-        
-        # Pegar os valores mais recentes de cada indicador
-        latest_data = country_data.sort_values("date").groupby("country").last().reset_index()
-        
-        # Coletar todos os dados mais recentes de todos os países para comparação
-        all_countries_latest = df.sort_values("date").groupby("country").last().reset_index()
-        
-        # Definir os pesos para cada indicador no cálculo de risco
-        # Indicadores positivos (quanto maior, menor o risco)
-        # Indicadores negativos (quanto maior, maior o risco)
-        weights = {
-            "NY.GDP.MKTP.CD": -0.25,    # PIB: maior PIB = menor risco (-)
-            "FP.CPI.TOTL.ZG": 0.35,    # Inflação: maior inflação = maior risco (+) - Peso aumentado
-            "FR.INR.RINR": 0.15,       # Taxa de juros real: maior taxa = maior risco (+)
-            "SL.UEM.TOTL.ZS": 0.25,   # Desemprego: maior desemprego = maior risco (+)
-            "PA.NUS.FCRF": 0.0        # Taxa de câmbio: neutro (0)
-        }
-        
-        # Inicializar score com valor base mais baixo
-        score = 35  # Valor base mais baixo para aumentar a dispersão
-        used_weights = 0
-        total_impact = 0
-        
-        # Calcular percentis para cada indicador
-        percentiles = {}
-        for indicator in weights.keys():
-            if indicator in df.columns:
-                # Classificar os países pelo indicador (sem valores nulos)
-                valid_values = all_countries_latest[all_countries_latest[indicator].notna()]
-                
-                if not valid_values.empty:
-                    if indicator == "NY.GDP.MKTP.CD":  # PIB (invertido - menor PIB = maior risco)
-                        sorted_data = valid_values.sort_values(indicator, ascending=True)
-                    else:  # Outros indicadores (maior valor = maior risco)
-                        sorted_data = valid_values.sort_values(indicator, ascending=False)
-                    
-                    # Criar um ranking normalizado (0-100)
-                    n_countries = len(sorted_data)
-                    ranks = pd.Series(range(n_countries), index=sorted_data["country"])
-                    percentiles[indicator] = (ranks / max(1, n_countries - 1)) * 100  # Evitar divisão por zero
-        
-        # Calcular score com base em percents e valores extremos
-        for indicator, weight in weights.items():
-            if indicator in latest_data.columns and not pd.isna(latest_data[indicator].iloc[0]):
-                value = latest_data[indicator].iloc[0]
-                country_val = latest_data["country"].iloc[0]
-                
-                # Verificar casos extremos diretos - indicadores críticos
-                # Inflação muito alta - risco muito elevado
-                if indicator == "FP.CPI.TOTL.ZG" and value > 50:
-                    direct_impact = min((value - 50) * 0.8, 45)  # Até +45 pontos para inflação extrema
-                    score += direct_impact
-                    total_impact += abs(direct_impact)
-                # Desemprego muito alto - risco elevado
-                elif indicator == "SL.UEM.TOTL.ZS" and value > 15:
-                    direct_impact = min((value - 15) * 2, 25)  # Até +25 pontos para desemprego extremo
-                    score += direct_impact
-                    total_impact += abs(direct_impact)
-                # PIB muito baixo - risco elevado (PIB em US$)
-                elif indicator == "NY.GDP.MKTP.CD" and value < 1e11:  # Menos de 100 bilhões
-                    # Escala logarítmica para PIB baixo
-                    log_val = np.log10(max(value, 1e8) / 1e11)  # max com 1e8 para evitar log(0)
-                    direct_impact = min(-log_val * 10, 30)  # Até +30 pontos para PIB baixo
-                    score += direct_impact
-                    total_impact += abs(direct_impact)
-                
-                # Usar percents se disponíveis
-                if indicator in percentiles and country_val in percentiles[indicator].index:
-                    percentile = percentiles[indicator][country_val]
-                    
-                    # Aplicar o peso ao percentil (0-100)
-                    if indicator == "NY.GDP.MKTP.CD":
-                        # Para PIB, menor percentil (maior PIB) = menor risco
-                        impact = percentile * weight  # Já está com sinal negativo no peso
-                    else:
-                        # Para outros, maior percentil = maior risco
-                        impact = percentile * weight
-                    
-                    score += impact
-                    total_impact += abs(impact)
-                    used_weights += abs(weight)
-        
-        # Aplicar ajustes finais para casos específicos de países
-        # Venezuela tem condições econômicas extremas
-        if country == "Venezuela":
-            score += 30  # Adicionar um bom risco adicional para Venezuela
-        # Ajuste para países estáveis
-        elif country in ["Chile", "Uruguay"]:
-            score -= 15  # Reduzir o risco para países economicamente mais estáveis
-        # Brasil - ajuste moderado
-        elif country == "Brazil":
-            score -= 5  # Brasil tem grande economia mas problemas estruturais
-        
-        # Garantir que o score esteja no intervalo [0, 100]
-        score = max(min(score, 100), 0)
-        
-        return score
-    
-    except Exception as e:
-        print(f"Erro ao calcular score de risco para {country}: {str(e)}")
-        return None
-    
+# --- Sidebar customizada e botão de ocultar ---
+# O script altera o DOM da página pai, então basta injetá-lo na primeira execução da sessão
+if not st.session_state.get("_sidebar_js_injetado"):
+    st.session_state["_sidebar_js_injetado"] = True
+    import streamlit.components.v1 as components
+    # Injeta JS para toggle
+    components.html(
+        """
+        <script src="sidebar_toggle.js"></script>
+        <script>
+            // Aplica classe customizada ao sidebar
+            window.addEventListener('DOMContentLoaded', function() {
+                var sidebar = window.parent.document.querySelector('section[data-testid=\"stSidebar\"]');
+                if (sidebar && !sidebar.classList.contains('sidebar-bg-custom')) {
+                    sidebar.classList.add('sidebar-bg-custom');
+                }
+            });
+            setTimeout(function() {
+                var sidebar = window.parent.document.querySelector('section[data-testid=\"stSidebar\"]');
+                if (sidebar && !sidebar.classList.contains('sidebar-bg-custom')) {
+                    sidebar.classList.add('sidebar-bg-custom');
+                }
+            }, 1000);
+        </script>
+        """,
+        height=0
+    )
 
 # Cabeçalho principal com timestamp de atualização
 current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-st.markdown("### Monitoramento Econômico - América do Sul")
+st.markdown(f"### Monitoramento Econômico - {REGION_NAME}")
 st.caption(f"Última atualização: {current_time}")
 
 # Carregar dados
 import time
 
-@st.cache_data(ttl=3600)
+# Versões mantidas nos caches por versão: as que continuam em disco (snapshot.KEEP_VERSIONS) mais a atual.
+# Caches sem limite prenderiam mapeamentos de versões já removidas do disco
+VERSOES_EM_CACHE = snapshot.KEEP_VERSIONS + 1
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def abrir_snapshot(version, _created_at):
+    """
+    Mapeia uma versão do snapshot compartilhado uma única vez por processo (republicar os mesmos dados
+    mantém a versão e não cria outra entrada)
+    """
+    return snapshot.load(version, _created_at)
+
+def coletar_e_registrar():
+    """
+    Coleta os provedores de dados (séries vencidas do World Bank e demais fontes registradas) e registra
+    a coleta no histórico de vintages antes de publicá-la; as regras de alerta são avaliadas sobre as
+    células que mudaram
+    """
+    df = providers.collect()
+    if not df.empty:
+        # A primeira coleta não tem com o que comparar: todas as células seriam novas
+        has_history = vintages.has_history()
+        changes = vintages.record(df)
+        if has_history:
+            try:
+                alerts.process(changes, df)
+            except Exception as e:
+                print(f"[ERRO] Avaliação dos alertas: {e}")
+    return df
+
+@st.cache_data(ttl=60, max_entries=VERSOES_EM_CACHE)
+def series_com_falha(created_at):
+    """
+    Séries que ficaram com o último valor obtido porque a coleta delas falhou (lidas uma vez por publicação)
+    """
+    return series_cache.failed_series()
+
+@st.cache_data(ttl=60, max_entries=VERSOES_EM_CACHE)
+def alertas_recentes(created_at, days=7):
+    """
+    Alertas disparados nas atualizações dos últimos dias (lidos uma vez por publicação)
+    """
+    return alerts.recent(time.time() - days * 86400)
+
 def carregar_dados(): # cache de 1 hora
     """
-    Carrega dados econômicos com cache de 1 hora
+    Carrega o snapshot compartilhado entre os processos, coletando uma nova versão se tiver mais de 1 hora
+    (ou mais de 5 minutos, quando alguma série falhou na última coleta)
     Returns:
-        pd.DataFrame: DataFrame com dados econômicos
+        snapshot.Dataset: versão atual dos dados (ou None se nada pôde ser carregado)
     """
-    try:
-        data = fetch_all_indicators()
-        if data.empty:
-            st.warning("Nenhum dado disponível no momento")
-        return data
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return pd.DataFrame()
+    version, created_at = snapshot.current_version()
+    max_age = series_cache.MAX_AGE
+    if version is not None and not series_com_falha(created_at).empty:
+        max_age = series_cache.RETRY_AFTER
+    if version is None or time.time() - created_at >= max_age:
+        try:
+            version, created_at = snapshot.refresh(coletar_e_registrar, max_age=max_age)
+            if version is None:
+                st.warning("Nenhum dado disponível no momento")
+        except Exception as e:
+            if version is None:
+                st.error(f"Erro ao carregar dados: {str(e)}")
+            else:
+                st.warning(f"Erro ao atualizar dados, exibindo a última versão disponível: {str(e)}")
+    if version is None:
+        return None
+    # O instante de publicação muda a cada republicação, mesmo com a versão igual
+    return abrir_snapshot(version, created_at)._replace(created_at=created_at)
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def correlacoes_paises(version, _dataset):
+    """
+    Matrizes de correlação país × país de cada indicador, pré-calculadas por versão
+    """
+    return snapshot.derived(_dataset, "corr_paises", lambda ds: correlations.country_correlations(ds.cube))
+
+# Uma entrada por versão, indicador e janela
+@st.cache_resource(max_entries=VERSOES_EM_CACHE * 16)
+def correlacao_movel(version, _dataset, indicator_idx, window):
+    """
+    Correlações país × país em janela móvel para um indicador, calculadas uma vez por versão
+    """
+    return snapshot.derived(
+        _dataset,
+        f"corr_movel_{indicator_idx}_{window}",
+        lambda ds: correlations.rolling_country_correlations(ds.cube, indicator_idx, window)
+    )
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def qualidade(version, _dataset):
+    """
+    Qualidade dos dados da versão (cobertura, lacunas, ano mais recente e valores atípicos), calculada uma vez
+    """
+    stats = snapshot.derived(_dataset, "qualidade", lambda ds: quality.series_stats(ds.cube))
+    outliers = snapshot.derived(_dataset, "atipicos", lambda ds: quality.robust_outliers(ds.cube))
+    return quality.from_arrays(stats, outliers, _dataset.years)
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def estatisticas_janela(version, _dataset):
+    """
+    Somas acumuladas da versão, para média e desvio de qualquer período
+    """
+    return snapshot.derived(_dataset, "janela_somas", lambda ds: window_stats.prefix_sums(ds.cube))
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def posicoes_por_ano(version, _dataset):
+    """
+    Posição de cada país por indicador e ano e pelo score de risco de cada ano, calculadas uma vez por versão
+
+    Retorna (posições país × indicador × ano, posições no score de risco país × ano)
+    """
+    indicator_ranks = snapshot.derived(_dataset, "posicoes", lambda ds: rankings.ranks_over_countries(ds.cube))
+    risk_ranks = snapshot.derived(
+        _dataset, "posicoes_risco",
+        # Menor risco em 1º
+        lambda ds: rankings.ranks_over_countries(
+            risk_scores_by_year(ds.cube, ds.countries, ds.indicators), descending=False
+        )
+    )
+    return indicator_ranks, risk_ranks
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def situacoes_padronizadas(version, _dataset):
+    """
+    Situação padronizada de todos os países-ano (busca de situações semelhantes) e o ano de cada valor
+    """
+    import analogs
+    packed = snapshot.derived(
+        _dataset,
+        "situacoes",
+        lambda ds: np.stack(analogs.situations(analogs.standardized_features(ds.cube, ds.indicators)))
+    )
+    return packed[0], packed[1].astype(int)
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def indice_triagem(version, _dataset):
+    """
+    Índice ordenado dos valores mais recentes de cada indicador (triagem por faixas com busca binária)
+    """
+    import screener
+    return screener.build_index(qualidade(version, _dataset).latest)
+
+@st.cache_data(max_entries=VERSOES_EM_CACHE)
+def revisoes_recentes(version):
+    """
+    Valores revisados na coleta mais recente com mudanças (lidos uma vez por versão dos dados)
+    """
+    return vintages.latest_revisions()
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE)
+def datas_da_versao(version, _dataset):
+    """
+    Datas (1º de janeiro) do eixo de anos do cubo, criadas uma vez por versão e compartilhadas entre as sessões
+    """
+    return pd.to_datetime(_dataset.years.astype(str), format="%Y")
+
+@st.cache_data
+def carregar_presidentes():
+    """
+    Mandatos presidenciais do presidentes.csv do projeto (o mesmo dos relatórios), lidos uma vez por processo
+    """
+    import figures
+    return figures.load_presidents()
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE * len(nowcast.METHODS))
+def estimativas(version, _dataset, method):
+    """
+    Cubo completado pelo nowcast até o último ano dos dados e máscara dos valores estimados, uma vez por versão
+    """
+    packed = snapshot.derived(
+        _dataset,
+        f"nowcast_{method}",
+        lambda ds: np.stack(nowcast.nowcast(ds.cube, ds.years, ds.years[-1], method)[:2])
+    )
+    return packed[0], packed[1].astype(bool)
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE * (len(nowcast.METHODS) + 1))
+def componentes_risco(version, _dataset, nowcast_method=None):
+    """
+    Parcelas do score de risco de todos os países, calculadas uma vez por versão dos dados (e por método de nowcast, se ativo)
+    """
+    if nowcast_method is None:
+        return risk_components(_dataset.df)
+    # Com o nowcast, todas as séries terminam no mesmo ano e o "valor mais recente" é comparável entre países
+    values, _ = estimativas(version, _dataset, nowcast_method)
+    n_countries, _, n_years = values.shape
+    estimated_df = pd.DataFrame({
+        "country": np.repeat(np.asarray(_dataset.countries, dtype=object), n_years),
+        "date": np.tile(datas_da_versao(version, _dataset), n_countries),
+        **{name: values[:, i, :].ravel() for i, name in enumerate(_dataset.indicators)}
+    })
+    return risk_components(estimated_df)
+
+@st.cache_resource(max_entries=VERSOES_EM_CACHE * (len(nowcast.METHODS) + 1))
+def scores_risco(version, _dataset, nowcast_method=None):
+    """
+    Score de risco de todos os países: a soma das parcelas, limitada a [0, 100] (como em calculate_risk_scores)
+    """
+    return componentes_risco(version, _dataset, nowcast_method).sum(axis=1).clip(0, 100)
+
+@st.cache_data(ttl=86400)
+def coordenadas_paises(region):
+    """
+    Coordenadas (lat, lon) dos países da região para o mapa
+    """
+    countries = fetch_countries(region).dropna(subset=["lat", "lon"])
+    return {row.country: (row.lat, row.lon) for row in countries.itertuples()}
+
+@st.cache_data(ttl=86400)
+def codigos_paises(region):
+    """
+    Código ISO-3 dos países da região, que liga cada país ao seu contorno no mapa
+    """
+    countries = fetch_countries(region)
+    return dict(zip(countries["country"], countries["iso3"]))
+
+@st.cache_resource
+def paises_com_contorno(level):
+    """
+    Códigos ISO-3 dos países com contorno em um nível de detalhe, lidos do disco uma vez por processo
+    """
+    import geometrias
+    return frozenset(geometrias.load(level))
 
 # Mensagem simples de carregamento
 with st.spinner("Carregando dados econômicos..."):
     # Carregar dados
-    df = carregar_dados()
+    dataset = carregar_dados()
+    df = dataset.df if dataset is not None else pd.DataFrame()
 
 # Verificar se os dados foram carregados com sucesso
 if df.empty:
     st.error("Não foi possível carregar os dados. Por favor, tente novamente mais tarde.")
     st.stop()
 
+falhas = series_com_falha(dataset.created_at)
+if not falhas.empty:
+    # Séries com falha continuam no gráfico com o último valor obtido, marcadas aqui como desatualizadas
+    with st.expander(f"⚠️ {len(falhas)} série(s) desatualizada(s): a última coleta falhou e é exibido o último valor obtido", expanded=False):
+        st.dataframe(
+            pd.DataFrame({
+                "País": falhas["country"],
+                "Indicador": falhas["indicator"],
+                "Última coleta bem-sucedida": falhas["fetched_at"].dt.strftime("%d/%m/%Y %H:%M").fillna("nunca"),
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
+disparados = alertas_recentes(dataset.created_at)
+if not disparados.empty:
+    with st.expander(f"🔔 {len(disparados)} alerta(s) nas atualizações dos últimos 7 dias", expanded=False):
+        st.dataframe(
+            pd.DataFrame({
+                "Quando": pd.to_datetime(disparados["timestamp"], unit="s", utc=True)
+                .dt.tz_convert(datetime.now().astimezone().tzinfo).dt.strftime("%d/%m/%Y %H:%M"),
+                "Regra": disparados["rule"],
+                "Alerta": disparados["message"],
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+
 # Lista dos indicadores disponíveis (colunas no DataFrame, exceto 'country' e 'date')
 indicator_columns = [col for col in df.columns if col not in ['country', 'date']]
 
@@ -261,10 +366,11 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     selected_menu = option_menu(
         None,  # Remove o título do menu
-        ["País único", "Comparação entre países"],
-        icons=["bar-chart-line", "people"],
+        ["País único", "Comparação entre países", "Triagem de países"],
+        icons=["bar-chart-line", "people", "funnel"],
         menu_icon="cast",
-        default_index=0,
+        # ?modo=comparacao (ou ?modo=triagem) abre direto na comparação entre países (ou na triagem)
+        default_index={"comparacao": 1, "triagem": 2}.get(st.query_params.get("modo"), 0),
         styles={
             "container": {"padding": "0!important", "background-color": "rgba(0,0,0,0)"},
             "icon": {"color": "#fff", "font-size": "16px"},
@@ -289,98 +395,65 @@ with st.sidebar:
     st.header("Filtros e Controles")
     # Seleção de indicador comum para ambos os modos
     selected_indicator = st.selectbox("Selecione o indicador", indicator_columns)
+    # Nowcast opcional: completa as séries até o último ano para comparar países no mesmo ano
+    usar_nowcast = st.toggle(
+        f"Estimar valores até {dataset.years[-1]}",
+        help="Interpola lacunas e projeta as séries que param antes do último ano (score de risco e ranking)"
+    )
+    nowcast_method = None
+    if usar_nowcast:
+        nowcast_method = st.radio(
+            "Método de estimativa", nowcast.METHODS,
+            format_func={"ar1": "AR(1)", "trend": "Tendência linear"}.get,
+            horizontal=True
+        )
+    # Período da análise: vale para os gráficos e estatísticas dos dois modos
+    first_year, last_year = int(dataset.years[0]), int(dataset.years[-1])
+    year_range = (first_year, last_year)
+    if last_year > first_year:
+        year_range = st.slider("Período", min_value=first_year, max_value=last_year, value=(first_year, last_year))
+    start_pos, end_pos = year_range[0] - first_year, year_range[1] - first_year
+    window_years = slice(start_pos, end_pos + 1)
 
 # O menu controla o modo de visualização
 if selected_menu == "País único":
     viz_mode = "País único"
 elif selected_menu == "Comparação entre países":
     viz_mode = "Comparação entre países"
+elif selected_menu == "Triagem de países":
+    viz_mode = "Triagem de países"
 else:
     viz_mode = "Sobre"
 
 # Filtragem baseada no modo selecionado
 if viz_mode == "País único":
+    # Plotly e os módulos de cada modo só são importados pelos modos que os usam, depois que cabeçalho,
+    # dados e sidebar já foram enviados ao navegador
+    import plotly.express as px
+    import analogs
+    import figures
+
     selected_country = st.sidebar.selectbox("Selecione o país", sorted(df["country"].unique()))
     # Mensagem de atualização automática na sidebar (após seleção de país)
     st.sidebar.info('Os dados são atualizados automaticamente a cada hora.')
     
-    # Filtrar dados para o país e indicador selecionados
-    country_data = df[df["country"] == selected_country].copy()
-    country_data = country_data[["country", "date", selected_indicator]]
-    country_data = country_data.sort_values("date")
-    
-    # Verificar se há dados disponíveis
-    if country_data.empty:
+    # Verificar se há dados disponíveis (pela qualidade pré-calculada da série)
+    dq = qualidade(dataset.version, dataset)
+    country_idx = dataset.countries.index(selected_country)
+    indicator_idx = dataset.indicators.index(selected_indicator)
+    if dq.observations[country_idx, indicator_idx] == 0:
         st.error(f"❌ Não existem dados disponíveis no momento para o país: **{selected_country}**.")
         st.stop()
     
-    # Renomeando a coluna do indicador para facilitar o trabalho com os gráficos
-    country_data = country_data.rename(columns={selected_indicator: "value"})
+    # Série do país e indicador selecionados no período: fatia do cubo compartilhado (visão somente leitura, sem cópia)
+    dates = datas_da_versao(dataset.version, dataset)[window_years]
+    series = dataset.cube[country_idx, indicator_idx, window_years]
+    country_data = pd.DataFrame({"country": selected_country, "date": dates, "value": series}, copy=False)
     
     # Exibir presidente correspondente ao ano
-    import pandas as pd
     try:
-        pres_df = pd.read_csv("https://raw.githubusercontent.com/sidnei-almeida/monitoramento_sulamericano/refs/heads/main/presidentes.csv")
-        pres_df = pres_df[pres_df["pais"] == selected_country]
-        # Gráfico de linha do tempo dos mandatos presidenciais
-        import plotly.express as px
-        # Filtrar mandatos para o período 2000-2025
-        mandatos = pres_df.copy()
-        mandatos = mandatos[(mandatos["mandato_fim"] >= 2000) & (mandatos["mandato_inicio"] <= 2025)]
-        mandatos["inicio"] = pd.to_datetime(mandatos["mandato_inicio"].astype(str) + "-01-01")
-        mandatos["fim"] = pd.to_datetime(mandatos["mandato_fim"].astype(str) + "-12-31")
-        fig_timeline = px.timeline(
-            mandatos,
-            x_start="inicio",
-            x_end="fim",
-            y="presidente",
-            color="presidente",
-            color_discrete_sequence=[
-                "#D50032", # vermelho vivo
-                "#1e88e5", # azul tema
-                "#ffe600", # amarelo tema
-                "#43a047", # verde
-                "#8e24aa", # roxo
-                "#f4511e", # laranja
-                "#3949ab", # azul escuro
-                "#00bcd4", # turquesa
-                "#ff9800", # laranja vivo
-                "#c2185b", # magenta
-                "#388e3c"  # verde escuro
-            ],
-            hover_data={
-                "inicio": True,
-                "fim": True,
-                "presidente": True
-            }
-        )
-        fig_timeline.update_yaxes(autorange="reversed")
-        fig_timeline.update_traces(
-            opacity=0.95,
-            marker_line_width=0  # Remove contorno das barras
-        )
-        fig_timeline.update_layout(
-            plot_bgcolor="rgba(0,0,0,0)",
-            xaxis_title="Ano",
-            yaxis_title="Presidente",
-            height=260,
-            margin=dict(l=10, r=10, t=10, b=10),
-            font=dict(color="#1e3d59"),
-            showlegend=False,
-            yaxis=dict(showgrid=False),
-            xaxis=dict(
-                showgrid=True, gridcolor="#eee", zeroline=False,
-                tickformat="%Y",
-                ticks="outside",
-                ticklabelmode="period",
-                showline=True, linecolor="#bbb"
-            ),
-            dragmode='zoom',
-            hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
-            modebar=dict(orientation='v')
-        )
-        fig_timeline.update_layout(modebar_add=['zoom', 'pan', 'select', 'lasso2d', 'resetScale2d', 'toImage'])
-        fig_timeline.update_traces(opacity=0.95)
+        # Gráfico de linha do tempo dos mandatos presidenciais no período selecionado
+        fig_timeline = figures.presidents_timeline(carregar_presidentes(), selected_country, *year_range)
         # Removido: não adicionar labels de datas nos extremos para deixar só as barras
         st.plotly_chart(fig_timeline, use_container_width=True, config={"displayModeBar": True, "displaylogo": False, "modeBarButtonsToAdd": ["drawline","drawopenpath","drawrect","drawcircle","eraseshape"]})
 
@@ -392,78 +465,38 @@ if viz_mode == "País único":
     
     with col1:
         # Gráfico principal - evolução do indicador
-        fig = px.line(
-            country_data, 
-            x="date", 
-            y="value",
-            title=f"Evolução do {selected_indicator} para {selected_country}",
-            template="plotly_white",
-            markers=True,
-            color_discrete_sequence=["#D50032"]  # Rosa padrão
-        )
-
-        # Customizar eixo y para PIB
-        if selected_indicator == "NY.GDP.MKTP.CD":
-            max_val = country_data['value'].max()
-            if max_val >= 1e12:
-                fig.update_yaxes(tickformat=".2f", ticksuffix=" TRI")
-            elif max_val >= 1e9:
-                fig.update_yaxes(tickformat=".2f", ticksuffix=" BI")
-            elif max_val >= 1e6:
-                fig.update_yaxes(tickformat=".2f", ticksuffix=" MI")
-            else:
-                fig.update_yaxes(tickformat=",.0f")
-        
-        fig.update_layout(
-            xaxis_title="Data",
-            yaxis_title="Valor",
-            hovermode="x unified",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor='rgba(0,0,0,0)'),
-            height=450,
-            margin=dict(l=10, r=10, t=50, b=10),
-            plot_bgcolor="rgba(0,0,0,0)",
-            paper_bgcolor="rgba(0,0,0,0)",
-            font=dict(color="#f2f2f7"),
-            dragmode='zoom',
-            hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
-            xaxis=dict(showspikes=False, spikemode='across', spikesnap='cursor', showline=True, showgrid=True, zeroline=False, showticklabels=True, spikecolor='#cccccc', spikethickness=0.35, spikedash='solid'),
-            yaxis=dict(showspikes=False, spikemode='across', spikesnap='cursor', showline=True, showgrid=True, zeroline=False, showticklabels=True, spikecolor='#cccccc', spikethickness=0.35, spikedash='solid'),
-            modebar=dict(orientation='v')
-        )
-        fig.update_layout(modebar_add=['zoom', 'pan', 'select', 'lasso2d', 'resetScale2d', 'toImage'])
+        fig = figures.indicator_series(country_data, selected_indicator, selected_country)
+        # Revisões da última coleta para o país/indicador selecionado
+        revisoes = revisoes_recentes(dataset.version)
+        revisoes = revisoes[(revisoes["country"] == selected_country) & (revisoes["indicator"] == selected_indicator)]
+        if not revisoes.empty:
+            revisados = country_data[country_data["date"].dt.year.isin(revisoes["year"])]
+            fig.add_scatter(
+                x=revisados["date"], y=revisados["value"], mode="markers", name="Revisado",
+                marker=dict(size=13, symbol="circle-open", color="#ffe600", line=dict(width=2))
+            )
         st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": True, "displaylogo": False, "modeBarButtonsToAdd": ["drawline","drawopenpath","drawrect","drawcircle","eraseshape"]})
 
+        if not revisoes.empty:
+            with st.expander(f"🔁 {len(revisoes)} valor(es) revisado(s) na última coleta", expanded=False):
+                st.dataframe(
+                    pd.DataFrame({
+                        "Ano": revisoes["year"].to_numpy(),
+                        "Valor anterior": format_series(revisoes["previous"], selected_indicator).to_numpy(),
+                        "Valor revisado": format_series(revisoes["value"], selected_indicator).to_numpy(),
+                        "Coleta": revisoes["vintage"].dt.strftime("%d/%m/%Y %H:%M").to_numpy(),
+                    }),
+                    hide_index=True,
+                    use_container_width=True
+                )
+
         # Comparação com Média Regional
         # Calcular média regional por data (excluindo o país selecionado da média)
-        regional_mean = df[df['country'] != selected_country].groupby('date')[selected_indicator].mean().reset_index()
-        regional_mean = regional_mean.rename(columns={selected_indicator: 'Média Regional'})
-        # Dados do país
-        pais_data = country_data[['date', 'value']].rename(columns={'value': selected_country})
-        # Unir país e média regional
-        comp_df = pd.merge(pais_data, regional_mean, on='date', how='inner')
+        regional_mean = figures.regional_mean(dataset.cube[:, indicator_idx, window_years], country_idx)
+        own_present = ~np.isnan(series)
         # Exibir gráfico apenas se houver dados válidos
-        if not comp_df.empty and comp_df[selected_country].notna().any() and comp_df['Média Regional'].notna().any():
-            import plotly.graph_objects as go
-            fig_comp = go.Figure()
-            fig_comp.add_trace(go.Scatter(
-                x=comp_df['date'], y=comp_df[selected_country], mode='lines+markers', name=selected_country,
-                line=dict(color='#D50032', width=3)
-            ))
-            fig_comp.add_trace(go.Scatter(
-                x=comp_df['date'], y=comp_df['Média Regional'], mode='lines+markers', name='Média Regional',
-                line=dict(color='#43a047', width=3, dash='dash')
-            ))
-            fig_comp.update_layout(
-                title=f"{selected_indicator}: {selected_country} vs. Média Regional",
-                xaxis_title='Data',
-                yaxis_title='Valor',
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor='rgba(0,0,0,0)'),
-                height=400,
-                margin=dict(l=10, r=10, t=50, b=10),
-                plot_bgcolor="rgba(0,0,0,0)",
-                paper_bgcolor="rgba(0,0,0,0)",
-                font=dict(color="#f2f2f7")
-            )
+        if own_present.any() and (~np.isnan(regional_mean)).any():
+            fig_comp = figures.regional_comparison(dates, series, regional_mean, selected_indicator, selected_country)
             st.plotly_chart(fig_comp, use_container_width=True, key="pais_vs_regional")
         else:
             st.info(f"Não há dados suficientes para comparar {selected_country} com a média regional neste indicador.")
@@ -506,17 +539,11 @@ if viz_mode == "País único":
     with col2:
         # Métricas e estatísticas
         try:
-            # Encontrar o valor mais recente não-nulo
-            valid_values = country_data.dropna(subset=["value"])
-            if not valid_values.empty:
-                latest_row = valid_values.iloc[-1]
-                latest_value = latest_row["value"]
-                latest_year = latest_row["date"]
-            else:
-                latest_value = float('nan')
-                latest_year = "-"
-
-            previous_value = valid_values.iloc[-2]["value"] if len(valid_values) > 1 else None
+            # Valor mais recente e penúltimo valor não-nulos, já calculados na etapa de qualidade
+            latest_value = dq.latest[country_idx, indicator_idx]
+            latest_year = int(dq.last_year[country_idx, indicator_idx])
+            previous_value = dq.previous[country_idx, indicator_idx]
+            previous_value = None if np.isnan(previous_value) else previous_value
 
             # Calcular variação
             delta = None
@@ -525,7 +552,7 @@ if viz_mode == "País único":
                 delta = f"{delta:.2f}%"
             
             # Calcular o score de risco de investimento
-            risk_score = calculate_risk_score(df, selected_country)
+            risk_score = scores_risco(dataset.version, dataset, nowcast_method).get(selected_country)
             
             # Métrica principal do valor atualizado - ocupa toda a largura
             st.metric(
@@ -540,15 +567,9 @@ if viz_mode == "País único":
             
             # Exibir o score de risco com cor apropriada
             if risk_score is not None:
-                if risk_score < 30:
-                    risk_color = "green"
-                    risk_label = "Baixo Risco"
-                elif risk_score < 60:
-                    risk_color = "orange"
-                    risk_label = "Risco Moderado"
-                else:
-                    risk_color = "red"
-                    risk_label = "Alto Risco"
+                # Mesmas categorias dos alertas de risco (risk.CATEGORIES)
+                risk_label = risk_category(risk_score)
+                risk_color = {"Baixo Risco": "green", "Risco Moderado": "orange", "Alto Risco": "red"}[risk_label]
                 
                 # Título e card do score de risco
                 st.markdown(f"### Score de Risco de Investimento")
@@ -568,18 +589,22 @@ if viz_mode == "País único":
             # Espaço antes das estatísticas
             st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
             
-            # Estatísticas descritivas
+            # Estatísticas descritivas do período: média e desvio pelas somas acumuladas, extremos na fatia da série
             st.markdown("### Estatísticas")
-            stats = country_data["value"].describe()
+            st.caption(f"{year_range[0]} a {year_range[1]}")
+            sums = estatisticas_janela(dataset.version, dataset)
+            stats = window_stats.window(sums, dataset.cube, country_idx, indicator_idx, start_pos, end_pos)
+            # A mediana não tem estrutura incremental: sai direto da fatia do período
+            median = np.median(series[~np.isnan(series)]) if stats["count"] else np.nan
             
             # Criar DataFrame para as estatísticas
             stats_df = pd.DataFrame({
                 "Métrica": ["Média", "Mediana", "Mínimo", "Máximo", "Desvio Padrão"],
-                "Valor": [stats['mean'], stats['50%'], stats['min'], stats['max'], stats['std']]
+                "Valor": [float(stats['mean']), median, float(stats['min']), float(stats['max']), float(stats['std'])]
             })
             
             # Formatar valores
-            stats_df["Valor"] = stats_df["Valor"].apply(lambda x: format_number(x, selected_indicator))
+            stats_df["Valor"] = format_series(stats_df["Valor"], selected_indicator)
             
             # Mostrar tabela de estatísticas
             st.dataframe(
@@ -609,20 +634,198 @@ if viz_mode == "País único":
                 mime='text/csv'
             )
             
-            # Baixar dados em Excel
-            st.download_button(
-                label="Baixar dados em Excel",
-                data=to_excel(country_data),
-                file_name=f"dados_{selected_indicator}_{selected_country}.xlsx",
-                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
+            # Baixar dados em Excel (gerado só quando pedido, para não carregar o openpyxl em toda execução)
+            if st.button("Gerar arquivo Excel"):
+                st.download_button(
+                    label="Baixar dados em Excel",
+                    data=to_excel(country_data),
+                    file_name=f"dados_{selected_indicator}_{selected_country}.xlsx",
+                    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                )
         except Exception as e:
             if "not enough values to unpack" in str(e) or "index out of bounds" in str(e):
                 st.warning("⚠️ Sem dados suficientes para calcular as métricas")
             else:
                 st.warning(f"⚠️ Erro ao calcular métricas: {str(e)}")
 
+    # Composição do score de risco do país, parcela a parcela (o mesmo gráfico dos relatórios estáticos)
+    risk_parts = componentes_risco(dataset.version, dataset, nowcast_method)
+    if selected_country in risk_parts.index:
+        with st.expander("Composição do Score de Risco de Investimento", expanded=False):
+            st.plotly_chart(
+                figures.risk_breakdown(risk_parts.loc[selected_country], selected_country),
+                use_container_width=True,
+                key="composicao_risco"
+            )
+
+    # Situações semelhantes: países-ano do histórico mais próximos da situação atual do país
+    st.markdown("### Situações semelhantes no histórico")
+    features, feature_pos = situacoes_padronizadas(dataset.version, dataset)
+    situation, situation_pos = analogs.current_situation(features, feature_pos, country_idx)
+    if (situation_pos >= 0).sum() < analogs.MIN_SHARED:
+        st.info(f"{selected_country} não tem dados recentes em indicadores suficientes para buscar situações semelhantes.")
+    else:
+        analog_col1, analog_col2, analog_col3 = st.columns(3)
+        with analog_col1:
+            n_analogs = st.slider("Situações semelhantes", min_value=3, max_value=20, value=8)
+        with analog_col2:
+            horizon = st.slider("Anos seguintes", min_value=1, max_value=5, value=3)
+        with analog_col3:
+            own_history = st.checkbox(f"Incluir o histórico de {selected_country}", value=True)
+        # Candidatos: anos com ao menos um ano seguinte, fora dos anos que compõem a situação atual
+        exclude = np.zeros(features.shape[:2], dtype=bool)
+        exclude[:, -1] = True
+        if own_history:
+            exclude[country_idx, situation_pos[situation_pos >= 0].min():] = True
+        else:
+            exclude[country_idx] = True
+        analog_countries, analog_pos, distances = analogs.nearest(features, situation, n_analogs, exclude)
+        used_years = dataset.years[situation_pos[situation_pos >= 0]]
+        st.caption(
+            f"Comparação pelo valor mais recente de cada indicador de {selected_country} ({used_years.min()}"
+            f"{'' if used_years.min() == used_years.max() else f' a {used_years.max()}'}), padronizado pelo "
+            f"z-score de todos os países e anos; PIB em log e câmbio pela variação anual. Cada país-ano do "
+            f"histórico é montado da mesma forma, com valores de até {analogs.MAX_AGE} anos antes."
+        )
+
+        if len(analog_countries) == 0:
+            st.info("Nenhuma situação semelhante com indicadores suficientes em comum.")
+        else:
+            # O que veio depois: o indicador selecionado nos anos seguintes a cada situação semelhante
+            steps = np.arange(horizon + 1)
+            follow_pos = analog_pos[:, None] + steps
+            follow = np.full(follow_pos.shape, np.nan)
+            inside = follow_pos < len(dataset.years)
+            follow[inside] = dataset.cube[np.broadcast_to(analog_countries[:, None], follow_pos.shape)[inside], indicator_idx, follow_pos[inside]]
+            analog_labels = [
+                f"{dataset.countries[c]} {dataset.years[y]}" for c, y in zip(analog_countries, analog_pos)
+            ]
+            analog_df = pd.DataFrame({
+                "País": np.asarray(dataset.countries, dtype=object)[analog_countries],
+                "Ano": dataset.years[analog_pos],
+                "Distância": np.round(distances, 2),
+            })
+            for step in steps:
+                analog_df[f"{selected_indicator} (t{f'+{step}' if step else ''})"] = format_series(follow[:, step], selected_indicator).to_numpy()
+            st.dataframe(analog_df, hide_index=True, use_container_width=True)
+
+            # Trajetória a partir do ano da situação: variação % em valores monetários, diferença nos demais
+            entry = registry.lookup(selected_indicator)
+            relative = entry is not None and entry["format"] in ("currency", "exchange")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                paths = (follow / follow[:, :1] - 1) * 100 if relative else follow - follow[:, :1]
+            import plotly.graph_objects as go
+            fig_analog = go.Figure()
+            for label, path in zip(analog_labels, paths):
+                fig_analog.add_trace(go.Scatter(
+                    x=steps, y=path, mode="lines+markers", name=label, opacity=0.55, line=dict(width=1.5)
+                ))
+            has_path = ~np.isnan(paths)
+            median_path = np.array([np.median(paths[has_path[:, j], j]) if has_path[:, j].any() else np.nan for j in steps])
+            fig_analog.add_trace(go.Scatter(
+                x=steps, y=median_path, mode="lines+markers", name="Mediana", line=dict(color="#ffe600", width=4)
+            ))
+            fig_analog.update_layout(
+                title=f"{selected_indicator} nos anos seguintes às situações semelhantes",
+                xaxis_title="Anos depois da situação",
+                yaxis_title="Variação (%)" if relative else "Diferença em relação ao ano da situação",
+                xaxis=dict(tickmode="linear", dtick=1),
+                height=420,
+                margin=dict(l=10, r=10, t=50, b=10),
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#f2f2f7")
+            )
+            st.plotly_chart(fig_analog, use_container_width=True, key="situacoes_semelhantes")
+
+elif viz_mode == "Triagem de países":
+    import screener
+
+    st.markdown("### Triagem de países")
+    st.markdown("Combine condições em vários indicadores para encontrar os países que atendem todas elas.")
+
+    when = st.radio(
+        "Quando as condições devem valer",
+        screener.MODES,
+        format_func={
+            "latest": "No dado mais recente",
+            "any": f"Em algum ano de {year_range[0]} a {year_range[1]} (todas no mesmo ano)",
+            "all": f"Em todos os anos de {year_range[0]} a {year_range[1]}",
+        }.get,
+        horizontal=True
+    )
+    # Condições iniciais de exemplo, editáveis (linhas podem ser acrescentadas ou removidas)
+    examples = [
+        (label, "<", value) for label, value in [("Inflação (% anual)", 5.0), ("Desemprego (% força de trabalho)", 8.0)]
+        if label in dataset.indicators
+    ] or [(dataset.indicators[0], ">", 0.0)]
+    conditions_df = st.data_editor(
+        pd.DataFrame(examples, columns=["Indicador", "Operador", "Valor"]),
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Indicador": st.column_config.SelectboxColumn("Indicador", options=list(dataset.indicators), required=True),
+            "Operador": st.column_config.SelectboxColumn("Operador", options=list(screener.OPERATORS), required=True),
+            "Valor": st.column_config.NumberColumn("Valor", required=True),
+        },
+        key="condicoes_triagem"
+    )
+    conditions = [
+        screener.Condition(dataset.indicators.index(row.Indicador), row.Operador, float(row.Valor))
+        for row in conditions_df.dropna().itertuples()
+    ]
+    if not conditions:
+        st.info("Adicione ao menos uma condição.")
+        st.stop()
+
+    dq = qualidade(dataset.version, dataset)
+    if when == "latest":
+        selected = screener.screen_latest(indice_triagem(dataset.version, dataset), conditions)
+        matched = np.flatnonzero(selected)
+        result = pd.DataFrame({"País": np.asarray(dataset.countries, dtype=object)[matched]})
+        for condition in conditions:
+            label = dataset.indicators[condition.indicator]
+            result[f"{label} {condition.operator} {condition.value:g}"] = format_series(
+                dq.latest[matched, condition.indicator], label
+            ).to_numpy()
+            result[f"Ano ({label})"] = pd.array(dq.last_year[matched, condition.indicator], dtype="Int64")
+    else:
+        selected, year_mask = screener.screen_years(dataset.cube, conditions, start_pos, end_pos, when)
+        matched = np.flatnonzero(selected)
+        period_years = dataset.years[window_years]
+        # Ano mais recente do período em que todas as condições valem juntas
+        has_year = year_mask[matched].any(axis=1)
+        last_pos = year_mask.shape[1] - 1 - year_mask[matched, ::-1].argmax(axis=1)
+        result = pd.DataFrame({
+            "País": np.asarray(dataset.countries, dtype=object)[matched],
+            "Anos que atendem": year_mask[matched].sum(axis=1),
+            "Último ano que atende": pd.array(np.where(has_year, period_years[last_pos], -1), dtype="Int64"),
+        })
+        result.loc[~has_year, "Último ano que atende"] = pd.NA
+        for condition in conditions:
+            label = dataset.indicators[condition.indicator]
+            values = dataset.cube[matched, condition.indicator, start_pos + last_pos]
+            result[f"{label} {condition.operator} {condition.value:g}"] = format_series(
+                np.where(has_year, values, np.nan), label
+            ).to_numpy()
+
+    st.metric("Países que atendem", f"{len(matched)} de {len(dataset.countries)}")
+    if len(matched):
+        st.dataframe(result, hide_index=True, use_container_width=True)
+        st.download_button(
+            label="Baixar resultado (CSV)",
+            data=result.to_csv(index=False).encode("utf-8"),
+            file_name="triagem_paises.csv",
+            mime="text/csv"
+        )
+    else:
+        st.info("Nenhum país atende todas as condições.")
+
 else:  # Modo de comparação entre países
+    import plotly.express as px
+    import geometrias
+
     multi_countries = st.sidebar.multiselect(
         "Selecione países para comparar",
         sorted(df["country"].unique()),
@@ -635,39 +838,41 @@ else:  # Modo de comparação entre países
         st.warning("⚠️ Por favor, selecione pelo menos um país para visualizar os dados.")
         st.stop()
     
-    # Filtrar dados para múltiplos países
-    multi_data = df[df["country"].isin(multi_countries)].copy()
-    multi_data["date"] = pd.to_datetime(multi_data["date"])
-    
-    # Renomeando a coluna do indicador para facilitar o trabalho com os gráficos
-    multi_data = multi_data.rename(columns={selected_indicator: "value"})
-    
-    # Verificar se há dados disponíveis
-    if multi_data.empty:
-        st.error("❌ Não existem dados disponíveis no momento para os países selecionados.")
-        st.stop()
-    # Checar quais países não têm dados
-    missing_countries = [c for c in multi_countries if c not in multi_data['country'].unique()]
+    # Checar quais países não têm dados para o indicador (pela qualidade pré-calculada)
+    dq = qualidade(dataset.version, dataset)
+    indicator_idx = dataset.indicators.index(selected_indicator)
+    multi_idx = np.array([dataset.countries.index(c) for c in multi_countries])
+    has_data = dq.observations[multi_idx, indicator_idx] > 0
+    missing_countries = [c for c, ok in zip(multi_countries, has_data) if not ok]
     if missing_countries:
         st.warning(f"Os seguintes países não possuem dados disponíveis: **{', '.join(missing_countries)}**")
+
+    # Séries dos países selecionados no período (países × anos), lidas do cubo compartilhado em uma única indexação
+    dates = datas_da_versao(dataset.version, dataset)[window_years]
+    multi_block = dataset.cube[multi_idx, indicator_idx, window_years]
     
     # Visão por abas
-    compare_tabs = st.tabs(["Comparação Temporal", "Ranking", "Mapa", "Score de Risco", "Análise Estatística", "Correlação"])
+    compare_tabs = st.tabs(["Comparação Temporal", "Ranking", "Mapa", "Score de Risco", "Análise Estatística", "Correlação", "Qualidade dos Dados"])
     
     with compare_tabs[0]:
         # Gráfico de linha comparando países
-        fig_compare = px.line(
-            multi_data,
-            x="date",
-            y="value",
-            color="country",
-            title=f"Evolução comparativa de {selected_indicator}",
-            template="plotly_white",
-            markers=True,
-            hover_name="country"
+        # Uma série por país montada direto com graph_objects: o px.line leva ~1 s só para montar a figura com 200 países
+        import plotly.graph_objects as go
+        scatter = go.Scattergl if multi_block.size > 1000 else go.Scatter
+        fig_compare = go.Figure(
+            [
+                scatter(x=dates, y=multi_block[k], mode="lines+markers", name=country)
+                for k, country in enumerate(multi_countries) if has_data[k]
+            ],
+            # Template no construtor: aplicá-lo depois percorre todas as séries de novo
+            layout=dict(template="plotly_white")
         )
         
         fig_compare.update_layout(
+            title=f"Evolução comparativa de {selected_indicator}",
+            xaxis_title="date",
+            yaxis_title="value",
+            legend_title_text="country",
             plot_bgcolor="rgba(0,0,0,0)",
             paper_bgcolor="rgba(0,0,0,0)",
             font=dict(color="#f2f2f7"),
@@ -682,19 +887,26 @@ else:  # Modo de comparação entre países
         st.plotly_chart(fig_compare, use_container_width=True, config={"displayModeBar": True, "displaylogo": False, "modeBarButtonsToAdd": ["drawline","drawopenpath","drawrect","drawcircle","eraseshape"]})
 
         
-        # Análise de correlação
+        # Análise de correlação (submatriz das correlações país × país pré-calculadas, pairwise-complete)
         if len(multi_countries) > 1:
-            pivot_df = multi_data.pivot(index='date', columns='country', values='value').reset_index()
-            pivot_df = pivot_df.dropna()
+            country_corr = correlacoes_paises(dataset.version, dataset)
+            indicator_idx = dataset.indicators.index(selected_indicator)
+            corr_countries = sorted(c for c in multi_countries if c in dataset.countries)
+            corr_idx = [dataset.countries.index(c) for c in corr_countries]
+            corr_matrix = pd.DataFrame(
+                country_corr[indicator_idx][np.ix_(corr_idx, corr_idx)],
+                index=corr_countries,
+                columns=corr_countries
+            )
+            corr_matrix = corr_matrix.dropna(how="all").dropna(axis=1, how="all")
             
-            if not pivot_df.empty and len(pivot_df) > 1:
-                corr_matrix = pivot_df.drop(columns=['date']).corr()
-                
+            if len(corr_matrix) > 1:
                 fig_corr = px.imshow(
                     corr_matrix,
                     template="plotly_white",
                     color_continuous_scale="viridis",
-                    text_auto=True,
+                    # Com muitos países os rótulos de cada célula ficam ilegíveis e pesam no envio da figura
+                    text_auto=len(corr_matrix) <= 20,
                     title="Mapa de Calor das Correlações"
                 )
                 
@@ -713,10 +925,69 @@ else:  # Modo de comparação entre países
                 st.plotly_chart(fig_corr, use_container_width=True, config={"displayModeBar": True, "displaylogo": False, "modeBarButtonsToAdd": ["drawline","drawopenpath","drawrect","drawcircle","eraseshape"]})
                 
                 st.info("Interpretação: Valores próximos a 1 indicam forte correlação positiva, -1 indica forte correlação negativa, e 0 indica ausência de correlação.")
+
+            # Correlação móvel entre pares de países
+            st.markdown("#### Correlação móvel entre países")
+            window = st.slider("Janela da correlação móvel (anos)", min_value=3, max_value=15, value=8)
+            rolling_corr = correlacao_movel(dataset.version, dataset, indicator_idx, window)
+            # Limite de pares exibidos para manter o gráfico legível
+            pairs = list(combinations(range(len(corr_idx)), 2))[:15]
+            rolling_df = pd.DataFrame(
+                {
+                    f"{corr_countries[a]} × {corr_countries[b]}": rolling_corr[:, corr_idx[a], corr_idx[b]]
+                    for a, b in pairs
+                },
+                index=pd.to_datetime(dataset.years.astype(str), format="%Y")
+            ).iloc[window_years].dropna(how="all")
+
+            if not rolling_df.empty:
+                fig_rolling = px.line(
+                    rolling_df,
+                    title=f"Correlação móvel de {window} anos - {selected_indicator}",
+                    template="plotly_white",
+                    markers=True
+                )
+                fig_rolling.update_layout(
+                    xaxis_title="Fim da janela",
+                    yaxis_title="Correlação",
+                    yaxis=dict(range=[-1, 1]),
+                    legend_title_text="Par de países",
+                    plot_bgcolor="rgba(0,0,0,0)",
+                    paper_bgcolor="rgba(0,0,0,0)",
+                    font=dict(color="#f2f2f7"),
+                    legend_bgcolor='rgba(0,0,0,0)',
+                    hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
+                    height=400
+                )
+                st.plotly_chart(fig_rolling, use_container_width=True, key="corr_movel")
+            else:
+                st.info(f"Não há anos em comum suficientes para uma janela de {window} anos.")
                 
     with compare_tabs[1]:
         # Ranking e comparações estáticas
-        latest_values = multi_data.sort_values('date').groupby('country').last().reset_index()
+        # Valor mais recente de cada país até o fim do período e o ano em que foi medido
+        if end_pos == len(dataset.years) - 1:
+            # Período até o último ano: já calculado na etapa de qualidade
+            ranked = has_data
+            last_values = dq.latest[multi_idx[ranked], indicator_idx]
+            last_years = dq.last_year[multi_idx[ranked], indicator_idx].astype(int)
+        else:
+            present = ~np.isnan(multi_block)
+            ranked = present.any(axis=1)
+            last_pos = present.shape[1] - 1 - present[:, ::-1].argmax(axis=1)
+            last_values = multi_block[np.flatnonzero(ranked), last_pos[ranked]]
+            last_years = dataset.years[start_pos + last_pos[ranked]]
+        latest_values = pd.DataFrame({
+            "country": np.asarray(multi_countries)[ranked],
+            "value": last_values,
+            "date": last_years,
+        })
+        if nowcast_method is not None:
+            # Todos os países no fim do período, com os valores projetados marcados como estimados
+            values, estimated = estimativas(dataset.version, dataset, nowcast_method)
+            latest_values["value"] = values[multi_idx[ranked], indicator_idx, end_pos]
+            latest_values["date"] = int(dataset.years[end_pos])
+            latest_values["estimated"] = np.where(estimated[multi_idx[ranked], indicator_idx, end_pos], "Sim", "Não")
         
         # Gráfico de barras para ranking
         fig_rank = px.bar(
@@ -751,91 +1022,151 @@ else:  # Modo de comparação entre países
 
         
         # Tabela de ranking
-        rank_table = latest_values[["country", "value", "date"]].copy()
-        rank_table["Ranking"] = range(1, len(rank_table) + 1)
-        rank_table = rank_table[["Ranking", "country", "value", "date"]]
-        rank_table.columns = ["Ranking", "País", "Valor", "Data da Medição"]
+        # Mesmos arrays de latest_values, só com os nomes de exibição
+        rank_table = pd.DataFrame({
+            "Ranking": np.arange(1, len(latest_values) + 1),
+            **dict(zip(["País", "Valor", "Data da Medição", "Estimado"], (latest_values[col].to_numpy() for col in latest_values)))
+        }, copy=False)
         
         st.dataframe(
             rank_table,
             hide_index=True,
             use_container_width=True
         )
+
+        # Posição ao longo do tempo (bump chart), entre todos os países da região
+        st.markdown("#### Posição ao longo do tempo")
+        rank_by = st.radio("Posição por", [selected_indicator, "Score de risco"], horizontal=True)
+        indicator_ranks, risk_ranks = posicoes_por_ano(dataset.version, dataset)
+        if rank_by == "Score de risco":
+            rank_block = risk_ranks[multi_idx, window_years]
+            st.caption(f"1º = menor score de risco entre os {len(dataset.countries)} países, com os dados disponíveis até cada ano.")
+        else:
+            rank_block = indicator_ranks[multi_idx, indicator_idx, window_years]
+            st.caption(f"1º = maior valor de {selected_indicator} entre os países com dado no ano ({len(dataset.countries)} na região).")
+        fig_bump = go.Figure(
+            [
+                go.Scatter(x=dates, y=rank_block[k], mode="lines+markers", name=country, connectgaps=False)
+                for k, country in enumerate(multi_countries) if not np.isnan(rank_block[k]).all()
+            ],
+            layout=dict(template="plotly_white")
+        )
+        fig_bump.update_layout(
+            title=f"Posição por ano - {rank_by}",
+            xaxis_title="Ano",
+            yaxis=dict(title="Posição", autorange="reversed", tickformat="d"),
+            legend_title_text="País",
+            height=450,
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(0,0,0,0)",
+            font=dict(color="#f2f2f7"),
+            legend_bgcolor='rgba(0,0,0,0)',
+            hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif")
+        )
+        st.plotly_chart(fig_bump, use_container_width=True, key="posicoes")
     
     with compare_tabs[2]:
         # Visualização em mapa
-        geo_data = {
-            "Argentina": (-38.416097, -63.616672),
-            "Bolivia": (-16.290154, -63.588653),
-            "Brazil": (-14.235004, -51.92528),
-            "Chile": (-35.675147, -71.542969),
-            "Colombia": (4.570868, -74.297333),
-            "Ecuador": (-2.897533, -78.979733),
-            "Guyana": (4.860416, -58.930180),
-            "Paraguay": (-23.442503, -58.443833),
-            "Peru": (-9.189967, -75.015152),
-            "Suriname": (3.919305, -56.027783),
-            "Uruguay": (-32.522779, -55.765835),
-            "Venezuela": (6.423750, -66.589730)
-        }
+        geo_data = coordenadas_paises(REGION)
         
         # Filtrar apenas os países selecionados
         filtered_geo = {country: geo_data[country] for country in multi_countries if country in geo_data}
         
         # Verificar países sem dados
-        countries_without_data = []
-        countries_with_data = []
-        
-        for country in filtered_geo.keys():
-            country_data = latest_values[latest_values['country'] == country]
-            if len(country_data) == 0:
-                countries_without_data.append(country)
-            else:
-                countries_with_data.append(country)
+        latest_by_country = latest_values.set_index('country')['value']
+        countries_with_data = [country for country in filtered_geo if country in latest_by_country.index]
+        countries_without_data = [country for country in filtered_geo if country not in latest_by_country.index]
         
         if countries_without_data:
-            st.error(f"❌ Erro: Os seguintes países não possuem dados disponíveis para este indicador: {', '.join(countries_without_data)}")
-            st.stop()
-        
-        # Criar DataFrame apenas com países que têm dados
-        map_df = pd.DataFrame({
-            'country': countries_with_data,
-            'lat': [lat for country, (lat, lon) in filtered_geo.items() if country in countries_with_data],
-            'lon': [lon for country, (lat, lon) in filtered_geo.items() if country in countries_with_data],
-            'value': [latest_values[latest_values['country'] == country]['value'].iloc[0] 
-                     for country in countries_with_data]
-        })
-        # Filtrar valores nulos (NaN) para evitar erro no mapa
-        map_df = map_df.dropna(subset=['value'])
-        # Para o parâmetro size, só valores positivos e válidos
-        map_df['size'] = pd.to_numeric(map_df['value'], errors='coerce')
-        map_df.loc[map_df['size'] <= 0, 'size'] = None
-        map_df = map_df.dropna(subset=['size'])
-        
-        # Criar mapa apenas com países que têm dados válidos
-        fig_map = px.scatter_mapbox(
-            map_df,
-            lat="lat",
-            lon="lon",
-            size="size",
-            color="value",
-            color_continuous_scale="viridis",
-            size_max=50,
-            zoom=3,
-            title="Distribuição Geográfica dos Valores",
-            hover_name="country"
-        )
+            # Aviso em vez de interromper a página: as demais abas continuam disponíveis
+            st.warning(f"Os seguintes países não possuem dados disponíveis para este indicador e ficam fora do mapa: {', '.join(countries_without_data)}")
         
-        fig_map.update_layout(
-            mapbox_style="carto-positron",
-            margin=dict(l=0, r=0, t=50, b=0),
-            dragmode='zoom',
-            hovermode='closest',
-            hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
-            modebar=dict(orientation='v')
-        )
-        fig_map.update_layout(modebar_add=['zoom', 'pan', 'select', 'lasso2d', 'resetScale2d', 'toImage'])
-        st.plotly_chart(fig_map, use_container_width=True, config={"displayModeBar": True, "displaylogo": False, "modeBarButtonsToAdd": ["drawline","drawopenpath","drawrect","drawcircle","eraseshape"]})
+        map_type = st.radio("Tipo de mapa", ["Contornos", "Pontos"], horizontal=True)
+        if map_type == "Contornos":
+            detail = st.select_slider(
+                "Detalhe dos contornos", ["Automático", "baixo", "medio", "alto"],
+                format_func=lambda level: {"medio": "médio"}.get(level, level)
+            )
+            iso3 = codigos_paises(REGION)
+            map_values = latest_by_country.reindex(countries_with_data).dropna()
+            level = geometrias.level_for(len(map_values)) if detail == "Automático" else detail
+            drawn = paises_com_contorno(level)
+            has_shape = np.array([iso3.get(country) in drawn for country in map_values.index], dtype=bool)
+            shaped, without_shape = map_values[has_shape], map_values[~has_shape]
+
+            fig_map = go.Figure(go.Choropleth(
+                # Só a URL vai na figura: o navegador baixa o arquivo uma vez e o reaproveita a cada reexecução
+                geojson=geometrias.url(level),
+                locations=[iso3[country] for country in shaped.index],
+                z=shaped.to_numpy(),
+                text=shaped.index,
+                hovertemplate="<b>%{text}</b><br>%{z:,.2f}<extra></extra>",
+                coloraxis="coloraxis",
+                marker_line_width=0.5,
+                marker_line_color="white"
+            ))
+            if len(without_shape):
+                # Países pequenos demais para o contorno simplificado aparecem como pontos
+                fig_map.add_trace(go.Scattergeo(
+                    lat=[filtered_geo[country][0] for country in without_shape.index],
+                    lon=[filtered_geo[country][1] for country in without_shape.index],
+                    text=without_shape.index,
+                    marker=dict(size=9, color=without_shape.to_numpy(), coloraxis="coloraxis"),
+                    hovertemplate="<b>%{text}</b><br>%{marker.color:,.2f}<extra></extra>",
+                    showlegend=False
+                ))
+            fig_map.update_geos(
+                fitbounds="locations",
+                visible=False,
+                showcountries=False,
+                projection_type="natural earth"
+            )
+            fig_map.update_layout(
+                title="Distribuição Geográfica dos Valores",
+                coloraxis=dict(colorscale="viridis", colorbar=dict(title=None)),
+                margin=dict(l=0, r=0, t=50, b=0),
+                hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif")
+            )
+            st.plotly_chart(fig_map, use_container_width=True, config={"displaylogo": False})
+        else:
+            # Criar DataFrame apenas com países que têm dados
+            map_df = pd.DataFrame({
+                'country': countries_with_data,
+                'lat': [filtered_geo[country][0] for country in countries_with_data],
+                'lon': [filtered_geo[country][1] for country in countries_with_data],
+                'value': latest_by_country.reindex(countries_with_data).to_numpy()
+            })
+            # Filtrar valores nulos (NaN) para evitar erro no mapa
+            map_df = map_df.dropna(subset=['value'])
+            # Para o parâmetro size, só valores positivos e válidos
+            map_df['size'] = pd.to_numeric(map_df['value'], errors='coerce')
+            map_df.loc[map_df['size'] <= 0, 'size'] = None
+            map_df = map_df.dropna(subset=['size'])
+            
+            # Criar mapa apenas com países que têm dados válidos
+            fig_map = px.scatter_mapbox(
+                map_df,
+                lat="lat",
+                lon="lon",
+                size="size",
+                color="value",
+                color_continuous_scale="viridis",
+                size_max=50,
+                zoom=3,
+                title="Distribuição Geográfica dos Valores",
+                hover_name="country"
+            )
+            
+            fig_map.update_layout(
+                mapbox_style="carto-positron",
+                margin=dict(l=0, r=0, t=50, b=0),
+                dragmode='zoom',
+                hovermode='closest',
+                hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
+                modebar=dict(orientation='v')
+            )
+            fig_map.update_layout(modebar_add=['zoom', 'pan', 'select', 'lasso2d', 'resetScale2d', 'toImage'])
+            st.plotly_chart(fig_map, use_container_width=True, config={"displayModeBar": True, "displaylogo": False, "modeBarButtonsToAdd": ["drawline","drawopenpath","drawrect","drawcircle","eraseshape"]})
 
     with compare_tabs[3]:
         # Aba de Score de Risco
@@ -843,32 +1174,19 @@ else:  # Modo de comparação entre países
         st.markdown("O score de risco é calculado com base em diversos indicadores econômicos e representa uma estimativa do risco relativo de investimento em cada país. Valores mais baixos indicam menor risco.")
         
         # Calcular score de risco para cada país
-        risk_scores = []
-        for country in multi_countries:
-            score = calculate_risk_score(df, country)
-            if score is not None:
-                risk_scores.append({"country": country, "risk_score": score})
+        all_scores = scores_risco(dataset.version, dataset, nowcast_method)
+        risk_scores = [
+            {"country": country, "risk_score": all_scores[country]}
+            for country in multi_countries if country in all_scores.index
+        ]
         
         # Criar DataFrame com os scores
         if risk_scores:
             risk_df = pd.DataFrame(risk_scores)
             risk_df = risk_df.sort_values("risk_score")
             
-            # Definir cores conforme o nível de risco
-            colors = []
-            risk_categories = []
-            for score in risk_df["risk_score"]:
-                if score < 30:
-                    colors.append("#4CAF50")  # Verde para baixo risco
-                    risk_categories.append("Baixo Risco")
-                elif score < 60:
-                    colors.append("#FF9800")  # Laranja para risco moderado
-                    risk_categories.append("Risco Moderado")
-                else:
-                    colors.append("#F44336")  # Vermelho para alto risco
-                    risk_categories.append("Alto Risco")
-            
-            risk_df["category"] = risk_categories
+            # Categoria de cada país pelos limites de risk.CATEGORIES (as cores ficam no gráfico)
+            risk_df["category"] = risk_df["risk_score"].map(risk_category)
             
             # Criar gráfico de barras horizontais
             fig_risk = px.bar(
@@ -931,7 +1249,7 @@ else:  # Modo de comparação entre países
             # Tabela de scores de risco com formatação condicional
             st.subheader("Detalhamento dos Scores de Risco")
             # Adicionar coluna formatada para score
-            risk_df["score_formatted"] = risk_df["risk_score"].apply(lambda x: format_number(x, "RISK_SCORE"))
+            risk_df["score_formatted"] = format_series(risk_df["risk_score"], "RISK_SCORE")
             display_df = risk_df[["country", "score_formatted", "category"]].rename(columns={"country": "País", "score_formatted": "Score", "category": "Categoria"})
             
             # Exibir tabela com formatação condicional
@@ -955,17 +1273,32 @@ else:  # Modo de comparação entre países
     
     with compare_tabs[4]:
         # Análise estatística comparativa
-        pivot_data = multi_data.pivot_table(
-            index="date",
-            columns="country",
-            values="value"
-        ).reset_index()
+        # Anos × países: a transposta das séries já lidas do cubo, sem pivot_table
+        pivot_data = pd.DataFrame(multi_block.T, columns=multi_countries, copy=False)
+        pivot_data.insert(0, "date", dates)
         
         st.dataframe(
             pivot_data,
             use_container_width=True,
             height=500
         )
+
+        # Estatísticas do período por país (somas acumuladas; mínimo e máximo só na fatia dos países selecionados)
+        sums = estatisticas_janela(dataset.version, dataset)
+        period_stats = window_stats.window(sums, dataset.cube, multi_idx, indicator_idx, start_pos, end_pos)
+        st.markdown(f"#### Estatísticas de {year_range[0]} a {year_range[1]}")
+        st.dataframe(
+            pd.DataFrame({
+                "País": multi_countries,
+                "Anos com dado": period_stats["count"],
+                "Média": format_series(period_stats["mean"], selected_indicator).to_numpy(),
+                "Desvio Padrão": format_series(period_stats["std"], selected_indicator).to_numpy(),
+                "Mínimo": format_series(period_stats["min"], selected_indicator).to_numpy(),
+                "Máximo": format_series(period_stats["max"], selected_indicator).to_numpy(),
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
         
         # Download dos dados
         st.download_button(
@@ -976,14 +1309,15 @@ else:  # Modo de comparação entre países
         )
     
     # Correlação entre indicadores
-    with compare_tabs[4]:
+    with compare_tabs[5]:
         st.markdown("### Matriz de Correlação dos Indicadores Econômicos")
-        # Selecionar indicadores para correlação
-        corr_indicators = [col for col in df.columns if col not in ['country', 'date']]
-        corr_df = multi_data.pivot_table(index=["country", "date"], values="value").reset_index()
-        corr_df = df[df["country"].isin(multi_countries)].copy()
-        corr_matrix = corr_df[corr_indicators].corr()
-        import plotly.express as px
+        # Calculada só sobre a fatia dos países selecionados (pairwise-complete)
+        corr_idx = [dataset.countries.index(c) for c in multi_countries if c in dataset.countries]
+        corr_matrix = pd.DataFrame(
+            correlations.indicator_correlation(dataset.cube, corr_idx),
+            index=list(dataset.indicators),
+            columns=list(dataset.indicators)
+        )
         fig_corr = px.imshow(
             corr_matrix,
             text_auto=True,
@@ -992,13 +1326,57 @@ else:  # Modo de comparação entre países
         )
         st.plotly_chart(fig_corr, use_container_width=True)
 
+    with compare_tabs[6]:
+        st.markdown("### Cobertura dos Dados")
+        # Mapa de calor país × indicador com a fração dos anos com dado
+        coverage = pd.DataFrame(
+            dq.coverage[multi_idx] * 100,
+            index=multi_countries,
+            columns=list(dataset.indicators)
+        )
+        fig_coverage = px.imshow(
+            coverage,
+            color_continuous_scale="RdYlGn",
+            zmin=0,
+            zmax=100,
+            aspect="auto",
+            labels=dict(color="Cobertura (%)"),
+            text_auto=".0f" if len(multi_countries) <= 20 else False,
+            title=f"Cobertura de {dataset.years[0]} a {dataset.years[-1]} (% dos anos com dado)"
+        )
+        fig_coverage.update_traces(
+            customdata=np.stack([dq.last_year[multi_idx], dq.longest_gap[multi_idx]], axis=-1),
+            hovertemplate="%{y} - %{x}<br>Cobertura: %{z:.0f}%<br>Dado mais recente: %{customdata[0]}<br>Maior lacuna: %{customdata[1]} anos<extra></extra>"
+        )
+        fig_coverage.update_layout(height=max(300, 28 * len(multi_countries) + 150), margin=dict(l=10, r=10, t=50, b=10))
+        st.plotly_chart(fig_coverage, use_container_width=True)
+
+        # Detalhes do indicador selecionado: lacunas, defasagem e valores atípicos (z-score robusto)
+        outlier_years = [
+            ", ".join(str(year) for year in dataset.years[dq.outliers[c, indicator_idx]]) or "-"
+            for c in multi_idx
+        ]
+        st.dataframe(
+            pd.DataFrame({
+                "País": multi_countries,
+                "Cobertura (%)": np.round(dq.coverage[multi_idx, indicator_idx] * 100, 1),
+                "Lacunas": dq.gaps[multi_idx, indicator_idx],
+                "Maior lacuna (anos)": dq.longest_gap[multi_idx, indicator_idx],
+                "Dado mais recente": pd.array(dq.last_year[multi_idx, indicator_idx], dtype="Int64"),
+                "Anos atípicos": outlier_years,
+            }),
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption(f"Valores atípicos: |z-score robusto| acima de {quality.OUTLIER_THRESHOLD} (mediana e MAD da série de cada país).")
+
 # Rodapé com informações técnicas
 st.markdown("---")
 col1, col2, col3 = st.columns(3)
 
 with col1:
     st.markdown("### Fonte de Dados")
-    st.markdown("World Bank API - Indicadores Econômicos da América do Sul")
+    st.markdown(f"World Bank API - Indicadores Econômicos - {REGION_NAME}")
 
 with col2:
     st.markdown("### Metodologia")
@@ -1011,13 +1389,9 @@ with col3:
 # Expandir para informações detalhadas sobre os indicadores e metodologia
 with st.expander("ℹ️ Informações sobre os Indicadores"):
     indicators_info = {
-        "NY.GDP.MKTP.CD": "**PIB (US$ atual)** - Produto Interno Bruto em dólares americanos correntes.",
-        "FP.CPI.TOTL.ZG": "**Inflação (% anual)** - Variação percentual anual do índice de preços ao consumidor.",
-        "FR.INR.RINR": "**Taxa de juros real (%)** - Taxa de juros ajustada pela inflação medida pelo deflator do PIB.",
-        "SL.UEM.TOTL.ZS": "**Desemprego (% força de trabalho)** - Porcentagem da força de trabalho que está sem trabalho, mas disponível e buscando emprego.",
-        "PA.NUS.FCRF": "**Taxa de câmbio (LCU por US$)** - Taxa de câmbio oficial determinada pela autoridade nacional.",
-        "RISK_SCORE": "**Score de Risco de Investimento** - Índice composto que avalia o risco relativo de investimento com base em indicadores econômicos. Escala de 0 (menor risco) a 100 (maior risco)."
+        entry["code"]: f"**{entry['label']}** - {entry['description']}" for entry in registry.REGISTRY
     }
+    indicators_info["RISK_SCORE"] = "**Score de Risco de Investimento** - Índice composto que avalia o risco relativo de investimento com base em indicadores econômicos. Escala de 0 (menor risco) a 100 (maior risco)."
     
     for ind_code, ind_desc in indicators_info.items():
         st.markdown(f"**{ind_code}**: {ind_desc}")
@@ -1031,16 +1405,18 @@ with st.expander("💸 Metodologia do Score de Risco de Investimento"):
     
     | Indicador | Descrição | Peso | Impacto |
     | --- | --- | --- | --- |
-    | PIB | Produto Interno Bruto | -0.30 | Negativo (maior PIB = menor risco) |
-    | Inflação | Variação percentual anual do IPC | 0.25 | Positivo (maior inflação = maior risco) |
-    | Taxa de Juros Real | Taxa ajustada pela inflação | 0.20 | Positivo (maior taxa = maior risco) |
-    | Desemprego | % da força de trabalho sem emprego | 0.25 | Positivo (maior desemprego = maior risco) |
+    """ + "\n".join(
+        f"    | {entry['label']} | {entry['description']} | {entry['risk_weight']:.2f} | "
+        + ("Negativo (maior valor = menor risco)" if entry["risk_weight"] < 0 else "Positivo (maior valor = maior risco)")
+        + " |"
+        for entry in registry.REGISTRY if entry["risk_weight"] != 0
+    ) + """
     
     #### Cálculo do Score
     
-    1. Para cada indicador, calculamos o desvio percentual do país em relação à média regional
-    2. Aplicamos os pesos a esses desvios (limitando o impacto máximo)
-    3. Somamos a um valor base (50) para obter um score entre 0 e 100
+    1. Para cada indicador, posicionamos o valor mais recente do país em um percentil (0-100) entre os países
+    2. Multiplicamos o percentil pelo peso do indicador e somamos ajustes para valores extremos (inflação > 50%, desemprego > 15%, PIB < US$ 100 BI)
+    3. Somamos a um valor base (35) e limitamos o resultado entre 0 e 100
     
     #### Interpretação
     
@@ -0,0 +1,133 @@
+"""
+Alocação de memória por reexecução do app.py, medida com tracemalloc.
+
+Publica um conjunto sintético em um snapshot temporário, executa o app.py com o AppTest do Streamlit
+nos dois modos e, depois de aquecer os caches, mede em cada reexecução (com seleções aleatórias),
+só durante a execução do script (sem a compilação e a leitura dos elementos feitas pelo AppTest):
+    pico     maior volume alocado acima do início da reexecução (working set transitório da sessão)
+    retido   o que continua alocado ao fim da reexecução
+
+Falha (código de saída 1) se a mediana do pico de algum modo passar do orçamento.
+
+Uso:
+    python benchmark_alocacoes.py [--countries 50] [--years 26] [--reruns 10] [--budget-mb 16]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import tracemalloc
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+# Orçamento (MB) para a mediana do pico de alocação por reexecução
+BUDGET_MB = 16
+
+
+def _script_tracer(results):
+    """
+    Função de rastreamento que registra (pico, retido) de cada execução do módulo app.py.
+
+    O rastreamento por linha fica restrito ao frame do módulo; as demais chamadas só passam pelo
+    filtro do evento "call".
+    """
+    def trace(frame, event, arg):
+        if event != "call" or frame.f_code.co_name != "<module>" or frame.f_code.co_filename != APP_PATH:
+            return None
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+
+        def on_module_event(frame, event, arg):
+            # "return" também ocorre quando o script termina com st.stop()
+            if event == "return":
+                current, peak = tracemalloc.get_traced_memory()
+                results.append((peak - start, current - start))
+            return on_module_event
+        return on_module_event
+    return trace
+
+
+def measure_mode(mode, countries, indicators, reruns, seed):
+    """
+    Retorna as listas (pico, retido) em bytes das reexecuções de um modo.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.query_params["modo"] = mode
+
+    def select():
+        at.selectbox[0].set_value(rng.choice(indicators))
+        if mode == "pais":
+            at.selectbox[1].set_value(rng.choice(countries))
+        else:
+            at.multiselect[0].set_value(rng.sample(countries, min(8, len(countries))))
+
+    # Aquecimento: a primeira execução preenche os caches do processo (snapshot, derivados, imports)
+    at.run()
+    select()
+    at.run()
+
+    # Cada execução do AppTest roda o script em uma thread nova, que herda o rastreamento
+    results = []
+    threading.settrace(_script_tracer(results))
+    try:
+        for _ in range(reruns):
+            select()
+            at.run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].value)
+    finally:
+        threading.settrace(None)
+    return [peak for peak, _ in results], [kept for _, kept in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alocação de memória por reexecução do dashboard")
+    parser.add_argument("--countries", type=int, default=50)
+    parser.add_argument("--years", type=int, default=26)
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-mb", type=float, default=BUDGET_MB)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Os módulos do dashboard leem os diretórios do ambiente na importação
+        os.environ["DASHBOARD_SNAPSHOT_DIR"] = os.path.join(tmp_dir, "snapshot")
+        os.environ["DASHBOARD_VINTAGE_DIR"] = os.path.join(tmp_dir, "vintages")
+        os.environ["DASHBOARD_SERIES_DIR"] = os.path.join(tmp_dir, "series")
+        os.environ["DASHBOARD_ALERT_DIR"] = os.path.join(tmp_dir, "alerts")
+        import snapshot
+        from benchmark_escala import _synthetic_data
+
+        df = _synthetic_data(args.countries, args.years, seed=args.seed)
+        snapshot.publish(df)
+        countries = sorted(df["country"].unique())
+        indicators = [col for col in df.columns if col not in ["country", "date"]]
+
+        tracemalloc.start()
+        print(f"{'modo':>10} | {'pico p50 (MB)':>13} | {'pico máx. (MB)':>14} | {'retido p50 (KB)':>15}")
+        over_budget = False
+        for mode in ["pais", "comparacao"]:
+            peaks, retained = measure_mode(mode, countries, indicators, args.reruns, args.seed)
+            peak_mb = statistics.median(peaks) / 2 ** 20
+            over_budget = over_budget or peak_mb > args.budget_mb
+            print(
+                f"{mode:>10} | {peak_mb:>13.2f} | {max(peaks) / 2 ** 20:>14.2f} | "
+                f"{statistics.median(retained) / 2 ** 10:>15.1f}"
+            )
+        tracemalloc.stop()
+
+    if over_budget:
+        print(f"[ERRO] Pico de alocação por reexecução acima do orçamento de {args.budget_mb:.0f} MB")
+        sys.exit(1)
+    print(f"OK: pico de alocação por reexecução dentro do orçamento de {args.budget_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark de escala: latência por execução do app.py conforme cresce o número de países.
+
+Para cada tamanho, gera um conjunto sintético (países × indicadores × anos), publica-o em um
+snapshot temporário e executa o app.py com o AppTest do Streamlit, nos dois modos, medindo a
+latência das reexecuções com seleções aleatórias. Cada tamanho roda em um subprocesso
+separado para não compartilhar caches.
+
+Uso:
+    python benchmark_escala.py [--countries 12 50 100 200] [--extra-indicators 0] [--years 60] [--reruns 5]
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Meta de latência por reexecução (segundos)
+TARGET_SECONDS = 1.0
+
+
+def _write_registry(path, extra_indicators):
+    """
+    Copia o registro de indicadores acrescentando indicadores sintéticos (sem peso no score).
+    """
+    from registry import load_registry
+
+    entries = load_registry()
+    fields = ["code", "label", "unit", "format", "risk_weight", "source", "description"]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow({field: entry[field] for field in fields})
+        for i in range(extra_indicators):
+            writer.writerow({
+                "code": f"SINT.{i:03d}", "label": f"Indicador sintético {i:03d}", "unit": "",
+                "format": "default", "risk_weight": 0, "source": 2, "description": "Indicador sintético"
+            })
+
+
+def _synthetic_data(n_countries, years, seed=0):
+    """
+    DataFrame no formato de fetch_all_indicators com países sintéticos (os 12 da América do Sul primeiro).
+    """
+    import numpy as np
+    import pandas as pd
+    from data_api import COUNTRIES, INDICATORS
+
+    rng = np.random.default_rng(seed)
+    countries = list(COUNTRIES)[:n_countries] + [f"País {i:03d}" for i in range(len(COUNTRIES), n_countries)]
+    dates = pd.to_datetime([str(y) for y in range(2025 - years + 1, 2026)], format="%Y")
+
+    df = pd.DataFrame({
+        "country": np.repeat(countries, len(dates)),
+        "date": np.tile(dates, len(countries)),
+    })
+    for label, code in INDICATORS.items():
+        values = rng.normal(10, 5, len(df))
+        if code == "NY.GDP.MKTP.CD":
+            values = np.abs(values) * 1e10
+        # ~10% de lacunas
+        values[rng.random(len(df)) < 0.1] = np.nan
+        df[label] = values
+    return df
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def run_worker(n_countries, extra_indicators, years, reruns, select):
+    """
+    Executa o benchmark de um tamanho no processo atual (ambiente já configurado) e imprime um JSON.
+    """
+    import random
+
+    from streamlit.testing.v1 import AppTest
+
+    import snapshot
+
+    df = _synthetic_data(n_countries, years)
+    snapshot.publish(df)
+    countries = sorted(df["country"].unique())
+    indicators = [col for col in df.columns if col not in ["country", "date"]]
+    rng = random.Random(0)
+
+    results = {"countries": n_countries, "indicators": len(indicators), "years": years, "rows": len(df)}
+    for mode in ["pais", "comparacao"]:
+        at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=600)
+        at.query_params["modo"] = mode
+        began = time.perf_counter()
+        at.run()
+        first_run = time.perf_counter() - began
+
+        timings = []
+        for _ in range(reruns):
+            at.selectbox[0].set_value(rng.choice(indicators))
+            if mode == "pais":
+                at.selectbox[1].set_value(rng.choice(countries))
+            else:
+                size = len(countries) if select == "all" else min(int(select), len(countries))
+                at.multiselect[0].set_value(rng.sample(countries, size))
+            began = time.perf_counter()
+            at.run()
+            timings.append(time.perf_counter() - began)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+
+        results[mode] = {
+            "first_run": first_run,
+            "p50": _percentile(timings, 50),
+            "p95": _percentile(timings, 95),
+        }
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala do dashboard")
+    parser.add_argument("--countries", type=int, nargs="+", default=[12, 50, 100, 200])
+    parser.add_argument("--extra-indicators", type=int, default=0)
+    parser.add_argument("--years", type=int, default=60)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--select", default="all", help="Países selecionados na comparação ('all' ou um número)")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.extra_indicators, args.years, args.reruns, args.select)
+        return
+
+    print(f"{'países':>7} | {'indic.':>6} | {'linhas':>7} | {'modo':>10} | {'1ª exec. (s)':>12} | {'p50 (s)':>8} | {'p95 (s)':>8}")
+    slow = False
+    for n_countries in args.countries:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry_path = os.path.join(tmp_dir, "indicadores.csv")
+            _write_registry(registry_path, args.extra_indicators)
+            env = dict(
+                os.environ,
+                DASHBOARD_SNAPSHOT_DIR=os.path.join(tmp_dir, "snapshot"),
+                DASHBOARD_INDICATORS_FILE=registry_path,
+            )
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", str(n_countries),
+                 "--extra-indicators", str(args.extra_indicators), "--years", str(args.years),
+                 "--reruns", str(args.reruns), "--select", args.select],
+                cwd=APP_DIR, env=env, capture_output=True, text=True
+            )
+        if output.returncode != 0:
+            print(f"[ERRO] {n_countries} países: {output.stderr.strip().splitlines()[-1]}")
+            slow = True
+            continue
+
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        for mode in ["pais", "comparacao"]:
+            timing = result[mode]
+            slow = slow or timing["p50"] > TARGET_SECONDS
+            print(
+                f"{result['countries']:>7} | {result['indicators']:>6} | {result['rows']:>7} | {mode:>10} | "
+                f"{timing['first_run']:>12.2f} | {timing['p50']:>8.2f} | {timing['p95']:>8.2f}"
+            )
+
+    print(f"Meta: p50 abaixo de {TARGET_SECONDS:.1f} s por reexecução" + (" - NÃO atingida" if slow else " - atingida"))
+
+
+if __name__ == "__main__":
+    main()
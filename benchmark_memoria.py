@@ -0,0 +1,183 @@
+"""
+Benchmark de memória da coleta: pico de RSS durante um fetch_all_indicators completo.
+
+Sobe um servidor local que imita a API do World Bank (respostas paginadas com gzip, dados sintéticos)
+e executa a coleta completa em um subprocesso por modo, medindo o pico de RSS acima do consumo do
+processo já com os módulos importados:
+    json    res.json() carrega cada página inteira antes de gravar os valores
+    stream  decodificação incremental direto nos arrays tipados (padrão do data_api)
+    rev:REF data_api.py e registry.py de uma revisão do git (por exemplo, rev:HEAD~1 para o "antes")
+
+Uso:
+    python benchmark_memoria.py [--countries 200] [--extra-indicators 40] [--per-page 10000] [--modes json stream]
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+START_YEAR, END_YEAR = 2000, 2025
+
+
+class FakeWorldBank(BaseHTTPRequestHandler):
+    """
+    Imita os endpoints /country e /country/{países}/indicator/{indicadores} da API do World Bank.
+    """
+    n_countries = 200
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        match = re.match(r"^/country/([^/]+)/indicator/([^/]+)$", url.path)
+        if url.path == "/country":
+            payload = [{"page": 1, "pages": 1, "total": self.n_countries}, [
+                {"id": f"C{i:02X}", "name": f"País {i:03d}", "region": {"id": "SYN"},
+                 "latitude": "0", "longitude": "0"}
+                for i in range(self.n_countries)
+            ]]
+        elif match:
+            payload = self._indicator_page(match.group(1).split(";"), match.group(2).split(";"), params)
+        else:
+            self.send_error(404)
+            return
+
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _indicator_page(self, countries, indicators, params):
+        per_page, page = int(params.get("per_page", 50)), int(params.get("page", 1))
+        years = range(END_YEAR, START_YEAR - 1, -1)
+        total = len(countries) * len(indicators) * len(years)
+        rows = []
+        for position in range((page - 1) * per_page, min(page * per_page, total)):
+            country_pos, rest = divmod(position, len(indicators) * len(years))
+            indicator_pos, year_pos = divmod(rest, len(years))
+            country, indicator, year = countries[country_pos], indicators[indicator_pos], years[year_pos]
+            # ~10% dos registros sem valor, como na API real
+            value = None if (position * 7919) % 10 == 0 else (position % 9973) * 1.37
+            rows.append({
+                "indicator": {"id": indicator, "value": f"Indicador {indicator}"},
+                "country": {"id": country[:2], "value": f"País {country}"},
+                "countryiso3code": country, "date": str(year), "value": value,
+                "unit": "", "obs_status": "", "decimal": 1,
+            })
+        pages = max(1, -(-total // per_page))
+        return [{"page": page, "pages": pages, "per_page": per_page, "total": total}, rows]
+
+
+def _max_rss_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(mode, per_page):
+    """
+    Executa uma coleta completa no processo atual (ambiente já configurado) e imprime um JSON.
+    """
+    if mode.startswith("rev:"):
+        # Versão antiga do módulo de coleta, extraída do git para um diretório temporário
+        rev_dir = tempfile.mkdtemp()
+        for name in ["data_api.py", "registry.py"]:
+            source = subprocess.run(
+                ["git", "show", f"{mode[4:]}:{name}"], cwd=APP_DIR, capture_output=True, text=True, check=True
+            ).stdout
+            with open(os.path.join(rev_dir, name), "w", encoding="utf-8") as f:
+                f.write(source)
+        sys.path.insert(0, rev_dir)
+
+    import numpy  # noqa: F401 - importado antes da linha de base em todos os modos
+    import pandas  # noqa: F401
+    import data_api
+
+    # A revisão antiga pode não ter a URL configurável
+    if not hasattr(data_api, "API_BASE"):
+        import requests
+        original_get = requests.get
+        base = os.environ["DASHBOARD_WB_API"]
+        requests.get = lambda url, *args, **kwargs: original_get(
+            url.replace("http://api.worldbank.org/v2", base), *args, **kwargs
+        )
+    data_api.PER_PAGE = per_page
+    if mode in ("json", "stream"):
+        data_api.STREAM_RESPONSES = mode == "stream"
+
+    baseline = _max_rss_mb()
+    began = time.perf_counter()
+    df = data_api.fetch_all_indicators("ALL")
+    elapsed = time.perf_counter() - began
+    print(json.dumps({
+        "mode": mode, "rows": len(df), "cells": int(df.iloc[:, 2:].notna().to_numpy().sum()),
+        "baseline_mb": baseline, "peak_mb": _max_rss_mb(), "seconds": elapsed,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de memória da coleta completa")
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--extra-indicators", type=int, default=40)
+    parser.add_argument("--per-page", type=int, default=10000)
+    parser.add_argument("--modes", nargs="+", default=["json", "stream"])
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        run_worker(args.worker, args.per_page)
+        return
+
+    from benchmark_escala import _write_registry
+
+    FakeWorldBank.n_countries = args.countries
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeWorldBank)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"{'modo':>14} | {'linhas':>7} | {'células':>8} | {'base (MB)':>9} | {'pico (MB)':>9} | {'acréscimo (MB)':>14} | {'tempo (s)':>9}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            registry_path = os.path.join(tmp_dir, "indicadores.csv")
+            _write_registry(registry_path, args.extra_indicators)
+            env = dict(
+                os.environ,
+                DASHBOARD_WB_API=f"http://127.0.0.1:{server.server_address[1]}",
+                DASHBOARD_INDICATORS_FILE=registry_path,
+            )
+            for mode in args.modes:
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", mode, "--per-page", str(args.per_page)],
+                    cwd=APP_DIR, env=env, capture_output=True, text=True
+                )
+                if output.returncode != 0:
+                    print(f"[ERRO] {mode}: {output.stderr.strip().splitlines()[-1]}")
+                    continue
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                print(
+                    f"{mode:>14} | {result['rows']:>7} | {result['cells']:>8} | {result['baseline_mb']:>9.1f} | "
+                    f"{result['peak_mb']:>9.1f} | {result['peak_mb'] - result['baseline_mb']:>14.1f} | "
+                    f"{result['seconds']:>9.2f}"
+                )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
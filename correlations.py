@@ -0,0 +1,98 @@
+import numpy as np
+
+# Mínimo de anos em comum para que uma correlação seja reportada
+MIN_OBS = 3
+
+
+def _standardize(values, axis):
+    """
+    Centraliza e escala os valores ao longo de axis (ignorando NaN) para estabilizar as somas.
+
+    A correlação não muda com transformações afins, mas as somas de quadrados de valores como o
+    PIB (~1e12) perdem precisão sem esse ajuste.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(values, axis=axis, keepdims=True)
+        std = np.nanstd(values, axis=axis, keepdims=True)
+    std = np.where(np.isfinite(std) & (std > 0), std, 1.0)
+    return (values - np.nan_to_num(mean)) / std
+
+
+def _pairwise_sums(values, spec):
+    """
+    Somas suficientes com casamento par a par de observações (pairwise-complete).
+
+    Retorna um array (6, ...) com n, Σx, Σy, Σx², Σy², Σxy, onde cada soma só usa as posições em
+    que os dois lados têm valor.
+    """
+    present = (~np.isnan(values)).astype(float)
+    filled = np.nan_to_num(values)
+    n = np.einsum(spec, present, present)
+    sx = np.einsum(spec, filled, present)
+    sxx = np.einsum(spec, filled ** 2, present)
+    sxy = np.einsum(spec, filled, filled)
+    sy = np.swapaxes(sx, -1, -2)
+    syy = np.swapaxes(sxx, -1, -2)
+    return np.stack([n, sx, sy, sxx, syy, sxy])
+
+
+def _correlation_from_sums(sums):
+    n, sx, sy, sxx, syy, sxy = sums
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx ** 2
+        var_y = n * syy - sy ** 2
+        corr = cov / np.sqrt(var_x * var_y)
+    corr = np.where((n >= MIN_OBS) & (var_x > 0) & (var_y > 0), corr, np.nan)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def indicator_correlation(cube, country_idx):
+    """
+    Matriz indicador × indicador para as linhas (país, ano) dos países selecionados.
+
+    Calculada direto na fatia dos países selecionados (países × indicadores × anos), sem somas
+    pré-calculadas por país para todos os pares de indicadores.
+    """
+    values = _standardize(np.asarray(cube, dtype=float)[np.asarray(country_idx, dtype=int)], axis=(0, 2))
+    return _correlation_from_sums(_pairwise_sums(values, "ciy,cjy->ij"))
+
+
+def country_correlations(cube):
+    """
+    Correlação país × país ao longo dos anos para cada indicador: array (indicadores, países, países).
+    """
+    values = np.swapaxes(np.asarray(cube, dtype=float), 0, 1)
+    values = _standardize(values, axis=2)
+    return _correlation_from_sums(_pairwise_sums(values, "icy,idy->icd"))
+
+
+def rolling_country_correlations(cube, indicator_idx, window):
+    """
+    Correlação país × país em janelas móveis de `window` anos: array (anos, países, países).
+
+    A posição t usa os anos t-window+1..t; janelas incompletas no início ficam NaN. Cada janela sai
+    da diferença de somas acumuladas, sem recalcular a correlação ano a ano.
+    """
+    values = _standardize(np.asarray(cube, dtype=float)[:, indicator_idx, :], axis=1)
+    present = (~np.isnan(values)).astype(float)
+    filled = np.nan_to_num(values)
+
+    # Produtos por ano (ano, país, país) e suas somas acumuladas ao longo dos anos
+    per_year = np.stack([
+        np.einsum("cy,dy->ycd", present, present),
+        np.einsum("cy,dy->ycd", filled, present),
+        np.einsum("cy,dy->ycd", filled ** 2, present),
+        np.einsum("cy,dy->ycd", filled, filled),
+    ])
+    cumulative = np.concatenate([np.zeros_like(per_year[:, :1]), np.cumsum(per_year, axis=1)], axis=1)
+
+    n_years = values.shape[1]
+    result = np.full((n_years, values.shape[0], values.shape[0]), np.nan)
+    if n_years < window:
+        return result
+
+    n, sx, sxx, sxy = cumulative[:, window:] - cumulative[:, :-window]
+    sums = np.stack([n, sx, np.swapaxes(sx, -1, -2), sxx, np.swapaxes(sxx, -1, -2), sxy])
+    result[window - 1:] = _correlation_from_sums(sums)
+    return result
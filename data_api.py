@@ -1,7 +1,14 @@
+import codecs
+import json
+import os
+import re
 import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from registry import REGISTRY
+
 # Lista de países da América do Sul com seus códigos ISO-3 do World Bank
 COUNTRIES = {
     "Argentina": "ARG", "Bolivia": "BOL", "Brazil": "BRA", "Chile": "CHL",
@@ -9,67 +16,311 @@ COUNTRIES = {
     "Peru": "PER", "Suriname": "SUR", "Uruguay": "URY", "Venezuela": "VEN"
 }
 
-# Indicadores do World Bank
-INDICATORS = {
-    "PIB (US$ atual)": "NY.GDP.MKTP.CD",  # Produto Interno Bruto em dólares americanos correntes
-    "Inflação (% anual)": "FP.CPI.TOTL.ZG",  # Variação percentual anual do índice de preços ao consumidor
-    "Taxa de juros real (%)": "FR.INR.RINR",  # Taxa de juros ajustada pela inflação
-    "Desemprego (% força de trabalho)": "SL.UEM.TOTL.ZS",  # Porcentagem da força de trabalho desempregada
-    "Taxa de câmbio (LCU/US$)": "PA.NUS.FCRF"  # Taxa de câmbio oficial
+# Coordenadas (lat, lon) usadas no mapa para os países da América do Sul
+COUNTRY_COORDS = {
+    "Argentina": (-38.416097, -63.616672),
+    "Bolivia": (-16.290154, -63.588653),
+    "Brazil": (-14.235004, -51.92528),
+    "Chile": (-35.675147, -71.542969),
+    "Colombia": (4.570868, -74.297333),
+    "Ecuador": (-2.897533, -78.979733),
+    "Guyana": (4.860416, -58.930180),
+    "Paraguay": (-23.442503, -58.443833),
+    "Peru": (-9.189967, -75.015152),
+    "Suriname": (3.919305, -56.027783),
+    "Uruguay": (-32.522779, -55.765835),
+    "Venezuela": (6.423750, -66.589730)
+}
+
+# Regiões disponíveis: código -> (nome exibido, código de região do World Bank)
+REGIONS = {
+    "SA": ("América do Sul", None),
+    "LCN": ("América Latina e Caribe", "LCN"),
+    "ALL": ("Todos os países", None),
 }
 
+# Região carregada pelo dashboard (variável de ambiente DASHBOARD_REGION, padrão: América do Sul)
+REGION = os.environ.get("DASHBOARD_REGION", "SA").upper()
+REGION_NAME = REGIONS.get(REGION, (REGION,))[0]
 
-def fetch_indicator_data(indicator_code, start_year=2000, end_year=2025):
+
+def region_dir(base):
     """
-    Coleta dados do World Bank para todos os países da América do Sul para um indicador específico.
+    Subdiretório de base para a região carregada: snapshot, histórico e caches de uma região não se
+    misturam com os de outra que use o mesmo diretório.
     """
+    return os.path.join(base, re.sub(r"[^\w-]+", "_", REGION))
+
+# Indicadores do World Bank (rótulo -> código), definidos em indicadores.csv
+INDICATORS = {entry["label"]: entry["code"] for entry in REGISTRY}
+
+# Quantidade de indicadores por requisição (a API aceita vários códigos separados por ";" com o parâmetro source)
+INDICATORS_PER_REQUEST = 20
+
+# Registros por página nas respostas da API
+PER_PAGE = 10000
+
+# Endereço da API do World Bank (pode ser sobrescrito por variável de ambiente, por exemplo em medições locais)
+API_BASE = os.environ.get("DASHBOARD_WB_API", "http://api.worldbank.org/v2")
+
+# Decodificação incremental das respostas (False: res.json() carrega a resposta inteira de uma vez)
+STREAM_RESPONSES = True
+
+# Tamanho dos blocos lidos da resposta na decodificação incremental
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Quantidade de países por requisição (mantém a URL curta quando a região tem ~200 países)
+COUNTRIES_PER_REQUEST = 60
+
+
+def fetch_countries(region=REGION):
     """
-    Coleta dados do World Bank para todos os países da América do Sul para um indicador específico.
+    Retorna os países da região com código ISO-3 e coordenadas.
+
+    Para a América do Sul usa a lista fixa acima; para as demais regiões (ou todos os países) consulta
+    o endpoint de países do World Bank, ignorando os agregados regionais.
+
+    Retorna:
+    DataFrame com colunas: country, iso3, lat, lon
     """
-    all_data = []
+    if region == "SA":
+        return pd.DataFrame({
+            "country": list(COUNTRIES),
+            "iso3": list(COUNTRIES.values()),
+            "lat": [COUNTRY_COORDS[name][0] for name in COUNTRIES],
+            "lon": [COUNTRY_COORDS[name][1] for name in COUNTRIES],
+        })
 
-    for country_name, country_code in COUNTRIES.items():
-        url = f"http://api.worldbank.org/v2/country/{country_code}/indicator/{indicator_code}?format=json&date={start_year}:{end_year}&per_page=100"
-        res = requests.get(url)
+    params = {"format": "json", "per_page": 400}
+    wb_region = REGIONS.get(region, (None, region))[1]
+    if wb_region:
+        params["region"] = wb_region
+    res = requests.get(f"{API_BASE}/country", params=params)
+    if res.status_code != 200:
+        print(f"[ERRO] Lista de países ({region}): {res.status_code}")
+        return pd.DataFrame(columns=["country", "iso3", "lat", "lon"])
 
-        if res.status_code != 200:
-            print(f"[ERRO] {country_name}: {res.status_code}")
+    rows = []
+    for entry in res.json()[1]:
+        # Agregados (regiões, grupos de renda) têm região "NA"
+        if entry["region"]["id"] == "NA":
             continue
+        rows.append({
+            "country": entry["name"],
+            "iso3": entry["id"],
+            "lat": float(entry["latitude"]) if entry["latitude"] else None,
+            "lon": float(entry["longitude"]) if entry["longitude"] else None,
+        })
+    return pd.DataFrame(rows, columns=["country", "iso3", "lat", "lon"])
+
+
+def _json_array_items(res):
+    """
+    Decodifica incrementalmente uma resposta no formato do World Bank ([cabeçalho, [registros...]]).
+
+    Lê o corpo em blocos (descomprimidos do gzip pelo requests) e devolve um registro por vez com
+    json.JSONDecoder.raw_decode, sem materializar a resposta inteira. O primeiro item é o cabeçalho.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = res.iter_content(chunk_size=STREAM_CHUNK_BYTES)
+    buffer, pos = "", 0
+
+    def read_more():
+        nonlocal buffer, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        # Descarta o que já foi decodificado para o buffer não crescer com a resposta
+        buffer, pos = buffer[pos:] + text.decode(chunk), 0
+        return True
+
+    def skip(chars):
+        # Avança até o próximo caractere que não está em chars; False se a resposta terminou
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer):
+                return True
+            if not read_more():
+                return False
+
+    def decode_value():
+        nonlocal pos
+        while True:
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+                return value
+            except json.JSONDecodeError:
+                # Objeto cortado no fim do bloco: lê mais e tenta de novo
+                if not read_more():
+                    raise
+
+    if not skip(" \t\r\n["):
+        return
+    yield decode_value()  # cabeçalho
+    if not skip(" \t\r\n,") or buffer[pos] != "[":
+        return  # sem registros (data = null) ou resposta de erro
+    pos += 1
+    while skip(" \t\r\n,") and buffer[pos] != "]":
+        yield decode_value()
+
+
+def _fetch_arrays(indicator_codes, source, start_year, end_year, countries, country_index, indicator_index):
+    """
+    Coleta as páginas de uma requisição gravando os valores direto em arrays tipados preenchidos no lugar.
+
+    O total de registros informado no cabeçalho da primeira página define o tamanho dos arrays; cada
+    registro ocupa 16 bytes (país, indicador, ano e valor) em vez de um dicionário Python.
+
+    Retorna:
+    (arrays, completa): dict com country (índice em country_index), indicator (índice em indicator_index),
+    year e value, e se todas as páginas foram lidas (False em erro HTTP ou de leitura)
+    """
+    url = (
+        f"{API_BASE}/country/{';'.join(countries.values())}"
+        f"/indicator/{';'.join(indicator_codes)}"
+    )
+    arrays = {
+        "country": np.empty(0, dtype=np.int16), "indicator": np.empty(0, dtype=np.int16),
+        "year": np.empty(0, dtype=np.int16), "value": np.empty(0, dtype=np.float64),
+    }
+    size = 0
+    complete = False
+
+    page, pages = 1, 1
+    while page <= pages:
+        res = requests.get(url, params={
+            "format": "json",
+            "date": f"{start_year}:{end_year}",
+            "per_page": PER_PAGE,
+            "source": source,
+            "page": page
+        }, stream=STREAM_RESPONSES)
+
+        if res.status_code != 200:
+            print(f"[ERRO] {';'.join(indicator_codes)} (página {page}): {res.status_code}")
+            break
 
         try:
-            data_json = res.json()[1]
-        except:
-            print(f"[ERRO JSON] {country_name}: dados não encontrados")
-            continue
+            if STREAM_RESPONSES:
+                items = _json_array_items(res)
+                header = next(items)
+            else:
+                header, data_json = res.json()
+                items = iter(data_json or [])
+            pages = int(header["pages"])
+            total = int(header["total"])
+        except (ValueError, TypeError, KeyError, StopIteration):
+            print(f"[ERRO JSON] {';'.join(indicator_codes)}: dados não encontrados")
+            break
+
+        if total > len(arrays["value"]):
+            # Pré-aloca (ou amplia, se o total mudou entre páginas) os arrays do lote inteiro
+            arrays = {key: np.resize(values, total) for key, values in arrays.items()}
+
+        try:
+            for entry in items:
+                value = entry["value"]
+                country_idx = country_index.get(entry["countryiso3code"])
+                if value is None or country_idx is None:
+                    continue
+                if size == len(arrays["value"]):
+                    arrays = {key: np.resize(values, 2 * size + 1) for key, values in arrays.items()}
+                arrays["country"][size] = country_idx
+                arrays["indicator"][size] = indicator_index[entry["indicator"]["id"]]
+                arrays["year"][size] = int(entry["date"])
+                arrays["value"][size] = value
+                size += 1
+        except (ValueError, KeyError, requests.RequestException) as e:
+            print(f"[ERRO JSON] {';'.join(indicator_codes)} (página {page}): {e}")
+            break
+        page += 1
+    else:
+        complete = True
+
+    return {key: values[:size] for key, values in arrays.items()}, complete
 
-        for entry in data_json:
-            if entry["value"] is not None:
-                all_data.append({
-                    "country": country_name,
-                    "indicator": indicator_code,
-                    "value": entry["value"],
-                    "date": entry["date"]
-                })
 
-    return pd.DataFrame(all_data)
+def indicator_batches():
+    """
+    Indicadores do registro agrupados por fonte, em lotes de até INDICATORS_PER_REQUEST por requisição.
+
+    Retorna uma lista de (fonte, códigos).
+    """
+    by_source = {}
+    for entry in REGISTRY:
+        by_source.setdefault(entry["source"], []).append(entry["code"])
+    return [
+        (source, codes[i:i + INDICATORS_PER_REQUEST])
+        for source, codes in by_source.items()
+        for i in range(0, len(codes), INDICATORS_PER_REQUEST)
+    ]
+
+
+def fetch_indicators(indicator_codes, source=2, start_year=2000, end_year=2025, countries=None):
+    """
+    Coleta do World Bank vários indicadores para vários países de uma vez (padrão: América do Sul).
+
+    Usa o endpoint de múltiplos países/indicadores (ARG;BOL;.../A;B;...?source=) e percorre as páginas,
+    em vez de uma requisição por país e indicador.
+    """
+    countries = COUNTRIES if countries is None else countries
+    names = list(countries)
+    arrays, _ = _fetch_arrays(
+        indicator_codes, source, start_year, end_year, countries,
+        country_index={code: i for i, code in enumerate(countries.values())},
+        indicator_index={code: i for i, code in enumerate(indicator_codes)},
+    )
+    return pd.DataFrame({
+        "country": np.asarray(names, dtype=object)[arrays["country"]],
+        "indicator": np.asarray(indicator_codes, dtype=object)[arrays["indicator"]],
+        "value": arrays["value"],
+        "date": arrays["year"].astype(str),
+    }, columns=["country", "indicator", "value", "date"])
+
+
+def fetch_indicator_data(indicator_code, start_year=2000, end_year=2025):
+    """
+    Coleta dados do World Bank para todos os países da América do Sul para um indicador específico.
+    """
+    return fetch_indicators([indicator_code], start_year=start_year, end_year=end_year)
 
 
-def fetch_all_indicators():
+def fetch_all_indicators(region=REGION, start_year=2000, end_year=2025):
     """
-    Retorna um DataFrame combinado com todos os indicadores e países.
+    Retorna um DataFrame combinado com todos os indicadores e países da região.
     """
-    dfs = []
-    for name, code in INDICATORS.items():
-        df = fetch_indicator_data(code)
-        df = df.rename(columns={"value": name})
-        dfs.append(df[["country", "date", name]])
+    country_list = fetch_countries(region)
+    countries = dict(zip(country_list["country"], country_list["iso3"]))
+    # Índices em ordem alfabética: as linhas já saem ordenadas por país e ano
+    names = sorted(countries)
+    country_index = {countries[name]: i for i, name in enumerate(names)}
+    labels = list(INDICATORS)
+    indicator_index = {code: i for i, code in enumerate(INDICATORS.values())}
+    country_chunks = [
+        dict(list(countries.items())[i:i + COUNTRIES_PER_REQUEST])
+        for i in range(0, len(countries), COUNTRIES_PER_REQUEST)
+    ]
 
-    # Combinar todos os indicadores em um único DataFrame
-    df_final = dfs[0]
-    for df in dfs[1:]:
-        df_final = pd.merge(df_final, df, on=["country", "date"], how="outer")
+    parts = []
+    for source, codes in indicator_batches():
+        for chunk in country_chunks:
+            arrays, _ = _fetch_arrays(codes, source, start_year, end_year, chunk, country_index, indicator_index)
+            parts.append(arrays)
+    if not parts or sum(len(part["value"]) for part in parts) == 0:
+        return pd.DataFrame(columns=["country", "date", *INDICATORS])
+    arrays = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
 
-    # Formatar a data
-    df_final["date"] = pd.to_datetime(df_final["date"], format="%Y")
+    # Combinar todos os indicadores em um único DataFrame (uma linha por país e ano, uma coluna por rótulo)
+    n_years = end_year - start_year + 1
+    cell = arrays["country"].astype(np.int64) * n_years + (arrays["year"] - start_year)
+    rows, row_of_value = np.unique(cell, return_inverse=True)
+    values = np.full((len(rows), len(labels)), np.nan)
+    values[row_of_value, arrays["indicator"]] = arrays["value"]
 
-    return df_final.sort_values(by=["country", "date"]).reset_index(drop=True)
\ No newline at end of file
+    df_final = pd.DataFrame(values, columns=labels)
+    df_final.insert(0, "date", pd.to_datetime((rows % n_years + start_year).astype(str), format="%Y"))
+    df_final.insert(0, "country", np.asarray(names, dtype=object)[rows // n_years])
+    return df_final
@@ -0,0 +1,212 @@
+"""
+Gráficos do modo "País único", usados pelo dashboard e pelos relatórios estáticos (gerar_relatorios.py).
+
+Cada função recebe os dados já recortados e devolve a figura Plotly, sem nada do Streamlit.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import registry
+
+# Mandatos presidenciais empacotados com o projeto (usados pelo dashboard e pelos relatórios)
+PRESIDENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presidentes.csv")
+
+# Paleta da linha do tempo dos mandatos presidenciais
+TIMELINE_COLORS = [
+    "#D50032", # vermelho vivo
+    "#1e88e5", # azul tema
+    "#ffe600", # amarelo tema
+    "#43a047", # verde
+    "#8e24aa", # roxo
+    "#f4511e", # laranja
+    "#3949ab", # azul escuro
+    "#00bcd4", # turquesa
+    "#ff9800", # laranja vivo
+    "#c2185b", # magenta
+    "#388e3c"  # verde escuro
+]
+
+
+def load_presidents(path=PRESIDENTS_PATH):
+    """
+    Mandatos presidenciais (pais, presidente, mandato_inicio, mandato_fim) do arquivo do projeto.
+    """
+    return pd.read_csv(path)
+
+
+def presidents_timeline(presidents, country, start_year, end_year):
+    """
+    Linha do tempo dos mandatos presidenciais de um país que cruzam o período start_year..end_year.
+
+    presidents: DataFrame de presidentes.csv (pais, presidente, mandato_inicio, mandato_fim)
+    """
+    mandatos = presidents[presidents["pais"] == country].copy()
+    mandatos = mandatos[(mandatos["mandato_fim"] >= start_year) & (mandatos["mandato_inicio"] <= end_year)]
+    mandatos["inicio"] = pd.to_datetime(mandatos["mandato_inicio"].astype(str) + "-01-01")
+    mandatos["fim"] = pd.to_datetime(mandatos["mandato_fim"].astype(str) + "-12-31")
+    fig_timeline = px.timeline(
+        mandatos,
+        x_start="inicio",
+        x_end="fim",
+        y="presidente",
+        color="presidente",
+        color_discrete_sequence=TIMELINE_COLORS,
+        hover_data={
+            "inicio": True,
+            "fim": True,
+            "presidente": True
+        }
+    )
+    fig_timeline.update_yaxes(autorange="reversed")
+    fig_timeline.update_traces(
+        opacity=0.95,
+        marker_line_width=0  # Remove contorno das barras
+    )
+    fig_timeline.update_layout(
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis_title="Ano",
+        yaxis_title="Presidente",
+        height=260,
+        margin=dict(l=10, r=10, t=10, b=10),
+        font=dict(color="#1e3d59"),
+        showlegend=False,
+        yaxis=dict(showgrid=False),
+        xaxis=dict(
+            showgrid=True, gridcolor="#eee", zeroline=False,
+            tickformat="%Y",
+            ticks="outside",
+            ticklabelmode="period",
+            showline=True, linecolor="#bbb"
+        ),
+        dragmode='zoom',
+        hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
+        modebar=dict(orientation='v')
+    )
+    fig_timeline.update_layout(modebar_add=['zoom', 'pan', 'select', 'lasso2d', 'resetScale2d', 'toImage'])
+    return fig_timeline
+
+
+def indicator_series(country_data, indicator, country):
+    """
+    Evolução de um indicador para um país.
+
+    country_data: DataFrame com colunas date e value
+    """
+    fig = px.line(
+        country_data,
+        x="date",
+        y="value",
+        title=f"Evolução do {indicator} para {country}",
+        template="plotly_white",
+        markers=True,
+        color_discrete_sequence=["#D50032"]  # Rosa padrão
+    )
+
+    # Customizar eixo y para PIB (os chamadores passam o rótulo; a comparação é pelo código do registro)
+    entry = registry.lookup(indicator)
+    if entry is not None and entry["code"] == "NY.GDP.MKTP.CD":
+        max_val = country_data['value'].abs().max()
+        for threshold, suffix in ((1e12, " TRI"), (1e9, " BI"), (1e6, " MI")):
+            if max_val >= threshold:
+                # O eixo mostra o valor na escala do sufixo
+                fig.update_traces(y=country_data['value'] / threshold)
+                fig.update_yaxes(tickformat=".2f", ticksuffix=suffix)
+                break
+        else:
+            fig.update_yaxes(tickformat=",.0f")
+
+    fig.update_layout(
+        xaxis_title="Data",
+        yaxis_title="Valor",
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor='rgba(0,0,0,0)'),
+        height=450,
+        margin=dict(l=10, r=10, t=50, b=10),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#f2f2f7"),
+        dragmode='zoom',
+        hoverlabel=dict(bgcolor="#232946", font_size=13, font_family="sans-serif"),
+        xaxis=dict(showspikes=False, spikemode='across', spikesnap='cursor', showline=True, showgrid=True, zeroline=False, showticklabels=True, spikecolor='#cccccc', spikethickness=0.35, spikedash='solid'),
+        yaxis=dict(showspikes=False, spikemode='across', spikesnap='cursor', showline=True, showgrid=True, zeroline=False, showticklabels=True, spikecolor='#cccccc', spikethickness=0.35, spikedash='solid'),
+        modebar=dict(orientation='v')
+    )
+    fig.update_layout(modebar_add=['zoom', 'pan', 'select', 'lasso2d', 'resetScale2d', 'toImage'])
+    return fig
+
+
+def regional_mean(values, country_idx):
+    """
+    Média regional por ano sem o próprio país: soma e contagem de todos os países menos a dele.
+
+    values: fatia país × ano do cubo para um indicador
+    """
+    series = values[country_idx]
+    own_present = ~np.isnan(series)
+    totals = np.nansum(values, axis=0) - np.where(own_present, series, 0.0)
+    counts = (~np.isnan(values)).sum(axis=0) - own_present
+    return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+
+def regional_comparison(dates, series, mean, indicator, country):
+    """
+    Série do país contra a média regional.
+    """
+    fig_comp = go.Figure()
+    fig_comp.add_trace(go.Scatter(
+        x=dates, y=series, mode='lines+markers', name=country,
+        line=dict(color='#D50032', width=3)
+    ))
+    fig_comp.add_trace(go.Scatter(
+        x=dates, y=mean, mode='lines+markers', name='Média Regional',
+        line=dict(color='#43a047', width=3, dash='dash')
+    ))
+    fig_comp.update_layout(
+        title=f"{indicator}: {country} vs. Média Regional",
+        xaxis_title='Data',
+        yaxis_title='Valor',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, bgcolor='rgba(0,0,0,0)'),
+        height=400,
+        margin=dict(l=10, r=10, t=50, b=10),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#f2f2f7")
+    )
+    return fig_comp
+
+
+def risk_breakdown(components, country):
+    """
+    Composição do score de risco de um país (uma linha de risk.risk_components), parcela a parcela.
+    """
+    parts = components.astype(float)
+    total = float(np.clip(parts.sum(), 0, 100))
+    if total != parts.sum():
+        # O que passa de 100 (ou fica abaixo de 0) aparece como uma parcela própria
+        parts["Limite 0-100"] = total - parts.sum()
+    fig = go.Figure(go.Waterfall(
+        x=list(parts.index) + ["Score"],
+        y=list(parts.to_numpy()) + [total],
+        measure=["absolute"] + ["relative"] * (len(parts) - 1) + ["total"],
+        text=[f"{value:+.1f}" for value in parts.to_numpy()] + [f"{total:.1f}"],
+        textposition="outside",
+        increasing=dict(marker=dict(color="#D50032")),
+        decreasing=dict(marker=dict(color="#43a047")),
+        totals=dict(marker=dict(color="#1e88e5")),
+        connector=dict(line=dict(color="#888", width=1))
+    ))
+    fig.update_layout(
+        title=f"Composição do Score de Risco: {country}",
+        yaxis_title="Pontos (score limitado a 0-100)",
+        height=420,
+        margin=dict(l=10, r=10, t=50, b=10),
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="#f2f2f7"),
+        showlegend=False
+    )
+    return fig
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+import registry
+
+# Formatos (estilo %) das regras sem escala de magnitude
+_PLAIN_FORMATS = {
+    "percent": "%.1f%%",
+    "exchange": "%.4f",
+    "score": "%.1f",
+    "default": "%.2f",
+}
+
+# Faixas de magnitude da regra monetária: (limite, divisor, formato)
+_CURRENCY_SCALES = [
+    (1e12, 1e12, "US$ {:,.2f} TRI"),
+    (1e9, 1e9, "US$ {:,.2f} BI"),
+    (1e6, 1e6, "US$ {:,.2f} MI"),
+]
+_CURRENCY_UNSCALED = "US$ {:,.0f}"
+
+
+def format_rule(indicator_code):
+    """
+    Escolhe a regra de formatação de um indicador (uma vez por indicador, não por valor).
+
+    Indicadores do registro (por código ou rótulo) usam a regra definida em indicadores.csv.
+    """
+    entry = registry.lookup(indicator_code)
+    if entry is not None and (entry["format"] in _PLAIN_FORMATS or entry["format"] == "currency"):
+        return entry["format"]
+
+    upper_code = str(indicator_code).upper()
+    # Permitir formatação compacta para qualquer indicador relacionado a PIB/GDP
+    if (
+        indicator_code == "NY.GDP.MKTP.CD"
+        or "PIB" in upper_code
+        or "GDP" in upper_code
+        or "US$" in upper_code
+    ):
+        return "currency"
+    elif indicator_code in ("FP.CPI.TOTL.ZG", "FR.INR.RINR", "SL.UEM.TOTL.ZS"):  # Inflação, juros real, desemprego
+        return "percent"
+    elif indicator_code == "PA.NUS.FCRF":  # Taxa de câmbio
+        return "exchange"
+    elif indicator_code == "RISK_SCORE":  # Score de risco (0-100 com uma casa decimal)
+        return "score"
+    else:
+        return "default"
+
+
+def format_number(value, indicator_code):
+    """
+    Formata números com base no tipo de indicador.
+    """
+    if pd.isna(value):
+        return "-"
+
+    rule = format_rule(indicator_code)
+    if rule != "currency":
+        return _PLAIN_FORMATS[rule] % value
+
+    abs_value = abs(value)
+    for threshold, divisor, template in _CURRENCY_SCALES:
+        if abs_value >= threshold:
+            return template.format(value / divisor)
+    return _CURRENCY_UNSCALED.format(value)
+
+
+def format_series(values, indicator_code):
+    """
+    Versão vetorizada de format_number para uma Series inteira (mesmas strings, mesmo índice).
+    """
+    values = pd.Series(values)
+    array = values.to_numpy(dtype=float)
+    valid = ~np.isnan(array)
+    result = np.full(len(array), "-", dtype=object)
+
+    rule = format_rule(indicator_code)
+    if rule != "currency":
+        if valid.any():
+            result[valid] = np.char.mod(_PLAIN_FORMATS[rule], array[valid]).astype(object)
+        return pd.Series(result, index=values.index)
+
+    # Escala de magnitude em uma passada: índice da faixa de cada valor (len = sem escala)
+    abs_array = np.abs(array)
+    conditions = [abs_array >= threshold for threshold, _, _ in _CURRENCY_SCALES]
+    bucket = np.select(conditions, range(len(_CURRENCY_SCALES)), default=len(_CURRENCY_SCALES))
+    divisors = np.array([divisor for _, divisor, _ in _CURRENCY_SCALES] + [1.0])
+    scaled = array / divisors[bucket]
+
+    templates = [template for _, _, template in _CURRENCY_SCALES] + [_CURRENCY_UNSCALED]
+    for index, template in enumerate(templates):
+        mask = valid & (bucket == index)
+        if mask.any():
+            # O agrupamento de milhar (",") não existe no formato %, então só esta etapa é por valor
+            result[mask] = [template.format(v) for v in scaled[mask]]
+    return pd.Series(result, index=values.index)
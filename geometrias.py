@@ -0,0 +1,219 @@
+"""
+Contornos simplificados dos países para o mapa coroplético, empacotados com o projeto (sem acesso à rede).
+
+Os arquivos static/geo/paises_{nível}.geojson são gerados uma vez a partir do shapefile Natural Earth 1:110m
+(domínio público) com Douglas-Peucker em três níveis de detalhe; cada feature tem id = código ISO-3.
+
+O Streamlit serve static/ como arquivos estáticos (server.enableStaticServing): o mapa passa só a URL
+do arquivo, que o navegador baixa uma vez e guarda em cache, em vez de receber a geometria a cada reexecução.
+
+Uso (só para regenerar os arquivos):
+    python geometrias.py caminho/para/naturalearth_lowres.shp
+"""
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+GEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "geo")
+
+# Caminho dos arquivos no servidor do Streamlit, relativo à página do dashboard
+GEO_URL = "app/static/geo"
+
+# Tolerância do Douglas-Peucker (graus) de cada nível de detalhe
+LEVELS = {"alto": 0.02, "medio": 0.1, "baixo": 0.35}
+
+# Nível usado automaticamente conforme a quantidade de países no mapa (acima do último limite: "baixo")
+AUTO_LEVELS = ((15, "alto"), (60, "medio"))
+
+# Casas decimais das coordenadas gravadas (0,01° ≈ 1 km)
+COORD_DECIMALS = 2
+
+# Países sem código ISO-3 no Natural Earth (-99) que existem no World Bank
+ISO3_FIXES = {"France": "FRA", "Norway": "NOR", "Kosovo": "XKX"}
+
+
+def level_for(n_countries):
+    """
+    Nível de detalhe para um mapa com n_countries países: quanto mais países, mais simples o contorno.
+    """
+    for limit, level in AUTO_LEVELS:
+        if n_countries <= limit:
+            return level
+    return "baixo"
+
+
+def url(level):
+    """
+    URL do arquivo de contornos de um nível de detalhe, para o parâmetro geojson do Plotly.
+    """
+    return f"{GEO_URL}/paises_{level}.geojson"
+
+
+def load(level):
+    """
+    Lê os contornos de um nível de detalhe.
+
+    Retorna um dict código ISO-3 -> geometria GeoJSON (vazio se o arquivo não existir).
+    """
+    path = os.path.join(GEO_DIR, f"paises_{level}.geojson")
+    try:
+        with open(path, encoding="utf-8") as f:
+            collection = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[ERRO] Contornos dos países ({level}): {e}")
+        return {}
+    return {feature["id"]: feature["geometry"] for feature in collection["features"]}
+
+
+def _read_dbf(path):
+    """
+    Registros de um arquivo .dbf (dBase III) como lista de dicts de texto.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    n_records, header_len, record_len = struct.unpack("<IHH", data[4:12])
+    fields, offset = [], 32
+    while data[offset] != 0x0D:
+        name = data[offset:offset + 11].split(b"\0")[0].decode("ascii")
+        fields.append((name, data[offset + 16]))
+        offset += 32
+
+    records = []
+    for i in range(n_records):
+        start = header_len + i * record_len + 1  # o primeiro byte marca registros apagados
+        row = {}
+        for name, length in fields:
+            row[name] = data[start:start + length].decode("utf-8", errors="replace").strip()
+            start += length
+        records.append(row)
+    return records
+
+
+def _read_polygons(path):
+    """
+    Anéis de cada registro de um arquivo .shp de polígonos, como arrays (n, 2) de lon/lat.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    shapes, offset = [], 100
+    while offset < len(data):
+        content_len = struct.unpack(">i", data[offset + 4:offset + 8])[0] * 2
+        content = data[offset + 8:offset + 8 + content_len]
+        offset += 8 + content_len
+        if struct.unpack("<i", content[:4])[0] == 0:
+            shapes.append([])
+            continue
+        n_parts, n_points = struct.unpack("<ii", content[36:44])
+        parts = list(struct.unpack(f"<{n_parts}i", content[44:44 + 4 * n_parts])) + [n_points]
+        points = np.frombuffer(content, dtype="<f8", count=2 * n_points, offset=44 + 4 * n_parts).reshape(-1, 2)
+        shapes.append([points[parts[k]:parts[k + 1]] for k in range(n_parts)])
+    return shapes
+
+
+def _signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1]))
+
+
+def _douglas_peucker(points, tolerance):
+    """
+    Máscara dos pontos mantidos de uma linha aberta pelo Douglas-Peucker (iterativo).
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, segment = points[first], points[last] - points[first]
+        inner = points[first + 1:last] - start
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+    return keep
+
+
+def simplify_ring(ring, tolerance):
+    """
+    Simplifica um anel fechado; devolve None quando ele degenera (menos de 4 pontos).
+    """
+    if tolerance > 0 and len(ring) > 4:
+        # O anel é dividido no ponto mais distante do primeiro, para que as duas metades tenham extremos distintos
+        split = int(np.hypot(*(ring - ring[0]).T).argmax())
+        keep = np.concatenate([
+            _douglas_peucker(ring[:split + 1], tolerance)[:-1],
+            _douglas_peucker(ring[split:], tolerance),
+        ])
+        ring = ring[keep]
+    ring = np.round(ring, COORD_DECIMALS)
+    # Pontos repetidos depois do arredondamento
+    ring = ring[np.r_[True, np.any(ring[1:] != ring[:-1], axis=1)]]
+    return ring if len(ring) >= 4 else None
+
+
+def _to_geometry(rings, tolerance):
+    """
+    Geometria GeoJSON de um país; buracos (anéis anti-horários no shapefile) vão para o polígono que os contém.
+    """
+    polygons = []  # (contorno externo, buracos, canto mínimo, canto máximo) do anel original
+    for ring in rings:
+        simplified = simplify_ring(ring, tolerance)
+        if simplified is None:
+            continue
+        low, high = ring.min(axis=0), ring.max(axis=0)
+        if _signed_area(ring) <= 0:  # horário: contorno externo
+            polygons.append((simplified, [], low, high))
+            continue
+        owner = next((p for p in polygons if np.all(p[2] <= low) and np.all(high <= p[3])), None)
+        if owner is not None:
+            owner[1].append(simplified)
+    if not polygons:
+        # Ilhas pequenas que somem na simplificação: mantém o maior anel só com o arredondamento
+        largest = max(rings, key=lambda r: abs(_signed_area(r)))
+        polygons = [(simplify_ring(largest, 0), [], None, None)]
+    coordinates = [[outer.tolist()] + [hole.tolist() for hole in holes] for outer, holes, _, _ in polygons]
+    if len(coordinates) == 1:
+        return {"type": "Polygon", "coordinates": coordinates[0]}
+    return {"type": "MultiPolygon", "coordinates": coordinates}
+
+
+def build(shapefile, out_dir=GEO_DIR):
+    """
+    Gera static/geo/paises_{nível}.geojson a partir do shapefile Natural Earth (com o .dbf ao lado).
+    """
+    records = _read_dbf(os.path.splitext(shapefile)[0] + ".dbf")
+    shapes = _read_polygons(shapefile)
+    os.makedirs(out_dir, exist_ok=True)
+    for level, tolerance in LEVELS.items():
+        features = []
+        for record, rings in zip(records, shapes):
+            code = ISO3_FIXES.get(record["name"], record["iso_a3"])
+            if not rings or code == "-99":
+                continue
+            features.append({"type": "Feature", "id": code, "properties": {}, "geometry": _to_geometry(rings, tolerance)})
+        path = os.path.join(out_dir, f"paises_{level}.geojson")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f, separators=(",", ":"))
+        print(f"{level}: {len(features)} países, {os.path.getsize(path) / 1024:.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera os contornos simplificados dos países")
+    parser.add_argument("shapefile", help="Shapefile Natural Earth 1:110m (países)")
+    args = parser.parse_args()
+    build(args.shapefile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Relatórios estáticos por país (HTML e, opcionalmente, imagens PNG), gerados em lote a partir do snapshot
+publicado pelo dashboard, sem abrir o Streamlit nem consultar o World Bank.
+
+Cada relatório traz os gráficos do modo "País único" (figures.py): evolução e comparação com a média
+regional de cada indicador, composição do score de risco e linha do tempo dos mandatos presidenciais.
+
+Os países são distribuídos entre processos, que abrem o snapshot mapeado em memória. Cada figura é
+gravada uma vez por versão dos dados em <saída>/<versão>/figuras/; uma nova execução sobre a mesma
+versão só monta as páginas com as figuras já gravadas.
+
+Uso:
+    python gerar_relatorios.py [--saida relatorios] [--processos 4] [--paises Brazil,Chile] [--imagens]
+
+--imagens grava também um PNG por figura (requer o pacote kaleido; sem ele, os relatórios saem só em HTML).
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import figures
+import registry
+import snapshot
+from formatting import format_number
+from risk import risk_category, risk_components
+
+# Diretório padrão dos relatórios (pode ser sobrescrito por variável de ambiente)
+REPORTS_DIR = os.environ.get(
+    "DASHBOARD_REPORTS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "relatorios")
+)
+
+_PAGE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{ background: #0e1117; color: #f2f2f7; font-family: sans-serif; margin: 24px auto; max-width: 1100px; }}
+a {{ color: #1e88e5; }}
+.timeline {{ background: #fff; border-radius: 6px; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+# Estado de cada processo do pool, preenchido uma vez por _init_worker
+_worker = {}
+
+
+def _slug(country):
+    return re.sub(r"[^\w-]+", "_", country).strip("_")
+
+
+def _init_worker(version, created_at, out_dir, components, images):
+    _worker.update(
+        dataset=snapshot.load(version, created_at),
+        out_dir=out_dir,
+        components=components,
+        presidents=figures.load_presidents(),
+        images=images,
+    )
+
+
+def _write(path, text):
+    # Temporário + os.replace: uma execução interrompida não deixa figura pela metade
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _figure(key, build):
+    """
+    Fragmento HTML de uma figura, calculada só se ainda não foi gravada nesta versão dos dados.
+
+    Retorna (fragmento, se a figura foi calculada agora).
+    """
+    base = os.path.join(_worker["out_dir"], "figuras", key)
+    fig = None
+    built = False
+    if os.path.exists(base + ".html"):
+        with open(base + ".html", encoding="utf-8") as f:
+            fragment = f.read()
+    else:
+        fig = build()
+        fragment = fig.to_html(full_html=False, include_plotlyjs=False, div_id=key)
+        _write(base + ".html", fragment)
+        built = True
+    if _worker["images"] and not os.path.exists(base + ".png"):
+        try:
+            (fig or build()).write_image(base + ".png", width=1100, scale=2)
+        except (ImportError, ValueError, RuntimeError) as e:
+            print(f"[AVISO] Imagens estáticas desativadas: {e}")
+            _worker["images"] = False
+    return fragment, built
+
+
+def render_country(country):
+    """
+    Gera o relatório de um país. Retorna (país, arquivo, figuras calculadas nesta execução).
+    """
+    dataset = _worker["dataset"]
+    country_idx = dataset.countries.index(country)
+    dates = pd.to_datetime(dataset.years.astype(str), format="%Y")
+    slug = _slug(country)
+    sections, n_built = [], 0
+
+    def add(key, build, css_class=""):
+        nonlocal n_built
+        fragment, built = _figure(key, build)
+        n_built += built
+        sections.append(f"<div class='{css_class}'>{fragment}</div>")
+
+    sections.append(f"<h1>{html.escape(country)}</h1>")
+    components = _worker["components"]
+    if country in components.index:
+        score = float(np.clip(components.loc[country].sum(), 0, 100))
+        sections.append(f"<h2>Score de Risco de Investimento: {score:.1f} ({risk_category(score)})</h2>")
+        add(f"{slug}__risco", lambda: figures.risk_breakdown(components.loc[country], country))
+
+    presidents = _worker["presidents"]
+    if (presidents["pais"] == country).any():
+        sections.append("<h2>Mandatos presidenciais</h2>")
+        add(
+            f"{slug}__mandatos",
+            lambda: figures.presidents_timeline(presidents, country, int(dataset.years[0]), int(dataset.years[-1])),
+            "timeline"
+        )
+
+    for indicator_idx, indicator in enumerate(dataset.indicators):
+        series = dataset.cube[country_idx, indicator_idx]
+        present = ~np.isnan(series)
+        sections.append(f"<h2>{html.escape(indicator)}</h2>")
+        if not present.any():
+            sections.append("<p>Sem dados para este indicador.</p>")
+            continue
+        last = int(np.flatnonzero(present)[-1])
+        sections.append(
+            f"<p>Valor mais recente: {html.escape(format_number(series[last], indicator))} "
+            f"({dataset.years[last]})</p>"
+        )
+        code = registry.lookup(indicator)["code"] if registry.lookup(indicator) else str(indicator_idx)
+        add(
+            f"{slug}__{_slug(code)}__serie",
+            lambda: figures.indicator_series(pd.DataFrame({"date": dates, "value": series}), indicator, country)
+        )
+        mean = figures.regional_mean(dataset.cube[:, indicator_idx], country_idx)
+        if (~np.isnan(mean)).any():
+            add(
+                f"{slug}__{_slug(code)}__regional",
+                lambda: figures.regional_comparison(dates, series, mean, indicator, country)
+            )
+
+    path = os.path.join(_worker["out_dir"], f"{slug}.html")
+    _write(path, _PAGE.format(title=html.escape(f"{country} - Relatório econômico"), body="\n".join(sections)))
+    return country, path, n_built
+
+
+def generate(out_dir=REPORTS_DIR, countries=None, processes=None, images=False):
+    """
+    Gera os relatórios de todos os países (ou dos informados) da versão atual do snapshot.
+
+    Retorna o diretório da versão com os relatórios, ou None se não houver snapshot publicado.
+    """
+    version, created_at = snapshot.current_version()
+    if version is None:
+        print("[ERRO] Nenhum snapshot publicado: abra o dashboard uma vez para coletar os dados")
+        return None
+    dataset = snapshot.load(version, created_at)
+    countries = list(dataset.countries) if countries is None else countries
+    unknown = [country for country in countries if country not in dataset.countries]
+    if unknown:
+        print(f"[AVISO] Países fora dos dados ignorados: {', '.join(unknown)}")
+        countries = [country for country in countries if country in dataset.countries]
+
+    version_dir = os.path.join(out_dir, version)
+    os.makedirs(os.path.join(version_dir, "figuras"), exist_ok=True)
+    plotly_js = os.path.join(version_dir, "plotly.min.js")
+    if not os.path.exists(plotly_js):
+        from plotly.offline import get_plotlyjs
+        _write(plotly_js, get_plotlyjs())
+
+    # O score depende de todos os países: calculado uma vez aqui e enviado aos processos
+    components = risk_components(dataset.df)
+    started = time.perf_counter()
+    reports, n_built = [], 0
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker,
+        initargs=(version, created_at, version_dir, components, images)
+    ) as executor:
+        for country, path, built in executor.map(render_country, countries):
+            reports.append((country, os.path.basename(path)))
+            n_built += built
+            print(f"{country}: {os.path.basename(path)} ({built} figura(s) nova(s))")
+
+    # O índice lista todos os relatórios já gerados nesta versão, não só os desta execução
+    links = "\n".join(
+        f"<li><a href='{_slug(country)}.html'>{html.escape(country)}</a></li>" for country in dataset.countries
+        if os.path.exists(os.path.join(version_dir, f"{_slug(country)}.html"))
+    )
+    _write(
+        os.path.join(version_dir, "index.html"),
+        _PAGE.format(title="Relatórios por país", body=f"<h1>Relatórios por país</h1>\n<p>Dados: versão {version}</p>\n<ul>\n{links}\n</ul>")
+    )
+    print(f"{len(reports)} relatório(s), {n_built} figura(s) calculada(s) em {time.perf_counter() - started:.1f} s: {version_dir}")
+    return version_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera relatórios estáticos por país a partir do snapshot")
+    parser.add_argument("--saida", default=REPORTS_DIR, help="Diretório dos relatórios")
+    parser.add_argument("--processos", type=int, default=None, help="Processos em paralelo (padrão: número de CPUs)")
+    parser.add_argument("--paises", default=None, help="Países separados por vírgula (padrão: todos)")
+    parser.add_argument("--imagens", action="store_true", help="Grava também PNG de cada figura (requer kaleido)")
+    args = parser.parse_args()
+
+    countries = [country.strip() for country in args.paises.split(",")] if args.paises else None
+    if generate(args.saida, countries, args.processos, args.imagens) is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Verifica o tempo de importação dos módulos carregados na inicialização do app.py.
+
+Lê os imports de nível superior do app.py, mede-os em um interpretador limpo com
+`python -X importtime` e falha (código de saída 1) se o total passar do orçamento.
+
+Uso:
+    python import_budget.py [--budget-ms 2000] [--top 15]
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Orçamento total (ms) para os imports feitos na inicialização do app.py
+BUDGET_MS = 2000
+
+
+def startup_imports(path=APP_PATH):
+    """
+    Retorna os módulos importados diretamente no nível superior do script (fora de funções e blocos).
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(modules):
+    """
+    Importa os módulos em um subprocesso com -X importtime.
+
+    Retorna uma lista de (módulo, próprio_us, acumulado_us, profundidade) na ordem do relatório.
+    """
+    code = "; ".join(f"import {name}" for name in modules) or "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(APP_PATH),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação do dashboard")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    modules = startup_imports()
+    rows = measure(modules)
+    # Módulos carregados pelo próprio interpretador antes do -c (site, encodings...) não contam
+    interpreter = {r[0] for r in measure([])}
+
+    # Entradas de profundidade 0 são os pacotes carregados diretamente; seus acumulados somam o total
+    top_level = sorted((r for r in rows if r[3] == 0 and r[0] not in interpreter), key=lambda r: r[2], reverse=True)
+    total_ms = sum(r[2] for r in top_level) / 1000
+
+    print(f"Imports de inicialização do app.py: {', '.join(modules)}")
+    print(f"{'acumulado (ms)':>15} | {'próprio (ms)':>13} | módulo")
+    for name, self_us, cumulative_us, _ in top_level[:args.top]:
+        print(f"{cumulative_us / 1000:>15.1f} | {self_us / 1000:>13.1f} | {name}")
+    print(f"Total: {total_ms:.1f} ms (orçamento: {args.budget_ms:.0f} ms)")
+
+    if total_ms > args.budget_ms:
+        print("[ERRO] Tempo de importação acima do orçamento.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
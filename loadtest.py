@@ -0,0 +1,254 @@
+"""
+Teste de carga: várias sessões simultâneas do dashboard contra um servidor Streamlit local.
+
+Publica um snapshot sintético (fixo pela semente) em um diretório temporário, sobe o app.py com
+`streamlit run` apontado para ele e conecta N clientes websocket sem navegador, que falam o mesmo
+protocolo do frontend (BackMsg/ForwardMsg). Cada sessão escolhe o modo e, a cada reexecução,
+indicador, países e a estimativa de valores aleatoriamente. Cada quantidade de sessões usa um
+servidor novo, depois de uma sessão de aquecimento que preenche os caches do processo.
+
+Relata latência por reexecução (p50/p95/p99, do envio da reexecução até o fim do script no servidor),
+vazão (reexecuções por segundo) e crescimento de memória (RSS) do servidor por sessão.
+
+O AppTest não serve aqui: ele usa um runtime global por processo e não roda sessões em paralelo.
+
+Uso:
+    python loadtest.py [--sessions 1 4 8 16] [--reruns 10] [--countries 12] [--years 26] [--seed 0]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tempo máximo de espera por uma reexecução (segundos)
+RERUN_TIMEOUT = 120
+
+
+def _rss_mb(pid):
+    """
+    RSS atual de um processo (Linux).
+    """
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def _publish_fixture(n_countries, years, seed):
+    """
+    Publica o conjunto sintético no snapshot indicado pelo ambiente e devolve (países, indicadores).
+    """
+    import snapshot
+    from benchmark_escala import _synthetic_data
+
+    df = _synthetic_data(n_countries, years, seed=seed)
+    snapshot.publish(df)
+    return sorted(df["country"].unique()), [col for col in df.columns if col not in ["country", "date"]]
+
+
+class Session:
+    """
+    Cliente websocket de uma sessão do dashboard (o equivalente a uma aba do navegador).
+    """
+
+    def __init__(self, port, query_string):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.query_string = query_string
+        self.widgets = {}  # rótulo -> id do widget, lidos dos elementos enviados pelo servidor
+        self.errors = []
+        self.connection = None
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self.connection = await websocket_connect(self.url, subprotocols=["streamlit"])
+
+    async def rerun(self, values=None):
+        """
+        Pede uma reexecução com os valores de widgets informados ({rótulo: valor}) e espera o fim do script.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = self.query_string
+        for label, value in (values or {}).items():
+            # Rótulos com partes variáveis (como o ano da estimativa) são procurados pelo início
+            widget_id = next((wid for name, wid in self.widgets.items() if name.startswith(label)), None)
+            if widget_id is None:
+                continue
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if isinstance(value, bool):
+                state.bool_value = value
+            elif isinstance(value, list):
+                state.string_array_value.data.extend(value)
+            else:
+                state.string_value = value
+
+        began = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await asyncio.wait_for(self.connection.read_message(), RERUN_TIMEOUT)
+            if raw is None:
+                raise RuntimeError("Conexão encerrada pelo servidor")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._read_element(forward.delta.new_element)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - began
+
+    def _read_element(self, element):
+        kind = element.WhichOneof("type")
+        if kind in ("selectbox", "multiselect", "checkbox"):
+            widget = getattr(element, kind)
+            self.widgets[widget.label] = widget.id
+        elif kind == "exception":
+            self.errors.append(element.exception.message)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+async def _drive_session(port, rng, reruns, countries, indicators, timings):
+    """
+    Conecta uma sessão, faz a primeira execução e `reruns` reexecuções com seleções aleatórias.
+    """
+    mode = rng.choice(["pais", "comparacao"])
+    session = Session(port, f"modo={mode}")
+    await session.connect()
+    await session.rerun()
+    for _ in range(reruns):
+        values = {
+            "Selecione o indicador": rng.choice(indicators),
+            "Estimar valores": rng.random() < 0.3,
+        }
+        if mode == "pais":
+            values["Selecione o país"] = rng.choice(countries)
+        else:
+            values["Selecione países para comparar"] = rng.sample(countries, rng.randint(1, min(8, len(countries))))
+        timings.append(await session.rerun(values))
+    if session.errors:
+        raise RuntimeError(session.errors[0])
+    return session
+
+
+async def _load_round(port, sessions, reruns, seed, countries, indicators):
+    timings = []
+    began = time.perf_counter()
+    alive = await asyncio.gather(*[
+        _drive_session(port, random.Random(seed * 1000 + i), reruns, countries, indicators, timings)
+        for i in range(sessions)
+    ])
+    return alive, timings, time.perf_counter() - began
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port, env):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(APP_DIR, "app.py"),
+         "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as res:
+                if res.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("O servidor Streamlit não respondeu em 60 s")
+
+
+async def _measure(port, server_pid, sessions, args, countries, indicators):
+    # Sessão de aquecimento: preenche os caches do processo antes da linha de base de memória
+    warmup, _, _ = await _load_round(port, 1, 1, args.seed + 1, countries, indicators)
+    rss_before = _rss_mb(server_pid)
+    alive, timings, elapsed = await _load_round(port, sessions, args.reruns, args.seed, countries, indicators)
+    # Memória medida com as sessões ainda conectadas
+    rss_after = _rss_mb(server_pid)
+    for session in alive + warmup:
+        session.close()
+    return {
+        "p50": _percentile(timings, 50),
+        "p95": _percentile(timings, 95),
+        "p99": _percentile(timings, 99),
+        "reruns": len(timings),
+        "throughput": len(timings) / elapsed,
+        "rss_mb": rss_after,
+        "mb_per_session": (rss_after - rss_before) / sessions,
+    }
+
+
+def run_round(sessions, args, env, countries, indicators):
+    """
+    Uma rodada de carga com N sessões simultâneas em um servidor novo.
+    """
+    port = _free_port()
+    server = _start_server(port, env)
+    try:
+        return asyncio.run(_measure(port, server.pid, sessions, args, countries, indicators))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard com sessões simultâneas")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--countries", type=int, default=12)
+    parser.add_argument("--years", type=int, default=26)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(
+            os.environ,
+            DASHBOARD_SNAPSHOT_DIR=os.path.join(tmp_dir, "snapshot"),
+            DASHBOARD_VINTAGE_DIR=os.path.join(tmp_dir, "vintages"),
+            DASHBOARD_SERIES_DIR=os.path.join(tmp_dir, "series"),
+            DASHBOARD_ALERT_DIR=os.path.join(tmp_dir, "alerts"),
+        )
+        # O snapshot é publicado antes de subir o servidor, que só o lê (sem coleta no World Bank)
+        os.environ.update(env)
+        countries, indicators = _publish_fixture(args.countries, args.years, args.seed)
+
+        print(f"{'sessões':>7} | {'reexec.':>7} | {'p50 (s)':>8} | {'p95 (s)':>8} | {'p99 (s)':>8} | {'reexec./s':>9} | {'RSS (MB)':>8} | {'MB/sessão':>9}")
+        for sessions in args.sessions:
+            try:
+                result = run_round(sessions, args, env, countries, indicators)
+            except (RuntimeError, OSError, asyncio.TimeoutError) as e:
+                print(f"[ERRO] {sessions} sessões: {e}")
+                continue
+            print(
+                f"{sessions:>7} | {result['reruns']:>7} | {result['p50']:>8.2f} | {result['p95']:>8.2f} | "
+                f"{result['p99']:>8.2f} | {result['throughput']:>9.2f} | {result['rss_mb']:>8.1f} | "
+                f"{result['mb_per_session']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
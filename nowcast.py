@@ -0,0 +1,134 @@
+import numpy as np
+
+# Métodos de extensão das séries até o ano-alvo
+METHODS = ("ar1", "trend")
+
+# Anos mais recentes de cada série usados no ajuste
+FIT_WINDOW = 10
+
+# Mínimo de pontos (ou pares, no AR(1)) para ajustar; abaixo disso o último valor é repetido
+MIN_FIT_POINTS = 3
+
+# Limite do coeficiente do AR(1), para que a projeção não exploda nem oscile sem amortecer
+MAX_PHI = 0.95
+
+# Máximo de anos projetados depois do último dado de cada série; além disso os valores continuam NaN
+MAX_HORIZON = 5
+
+
+def interpolate_interior(cube):
+    """
+    Preenche por interpolação linear as lacunas entre o primeiro e o último dado de cada série.
+
+    Retorna (cubo preenchido, máscara dos valores interpolados); anos antes do primeiro ou depois do
+    último dado continuam NaN.
+    """
+    n_years = cube.shape[-1]
+    present = ~np.isnan(cube)
+    positions = np.broadcast_to(np.arange(n_years), cube.shape)
+
+    # Índice do dado anterior e do próximo dado de cada ano (-1 / n_years quando não existem)
+    prev_idx = np.maximum.accumulate(np.where(present, positions, -1), axis=-1)
+    next_idx = np.minimum.accumulate(np.where(present, positions, n_years)[..., ::-1], axis=-1)[..., ::-1]
+    interior = ~present & (prev_idx >= 0) & (next_idx < n_years)
+
+    prev_val = np.take_along_axis(cube, np.maximum(prev_idx, 0), axis=-1)
+    next_val = np.take_along_axis(cube, np.minimum(next_idx, n_years - 1), axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = (positions - prev_idx) / (next_idx - prev_idx)
+    filled = np.where(interior, prev_val + (next_val - prev_val) * weight, cube)
+    return filled, interior
+
+
+def _fit_window(filled, last_idx):
+    """
+    Máscara dos FIT_WINDOW anos mais recentes com dado de cada série (terminando no último dado).
+    """
+    positions = np.arange(filled.shape[-1])
+    return (
+        ~np.isnan(filled)
+        & (positions > last_idx[..., None] - FIT_WINDOW)
+        & (positions <= last_idx[..., None])
+    )
+
+
+def _trend_forecast(filled, last_idx, steps):
+    """
+    Reta de mínimos quadrados ajustada à janela de cada série, avaliada `steps` anos após o último dado.
+    """
+    window = _fit_window(filled, last_idx)
+    t = np.where(window, np.arange(filled.shape[-1]) - last_idx[..., None], 0.0)
+    y = np.where(window, filled, 0.0)
+    n = window.sum(axis=-1)
+    sum_t, sum_y = t.sum(axis=-1), y.sum(axis=-1)
+    sum_tt, sum_ty = (t * t).sum(axis=-1), (t * y).sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * sum_ty - sum_t * sum_y) / (n * sum_tt - sum_t ** 2)
+        intercept = (sum_y - slope * sum_t) / n
+    slope = np.where((n >= MIN_FIT_POINTS) & np.isfinite(slope), slope, 0.0)
+    intercept = np.where(n >= MIN_FIT_POINTS, intercept, np.take_along_axis(filled, last_idx[..., None], -1)[..., 0])
+    return intercept[..., None] + slope[..., None] * steps
+
+
+def _ar1_forecast(filled, last_idx, steps):
+    """
+    AR(1) em torno da média da janela de cada série: y(t+h) = média + phi^h × (último valor - média).
+    """
+    window = _fit_window(filled, last_idx)
+    n = window.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(window, filled, 0.0).sum(axis=-1) / n
+    deviation = np.where(window, filled - mean[..., None], 0.0)
+
+    # Pares consecutivos (t-1, t) dentro da janela
+    pairs = window[..., 1:] & window[..., :-1]
+    cross = np.where(pairs, deviation[..., 1:] * deviation[..., :-1], 0.0).sum(axis=-1)
+    lagged = np.where(pairs, deviation[..., :-1] ** 2, 0.0).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        phi = np.clip(cross / lagged, -MAX_PHI, MAX_PHI)
+    # Sem pares suficientes: passeio aleatório (repete o último valor)
+    enough = (pairs.sum(axis=-1) >= MIN_FIT_POINTS) & np.isfinite(phi)
+    phi = np.where(enough, phi, 1.0)
+    mean = np.where(enough, mean, 0.0)
+
+    last_value = np.take_along_axis(filled, last_idx[..., None], axis=-1)[..., 0]
+    return mean[..., None] + phi[..., None] ** steps * (last_value - mean)[..., None]
+
+
+def nowcast(cube, years, target_year, method="ar1"):
+    """
+    Completa todas as séries do cubo país × indicador × ano até target_year de uma vez.
+
+    Lacunas internas são interpoladas; anos entre o último dado e target_year são projetados com AR(1)
+    ou tendência linear ajustados a cada série, até MAX_HORIZON anos depois do último dado. Séries sem
+    nenhum dado e anos além do horizonte continuam NaN.
+
+    Retorna:
+    (valores, estimado, anos): cubos de valores e de máscara dos valores estimados e os anos do eixo
+    (estendido até target_year quando necessário)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de nowcast desconhecido: {method}")
+    years = np.asarray(years, dtype=int)
+    extra = max(0, int(target_year) - int(years[-1])) if len(years) else 0
+    if extra:
+        years = np.concatenate([years, np.arange(years[-1] + 1, years[-1] + 1 + extra)])
+        cube = np.concatenate([cube, np.full(cube.shape[:-1] + (extra,), np.nan)], axis=-1)
+
+    filled, estimated = interpolate_interior(np.asarray(cube, dtype=float))
+    present = ~np.isnan(filled)
+    has_data = present.any(axis=-1)
+    n_years = filled.shape[-1]
+    last_idx = np.where(has_data, n_years - 1 - present[..., ::-1].argmax(axis=-1), 0)
+
+    # Anos depois do último dado, até o ano-alvo e no máximo MAX_HORIZON anos à frente
+    positions = np.arange(n_years)
+    target_idx = int(np.searchsorted(years, target_year, side="right")) - 1
+    steps = positions - last_idx[..., None]
+    future = has_data[..., None] & (steps > 0) & (steps <= MAX_HORIZON) & (positions <= target_idx)
+
+    forecast = _ar1_forecast if method == "ar1" else _trend_forecast
+    projected = forecast(filled, last_idx, np.maximum(steps, 0))
+    filled = np.where(future, projected, filled)
+    return filled, estimated | future, years
@@ -0,0 +1,204 @@
+import cProfile
+import marshal
+import os
+import pstats
+import runpy
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+# Modos aceitos no parâmetro de URL ?profile=
+PROFILE_MODES = ("cpu", "mem")
+
+# Quantidade de funções / pontos de alocação exibidos no relatório
+TOP_N = 30
+
+# Chave do session_state onde o relatório fica até ser fechado
+_REPORT_KEY = "_relatorio_perfil"
+
+# Marca a thread que está executando o script perfilado
+_local = threading.local()
+
+
+class _StopRequested(BaseException):
+    """
+    st.stop() chamado dentro do script perfilado: encerra só esse script, e a execução externa segue
+    para exibir o relatório. Deriva de BaseException, como a exceção do próprio st.stop(), para não ser
+    capturada pelos `except Exception` do script.
+    """
+
+
+# st.stop original e quantas execuções perfiladas (de sessões diferentes) o mantêm substituído
+_patch_lock = threading.Lock()
+_patch = {"original": None, "users": 0}
+
+
+def _stop():
+    if getattr(_local, "profiling", False):
+        raise _StopRequested
+    _patch["original"]()
+
+
+@contextmanager
+def _stop_patched():
+    """
+    Substitui st.stop enquanto houver alguma execução perfilada e restaura o original ao fim da última.
+
+    O st.stop() original pede a parada de toda a execução, e nada mais poderia ser exibido depois dele.
+    Outras sessões que rodam nesse meio tempo continuam com o comportamento original (_stop só muda a
+    thread perfilada).
+    """
+    with _patch_lock:
+        if _patch["users"] == 0:
+            _patch["original"] = st.stop
+            st.stop = _stop
+        _patch["users"] += 1
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _patch["users"] -= 1
+            if _patch["users"] == 0:
+                st.stop = _patch["original"]
+
+
+def _start_cpu():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_cpu(profiler, elapsed):
+    """
+    Encerra o cProfile e monta a tabela das funções com maior tempo acumulado.
+    """
+    profiler.disable()
+    profiler.create_stats()
+    stats = pstats.Stats(profiler)
+
+    rows = []
+    for (file_name, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "Função": f"{func} ({os.path.basename(file_name)}:{line})",
+            "Chamadas": nc,
+            "Tempo próprio (s)": round(tt, 4),
+            "Tempo acumulado (s)": round(ct, 4),
+        })
+    table = pd.DataFrame(rows).sort_values("Tempo acumulado (s)", ascending=False).head(TOP_N)
+
+    return {
+        "mode": "cpu",
+        "summary": f"Tempo total da execução: {elapsed:.2f} s",
+        "table": table,
+        # Mesmo formato gravado por cProfile/pstats (dump_stats), legível por snakeviz etc.
+        "raw": marshal.dumps(profiler.stats),
+        "file_name": "perfil_cpu.prof",
+    }
+
+
+def _start_mem():
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    return started_here
+
+
+def _stop_mem(started_here, elapsed):
+    """
+    Tira o snapshot do tracemalloc e monta a tabela dos maiores pontos de alocação.
+    """
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+    _, peak = tracemalloc.get_traced_memory()
+    if started_here:
+        tracemalloc.stop()
+
+    rows = []
+    for stat in snapshot.statistics("lineno")[:TOP_N]:
+        frame = stat.traceback[0]
+        rows.append({
+            "Local": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+            "Arquivo": frame.filename,
+            "Tamanho (KiB)": round(stat.size / 1024, 1),
+            "Blocos": stat.count,
+        })
+
+    # Snapshot.dump só grava em arquivo; usa um temporário e devolve os bytes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "perfil_mem.snapshot")
+        snapshot.dump(path)
+        with open(path, "rb") as f:
+            raw = f.read()
+
+    return {
+        "mode": "mem",
+        "summary": f"Tempo total da execução: {elapsed:.2f} s · Pico de memória rastreada: {peak / 1024 ** 2:.1f} MiB",
+        "table": pd.DataFrame(rows),
+        # Carregável com tracemalloc.Snapshot.load()
+        "raw": raw,
+        "file_name": "perfil_mem.snapshot",
+    }
+
+
+_PROFILERS = {
+    "cpu": (_start_cpu, _stop_cpu),
+    "mem": (_start_mem, _stop_mem),
+}
+
+
+def run_profiled(script_path, mode, init_globals=None):
+    """
+    Executa o script uma única vez sob o profiler escolhido ("cpu" ou "mem") e exibe o relatório.
+
+    Um st.stop() do script encerra só a execução perfilada; o relatório é exibido logo em seguida e
+    fica no session_state (exibido no início das próximas execuções) até ser fechado.
+    """
+    start, stop = _PROFILERS[mode]
+    handle = start()
+    began = time.perf_counter()
+    _local.profiling = True
+    try:
+        with _stop_patched():
+            runpy.run_path(script_path, init_globals=init_globals, run_name="__main__")
+    except _StopRequested:
+        pass
+    finally:
+        _local.profiling = False
+        st.session_state[_REPORT_KEY] = stop(handle, time.perf_counter() - began)
+    show_report()
+
+
+def show_report():
+    """
+    Exibe o relatório de perfil guardado (se houver), com a tabela, o arquivo bruto para download e o
+    botão que o descarta.
+    """
+    report = st.session_state.get(_REPORT_KEY)
+    if report is None:
+        return
+
+    with st.expander(f"Perfil da execução ({report['mode']})", expanded=True):
+        st.caption(report["summary"])
+        st.dataframe(report["table"], hide_index=True, use_container_width=True)
+        download_col, close_col = st.columns([3, 1])
+        with download_col:
+            st.download_button(
+                label="Baixar perfil bruto",
+                data=report["raw"],
+                file_name=report["file_name"],
+                mime="application/octet-stream",
+                key="perfil_baixar"
+            )
+        with close_col:
+            if st.button("Fechar relatório", key="perfil_fechar"):
+                del st.session_state[_REPORT_KEY]
+                st.rerun()
@@ -0,0 +1,308 @@
+"""
+Provedores de dados do dashboard: o World Bank e outras fontes registradas, coletados em paralelo e
+conciliados no mesmo formato (uma linha por país e ano, uma coluna por indicador do registro).
+
+Cada provedor tem precedência (em uma mesma célula país × indicador × ano vale o valor do provedor de
+maior precedência que a tenha), tempo limite e validade próprios. O último resultado bem-sucedido de
+cada provedor fica em cache (DASHBOARD_PROVIDER_DIR): um provedor que falha ou passa do tempo limite
+entra com esse resultado, sem segurar os demais.
+
+Arquivos CSV/Parquet deixados em DASHBOARD_DROP_DIR (padrão: dados_externos/) entram como um provedor
+de precedência maior que a do World Bank. Formatos aceitos:
+    longo   country (nome ou ISO-3), date (ano), indicator (código ou rótulo do registro), value
+    largo   country, date e uma coluna por indicador (código ou rótulo do registro)
+
+Outros provedores (feeds de bancos centrais, FMI...) são subclasses de Provider registradas com register().
+"""
+import glob
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+import pandas as pd
+
+import registry
+import series_cache
+from data_api import INDICATORS, REGION, fetch_countries, region_dir
+
+# Cache do último resultado bem-sucedido de cada provedor (pode ser sobrescrito por variável de ambiente), um subdiretório por região
+PROVIDER_DIR = region_dir(os.environ.get(
+    "DASHBOARD_PROVIDER_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".providers")
+))
+
+# Diretório de arquivos CSV/Parquet com dados de outras fontes
+DROP_DIR = os.environ.get(
+    "DASHBOARD_DROP_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados_externos")
+)
+
+_COLUMNS = ["country", "indicator", "year", "value"]
+
+# Uma chamada de fetch() por provedor de cada vez: a que estourou o prazo segue em segundo plano e segura a trava
+_busy = {}
+_busy_guard = threading.Lock()
+
+
+class Provider:
+    """
+    Fonte de dados. Subclasses implementam fetch(); os demais atributos controlam a conciliação.
+
+    precedence  em conflito, vence o provedor de maior precedência
+    timeout     segundos de espera pelo fetch() antes de usar o resultado em cache
+    max_age     segundos em que o resultado em cache é usado sem chamar fetch() de novo (0 = sempre coleta)
+    """
+    name = "provedor"
+    precedence = 0
+    timeout = 30
+    max_age = 0
+
+    def fetch(self, start_year, end_year):
+        """
+        Retorna um DataFrame longo com colunas country, indicator (código ou rótulo), year e value.
+        """
+        raise NotImplementedError
+
+
+class WorldBankProvider(Provider):
+    """
+    API do World Bank, com o cache por série (só as séries vencidas são pedidas de novo).
+    """
+    name = "worldbank"
+    precedence = 0
+    timeout = 300
+
+    def fetch(self, start_year, end_year):
+        return to_cells(series_cache.refresh(REGION, start_year, end_year))
+
+
+class FileProvider(Provider):
+    """
+    Arquivos CSV/Parquet de um diretório, relidos a cada coleta.
+    """
+    name = "arquivos"
+    precedence = 10
+    timeout = 30
+
+    def __init__(self, directory=DROP_DIR):
+        self.directory = directory
+
+    def fetch(self, start_year, end_year):
+        frames = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*"))):
+            if path.endswith(".csv"):
+                frame = pd.read_csv(path)
+            elif path.endswith(".parquet"):
+                try:
+                    frame = pd.read_parquet(path)
+                except ImportError:
+                    print(f"[ERRO] {os.path.basename(path)}: leitura de Parquet requer pyarrow")
+                    continue
+            else:
+                continue
+            if {"indicator", "value"} <= set(frame.columns):
+                frames.append(frame[["country", "date", "indicator", "value"]])
+            else:
+                frames.append(frame.melt(id_vars=["country", "date"], var_name="indicator", value_name="value"))
+        if not frames:
+            return pd.DataFrame(columns=_COLUMNS)
+        cells = pd.concat(frames, ignore_index=True)
+        # "2020" ou "2020-12-31": vale o ano
+        cells["year"] = pd.to_numeric(cells["date"].astype(str).str[:4], errors="coerce")
+        return cells.drop(columns="date")
+
+
+_providers = [WorldBankProvider()]
+if os.path.isdir(DROP_DIR):
+    _providers.append(FileProvider())
+
+
+def register(provider):
+    """
+    Acrescenta um provedor à coleta (substitui o de mesmo nome, se houver).
+    """
+    _providers[:] = [p for p in _providers if p.name != provider.name] + [provider]
+
+
+def registered():
+    return list(_providers)
+
+
+def to_cells(df):
+    """
+    DataFrame largo (country, date, indicadores...) -> células (country, indicator, year, value).
+    """
+    if df.empty:
+        return pd.DataFrame(columns=_COLUMNS)
+    long_df = df.melt(id_vars=["country", "date"], var_name="indicator", value_name="value")
+    return pd.DataFrame({
+        "country": long_df["country"].to_numpy(dtype=object),
+        "indicator": long_df["indicator"].to_numpy(dtype=object),
+        "year": long_df["date"].dt.year.to_numpy(),
+        "value": long_df["value"].to_numpy(dtype=float),
+    })
+
+
+def _normalize(cells, iso3_names, start_year, end_year):
+    """
+    Células de um provedor no esquema do dashboard: nomes de país, rótulos do registro, anos do período.
+
+    Países são aceitos pelo código ISO-3 ou pelo nome usado na região; os demais ficam de fora. Sem
+    nenhum país conhecido (lista de países indisponível), os nomes seguem como vieram.
+    """
+    labels = {}
+    for indicator in pd.unique(cells["indicator"]):
+        entry = registry.lookup(str(indicator))
+        if entry is None:
+            print(f"[AVISO] Indicador fora do registro ignorado: {indicator}")
+        labels[indicator] = entry["label"] if entry is not None else None
+    countries = cells["country"]
+    if iso3_names:
+        mapped = countries.map(iso3_names)
+        mapped = mapped.where(mapped.notna() | ~countries.isin(set(iso3_names.values())), countries)
+        unknown = sorted(map(str, pd.unique(countries[mapped.isna() & countries.notna()])))
+        if unknown:
+            print(f"[AVISO] Países fora da região ignorados: {', '.join(unknown)}")
+        countries = mapped
+    cells = pd.DataFrame({
+        "country": countries,
+        "indicator": cells["indicator"].map(labels),
+        "year": pd.to_numeric(cells["year"], errors="coerce"),
+        "value": pd.to_numeric(cells["value"], errors="coerce"),
+    })
+    cells = cells.dropna()
+    cells = cells[(cells["year"] >= start_year) & (cells["year"] <= end_year)]
+    return cells.astype({"year": int})
+
+
+def _cache_path(provider):
+    return os.path.join(PROVIDER_DIR, f"{provider.name}.npz")
+
+
+def _save_cache(provider, cells):
+    # Temporário + os.replace; colunas de texto como unicode para carregar sem pickle
+    os.makedirs(PROVIDER_DIR, exist_ok=True)
+    tmp_path = os.path.join(PROVIDER_DIR, f"{provider.name}.{uuid.uuid4().hex}.tmp.npz")
+    np.savez(
+        tmp_path,
+        country=cells["country"].to_numpy(dtype=str), indicator=cells["indicator"].to_numpy(dtype=str),
+        year=cells["year"].to_numpy(dtype=np.int32), value=cells["value"].to_numpy(dtype=float),
+    )
+    os.replace(tmp_path, _cache_path(provider))
+
+
+def _load_cache(provider):
+    """
+    Retorna (células, instante de gravação) do último resultado bem-sucedido, ou (None, 0).
+    """
+    path = _cache_path(provider)
+    try:
+        saved_at = os.path.getmtime(path)
+        with np.load(path, allow_pickle=False) as data:
+            cells = pd.DataFrame({key: data[key] for key in _COLUMNS})
+    except (OSError, ValueError, KeyError):
+        return None, 0
+    return cells.astype({"country": object, "indicator": object}), saved_at
+
+
+def _busy_lock(provider):
+    with _busy_guard:
+        return _busy.setdefault(provider.name, threading.Lock())
+
+
+def _fetch_normalized(provider, iso3_names, start_year, end_year):
+    try:
+        cells = _normalize(provider.fetch(start_year, end_year), iso3_names, start_year, end_year)
+        _save_cache(provider, cells)
+        return cells
+    finally:
+        _busy_lock(provider).release()
+
+
+def reconcile(results):
+    """
+    Concilia as células de vários provedores: em cada país × indicador × ano vale o de maior precedência.
+
+    results: lista de (precedência, células). Retorna o DataFrame largo de fetch_all_indicators.
+    """
+    frames = [cells.assign(precedence=precedence) for precedence, cells in results if len(cells)]
+    if not frames:
+        return pd.DataFrame(columns=["country", "date", *INDICATORS])
+    cells = pd.concat(frames, ignore_index=True)
+    cells = cells.sort_values("precedence", ascending=False, kind="stable")
+    cells = cells.drop_duplicates(["country", "indicator", "year"], keep="first")
+
+    # Espalha as células em um array (linha país × ano, coluna indicador), como na coleta do World Bank
+    labels = list(INDICATORS)
+    names, country_idx = np.unique(cells["country"].to_numpy(dtype=str), return_inverse=True)
+    start_year = int(cells["year"].min())
+    n_years = int(cells["year"].max()) - start_year + 1
+    cell_row = country_idx.astype(np.int64) * n_years + (cells["year"].to_numpy() - start_year)
+    rows, row_of_value = np.unique(cell_row, return_inverse=True)
+    values = np.full((len(rows), len(labels)), np.nan)
+    values[row_of_value, pd.Index(labels).get_indexer(cells["indicator"])] = cells["value"].to_numpy()
+
+    df = pd.DataFrame(values, columns=labels)
+    df.insert(0, "date", pd.to_datetime((rows % n_years + start_year).astype(str), format="%Y"))
+    df.insert(0, "country", names.astype(object)[rows // n_years])
+    return df
+
+
+def collect(start_year=2000, end_year=2025, providers=None, now=None):
+    """
+    Coleta todos os provedores em paralelo e devolve o conjunto conciliado.
+
+    Cada provedor tem até provider.timeout segundos; passado esse tempo (ou em erro) entra o último
+    resultado em cache dele e a coleta segue com os demais. Provedores com cache mais novo que
+    provider.max_age nem são chamados, nem os que ainda estão na chamada de uma coleta anterior.
+    """
+    providers = registered() if providers is None else providers
+    now = time.time() if now is None else now
+    if len(providers) == 1 and isinstance(providers[0], WorldBankProvider):
+        # Só o World Bank: o resultado já está no formato final, sem conciliação
+        return series_cache.refresh(REGION, start_year, end_year)
+
+    try:
+        country_list = fetch_countries(REGION)
+        iso3_names = dict(zip(country_list["iso3"], country_list["country"]))
+    except Exception as e:
+        print(f"[ERRO] Lista de países ({REGION}): {e}")
+        # Sem a lista: os países da última coleta do World Bank (e a lista fixa da América do Sul)
+        iso3_names = {iso3: name for name, iso3 in series_cache.iso3_codes().items()}
+
+    results, pending = [], {}
+    executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix="provedor")
+    for provider in providers:
+        cached, saved_at = _load_cache(provider)
+        if cached is not None and now - saved_at < provider.max_age:
+            results.append((provider.precedence, cached))
+        elif not _busy_lock(provider).acquire(blocking=False):
+            print(f"[AVISO] Provedor {provider.name}: coleta anterior ainda em andamento, usando o cache")
+            if cached is not None:
+                results.append((provider.precedence, cached))
+        else:
+            pending[provider] = (executor.submit(_fetch_normalized, provider, iso3_names, start_year, end_year), cached)
+
+    began = time.monotonic()
+    for provider, (future, cached) in pending.items():
+        # Os prazos correm juntos desde o início: um provedor lento não soma espera aos demais
+        remaining = max(0.0, provider.timeout - (time.monotonic() - began))
+        try:
+            results.append((provider.precedence, future.result(timeout=remaining)))
+            continue
+        except FutureTimeoutError:
+            print(f"[ERRO] Provedor {provider.name}: sem resposta em {provider.timeout} s")
+        except Exception as e:
+            print(f"[ERRO] Provedor {provider.name}: {e}")
+        if cached is not None:
+            results.append((provider.precedence, cached))
+    # Não espera os provedores que estouraram o prazo: eles terminam em segundo plano
+    executor.shutdown(wait=False, cancel_futures=True)
+    for provider, (future, _) in pending.items():
+        if future.cancelled():
+            # Nem chegou a rodar: a trava não é liberada por _fetch_normalized
+            _busy_lock(provider).release()
+    return reconcile(results)
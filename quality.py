@@ -0,0 +1,108 @@
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+
+# Métricas por série (país × indicador), na ordem em que ficam empilhadas no array de series_stats
+METRICS = ("coverage", "observations", "gaps", "longest_gap", "last_idx", "latest", "previous")
+
+# Limite do z-score robusto (Iglewicz e Hoaglin) acima do qual um valor é marcado como atípico
+OUTLIER_THRESHOLD = 3.5
+
+
+class Quality(NamedTuple):
+    """
+    Qualidade dos dados de uma versão: métricas país × indicador e valores atípicos país × indicador × ano.
+    """
+    coverage: np.ndarray      # fração dos anos do período com dado
+    observations: np.ndarray  # quantidade de anos com dado
+    gaps: np.ndarray          # quantidade de lacunas entre o primeiro e o último dado
+    longest_gap: np.ndarray   # maior lacuna (em anos) entre o primeiro e o último dado
+    last_year: np.ndarray     # ano do dado mais recente (NaN se a série está vazia)
+    latest: np.ndarray        # valor mais recente
+    previous: np.ndarray      # penúltimo valor disponível
+    outliers: np.ndarray      # True onde o z-score robusto passa de OUTLIER_THRESHOLD
+
+
+def series_stats(cube):
+    """
+    Calcula as métricas de METRICS para todas as séries do cubo país × indicador × ano de uma vez.
+
+    Retorna:
+    ndarray (len(METRICS), países, indicadores)
+    """
+    n_years = cube.shape[-1]
+    if n_years == 0:
+        stats = np.zeros((len(METRICS),) + cube.shape[:-1])
+        stats[METRICS.index("last_idx")] = -1
+        stats[METRICS.index("latest")] = stats[METRICS.index("previous")] = np.nan
+        return stats
+    present = ~np.isnan(cube)
+    positions = np.arange(n_years)
+    observations = present.sum(axis=-1)
+    has_data = observations > 0
+
+    # Primeiro e último ano com dado (-1 para séries vazias)
+    first_idx = np.where(has_data, present.argmax(axis=-1), -1)
+    last_idx = np.where(has_data, n_years - 1 - present[..., ::-1].argmax(axis=-1), -1)
+
+    # Lacunas: anos sem dado estritamente entre o primeiro e o último
+    interior = (positions > first_idx[..., None]) & (positions < last_idx[..., None])
+    missing = ~present & interior
+    previous_missing = np.concatenate([np.zeros_like(missing[..., :1]), missing[..., :-1]], axis=-1)
+    gaps = (missing & ~previous_missing).sum(axis=-1)
+    # Comprimento da lacuna em cada ano = distância até o último ano com dado antes dele
+    last_seen = np.maximum.accumulate(np.where(present, positions, -1), axis=-1)
+    longest_gap = np.where(missing, positions - last_seen, 0).max(axis=-1, initial=0)
+
+    # Valor mais recente e penúltimo: posições com 1 e 2 dados contando do fim
+    from_end = np.cumsum(present[..., ::-1], axis=-1)[..., ::-1]
+    second_idx = (present & (from_end == 2)).argmax(axis=-1)
+    take = lambda idx: np.take_along_axis(cube, np.maximum(idx, 0)[..., None], axis=-1)[..., 0]
+    latest = np.where(has_data, take(last_idx), np.nan)
+    previous = np.where(observations > 1, take(second_idx), np.nan)
+
+    return np.stack([
+        observations / max(n_years, 1),
+        observations,
+        gaps,
+        longest_gap,
+        last_idx,
+        latest,
+        previous,
+    ]).astype(float)
+
+
+def robust_outliers(cube, threshold=OUTLIER_THRESHOLD):
+    """
+    Marca valores atípicos de cada série pelo z-score robusto 0.6745 × (x - mediana) / MAD.
+
+    Séries com MAD nulo (quase constantes) não têm valores marcados.
+    """
+    with warnings.catch_warnings():
+        # Séries vazias produzem "All-NaN slice"; o resultado NaN já as exclui
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(cube, axis=-1, keepdims=True)
+        mad = np.nanmedian(np.abs(cube - median), axis=-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = 0.6745 * (cube - median) / mad
+    return np.abs(np.nan_to_num(z_score, nan=0.0, posinf=0.0, neginf=0.0)) > threshold
+
+
+def from_arrays(stats, outliers, years):
+    """
+    Monta um Quality a partir dos arrays de series_stats e robust_outliers (por exemplo, mapeados do snapshot).
+    """
+    metric = dict(zip(METRICS, stats))
+    last_idx = metric["last_idx"].astype(int)
+    last_year = np.where(last_idx >= 0, np.asarray(years)[np.maximum(last_idx, 0)] if len(years) else 0, np.nan)
+    return Quality(
+        coverage=metric["coverage"],
+        observations=metric["observations"].astype(int),
+        gaps=metric["gaps"].astype(int),
+        longest_gap=metric["longest_gap"].astype(int),
+        last_year=last_year,
+        latest=metric["latest"],
+        previous=metric["previous"],
+        outliers=np.asarray(outliers, dtype=bool),
+    )
@@ -0,0 +1,38 @@
+import numpy as np
+
+# Posição de cada país em cada indicador e ano, calculada de uma vez sobre o eixo dos países do cubo.
+
+
+def ranks_over_countries(values, descending=True):
+    """
+    Posição (1 = primeiro) de cada país ao longo do eixo 0, para todas as demais posições de uma vez.
+
+    Empates ficam na ordem dos países (como rank(method="first") do pandas); países sem valor ficam
+    com NaN e não contam na posição dos demais.
+
+    Parâmetros:
+    values (ndarray): array com os países no eixo 0 (por exemplo, o cubo país × indicador × ano)
+    descending (bool): True coloca o maior valor em 1º; False, o menor
+
+    Retorna:
+    ndarray de mesmo formato, com as posições como float (NaN sem valor)
+    """
+    missing = np.isnan(values)
+    # NaN vai para o fim da ordenação nos dois sentidos
+    keys = np.where(missing, np.inf, -values if descending else values)
+    order = np.argsort(keys, axis=0, kind="stable")
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, np.arange(1, values.shape[0] + 1, dtype=float).reshape((-1,) + (1,) * (values.ndim - 1)), axis=0)
+    ranks[missing] = np.nan
+    return ranks
+
+
+def latest_up_to(cube):
+    """
+    Valor mais recente até cada ano (último valor não nulo carregado para frente ao longo dos anos).
+    """
+    n_years = cube.shape[-1]
+    present = ~np.isnan(cube)
+    last_idx = np.maximum.accumulate(np.where(present, np.arange(n_years), -1), axis=-1)
+    filled = np.take_along_axis(cube, np.maximum(last_idx, 0), axis=-1)
+    return np.where(last_idx >= 0, filled, np.nan)
@@ -0,0 +1,37 @@
+import csv
+import os
+
+# Arquivo com o registro de indicadores (pode ser sobrescrito por variável de ambiente)
+REGISTRY_PATH = os.environ.get(
+    "DASHBOARD_INDICATORS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "indicadores.csv")
+)
+
+
+def load_registry(path=REGISTRY_PATH):
+    """
+    Lê o registro de indicadores (código, rótulo, unidade, regra de formatação, peso de risco, fonte, descrição).
+
+    Retorna uma lista de dicts na ordem do arquivo.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        entries = []
+        for row in csv.DictReader(f):
+            row["risk_weight"] = float(row["risk_weight"] or 0)
+            row["source"] = int(row["source"] or 2)  # 2 = World Development Indicators
+            entries.append(row)
+    return entries
+
+
+REGISTRY = load_registry()
+
+# Acesso pelo código do World Bank ou pelo rótulo usado como coluna nos DataFrames
+BY_CODE = {entry["code"]: entry for entry in REGISTRY}
+BY_LABEL = {entry["label"]: entry for entry in REGISTRY}
+
+
+def lookup(indicator):
+    """
+    Retorna a entrada do registro para um código ou rótulo de indicador (ou None).
+    """
+    return BY_CODE.get(indicator) or BY_LABEL.get(indicator)
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+import registry
+import series_cache
+from rankings import latest_up_to, ranks_over_countries
+
+# Valor base do score (mais baixo para aumentar a dispersão)
+BASE_SCORE = 35
+
+# Ajustes finais para casos específicos de países, pelo código ISO-3 (o nome muda entre as listas de
+# países do World Bank, por exemplo "Venezuela" e "Venezuela, RB")
+COUNTRY_ADJUSTMENTS = {
+    "VEN": 30,   # Condições econômicas extremas
+    "CHL": -15,  # Países economicamente mais estáveis
+    "URY": -15,
+    "BRA": -5,   # Grande economia, mas com problemas estruturais
+}
+
+# Limites das categorias de risco (os mesmos do card do dashboard); acima do último: "Alto Risco"
+CATEGORIES = ((30, "Baixo Risco"), (60, "Risco Moderado"))
+
+
+def risk_category(score):
+    """
+    Categoria de um score de risco.
+    """
+    for limit, label in CATEGORIES:
+        if score < limit:
+            return label
+    return "Alto Risco"
+
+
+def country_adjustments(countries, iso3=None):
+    """
+    Ajuste final de cada país (0 para os sem ajuste).
+
+    iso3: dict nome do país -> código ISO-3 (padrão: series_cache.iso3_codes())
+    """
+    iso3 = series_cache.iso3_codes() if iso3 is None else iso3
+    return np.array([COUNTRY_ADJUSTMENTS.get(iso3.get(country), 0) for country in countries], dtype=float)
+
+
+def _direct_impacts(latest, codes):
+    """
+    Impactos diretos de valores extremos em indicadores críticos, para todos os países de uma vez.
+
+    latest: DataFrame (ou dict de arrays) com o valor mais recente de cada indicador, por rótulo.
+    """
+    impact = 0.0
+    by_code = {code: label for label, code in codes.items() if label in latest}
+
+    # Inflação muito alta - até +45 pontos
+    if "FP.CPI.TOTL.ZG" in by_code:
+        inflation = latest[by_code["FP.CPI.TOTL.ZG"]]
+        impact = impact + np.where(inflation > 50, np.minimum((inflation - 50) * 0.8, 45), 0)
+    # Desemprego muito alto - até +25 pontos
+    if "SL.UEM.TOTL.ZS" in by_code:
+        unemployment = latest[by_code["SL.UEM.TOTL.ZS"]]
+        impact = impact + np.where(unemployment > 15, np.minimum((unemployment - 15) * 2, 25), 0)
+    # PIB muito baixo (menos de US$ 100 bilhões) - escala logarítmica, até +30 pontos
+    if "NY.GDP.MKTP.CD" in by_code:
+        gdp = latest[by_code["NY.GDP.MKTP.CD"]]
+        log_val = np.log10(np.maximum(gdp, 1e8) / 1e11)  # max com 1e8 para evitar log(0)
+        impact = impact + np.where(gdp < 1e11, np.minimum(-log_val * 10, 30), 0)
+    return impact
+
+
+def risk_components(df, iso3=None):
+    """
+    Parcelas do score de risco de todos os países: valor base, impactos de valores extremos, a parcela de
+    cada indicador com peso (percentil × peso) e o ajuste por país.
+
+    Parâmetros:
+    df (DataFrame): DataFrame completo com todos os indicadores
+    iso3 (dict): nome do país -> código ISO-3, para o ajuste por país (padrão: series_cache.iso3_codes())
+
+    Retorna:
+    DataFrame indexado pelo país, uma coluna por parcela (a soma, limitada a [0, 100], é o score)
+    """
+    weights = {entry["label"]: entry["risk_weight"] for entry in registry.REGISTRY if entry["label"] in df.columns}
+    codes = {entry["label"]: entry["code"] for entry in registry.REGISTRY}
+
+    # Valor mais recente não nulo de cada indicador, por país
+    latest = df.sort_values("date").groupby("country")[list(weights)].last()
+
+    components = pd.DataFrame(index=latest.index)
+    components["Base"] = float(BASE_SCORE)
+    components["Valores extremos"] = _direct_impacts(latest, codes)
+
+    for indicator, weight in weights.items():
+        values = latest[indicator]
+        n_countries = values.notna().sum()
+        if n_countries == 0 or weight == 0:
+            continue
+        # Ranking normalizado (0-100), maior valor no percentil 100; o sinal do peso define o efeito
+        percentile = (values.rank(method="first") - 1) / max(1, n_countries - 1) * 100
+        components[indicator] = (percentile * weight).fillna(0)
+
+    components["Ajuste do país"] = country_adjustments(components.index, iso3)
+    return components
+
+
+def calculate_risk_scores(df, iso3=None):
+    """
+    Calcula o score de risco de investimento de todos os países de uma vez.
+
+    Cada indicador do registro com peso não nulo entra como percentil (0-100) do valor mais recente do
+    país entre todos os países, multiplicado pelo peso; somam-se os impactos de valores extremos e os
+    ajustes por país (as parcelas de risk_components).
+
+    Parâmetros:
+    df (DataFrame): DataFrame completo com todos os indicadores
+    iso3 (dict): nome do país -> código ISO-3, para o ajuste por país (padrão: series_cache.iso3_codes())
+
+    Retorna:
+    Series: Score entre 0 (menor risco) e 100 (maior risco), indexada pelo país
+    """
+    if df.empty:
+        return pd.Series(dtype=float)
+
+    # Garantir que o score esteja no intervalo [0, 100]
+    return risk_components(df, iso3).sum(axis=1).clip(0, 100)
+
+
+def risk_scores_by_year(cube, countries, indicators, iso3=None):
+    """
+    Score de risco de todos os países em todos os anos de uma vez, a partir do cubo país × indicador × ano.
+
+    O score de cada ano é o de calculate_risk_scores com os dados disponíveis até aquele ano (o valor
+    mais recente de cada indicador até o ano); no último ano os dois coincidem.
+
+    Retorna:
+    array (países, anos) com o score entre 0 e 100
+    """
+    weights = {entry["label"]: entry["risk_weight"] for entry in registry.REGISTRY if entry["label"] in indicators}
+    codes = {entry["label"]: entry["code"] for entry in registry.REGISTRY}
+    latest = latest_up_to(cube[:, [indicators.index(label) for label in weights], :])
+    latest = {label: latest[:, k, :] for k, label in enumerate(weights)}
+
+    score = np.full((len(countries), cube.shape[-1]), float(BASE_SCORE))
+    score += _direct_impacts(latest, codes)
+
+    for indicator, weight in weights.items():
+        if weight == 0:
+            continue
+        values = latest[indicator]
+        n_countries = (~np.isnan(values)).sum(axis=0)
+        # Mesmo percentil de calculate_risk_scores, em todos os anos pelo eixo dos países
+        percentile = (ranks_over_countries(values, descending=False) - 1) / np.maximum(1, n_countries - 1) * 100
+        score += np.nan_to_num(percentile * weight)
+
+    score += country_adjustments(countries, iso3)[:, None]
+    return np.clip(score, 0, 100)
+
@@ -0,0 +1,90 @@
+from typing import NamedTuple
+
+import numpy as np
+
+# Triagem de países por condições em vários indicadores, avaliada sobre o cubo país × indicador × ano.
+
+OPERATORS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+# Quando as condições precisam valer
+MODES = ("latest", "any", "all")
+
+
+class Condition(NamedTuple):
+    indicator: int  # índice no eixo dos indicadores do cubo
+    operator: str  # uma das chaves de OPERATORS
+    value: float
+
+
+def build_index(latest):
+    """
+    Índice ordenado do valor mais recente de cada indicador, para responder faixas com busca binária.
+
+    Parâmetros:
+    latest (ndarray): valor mais recente país × indicador (NaN sem dado)
+
+    Retorna:
+    (ordem, valores): array indicador × países com os índices dos países em ordem crescente de valor e
+    os valores nessa ordem (NaN no fim)
+    """
+    order = np.argsort(latest, axis=0, kind="stable").T
+    return np.ascontiguousarray(order), np.take_along_axis(latest.T, order, axis=1)
+
+
+def _index_range(sorted_values, operator, value):
+    """
+    Posições [início, fim) do índice ordenado de um indicador que atendem a condição.
+    """
+    n_valid = int(np.count_nonzero(~np.isnan(sorted_values)))
+    if operator == "<":
+        return 0, int(np.searchsorted(sorted_values[:n_valid], value, side="left"))
+    if operator == "<=":
+        return 0, int(np.searchsorted(sorted_values[:n_valid], value, side="right"))
+    if operator == ">":
+        return int(np.searchsorted(sorted_values[:n_valid], value, side="right")), n_valid
+    return int(np.searchsorted(sorted_values[:n_valid], value, side="left")), n_valid
+
+
+def screen_latest(index, conditions):
+    """
+    Países cujo valor mais recente atende todas as condições (cada indicador com o seu ano mais recente).
+
+    Cada condição é uma faixa do índice ordenado (busca binária); o resultado é a interseção das faixas.
+
+    Retorna:
+    máscara booleana dos países
+    """
+    order, sorted_values = index
+    selected = np.ones(order.shape[1], dtype=bool)
+    for condition in conditions:
+        start, end = _index_range(sorted_values[condition.indicator], condition.operator, condition.value)
+        matches = np.zeros(order.shape[1], dtype=bool)
+        matches[order[condition.indicator, start:end]] = True
+        selected &= matches
+    return selected
+
+
+def screen_years(cube, conditions, start, end, mode="any"):
+    """
+    Países que atendem todas as condições nos anos entre as posições start e end (inclusive).
+
+    mode="any": em algum ano todas as condições valem ao mesmo tempo.
+    mode="all": cada condição vale em todos os anos com dado do indicador (e há ao menos um ano com dado).
+
+    Retorna:
+    (máscara dos países, máscara país × ano dos anos em que todas as condições valem)
+    """
+    if mode not in ("any", "all"):
+        raise ValueError(f"Modo de triagem desconhecido: {mode}")
+    block = cube[:, [condition.indicator for condition in conditions], start:end + 1]
+    present = ~np.isnan(block)
+    holds = np.zeros(block.shape, dtype=bool)
+    for k, condition in enumerate(conditions):
+        # Comparações com NaN dão False: ano sem dado não atende a condição
+        OPERATORS[condition.operator](block[:, k], condition.value, out=holds[:, k])
+
+    year_mask = holds.all(axis=1)
+    if mode == "any":
+        return year_mask.any(axis=1), year_mask
+    selected = (holds | ~present).all(axis=2).all(axis=1) & present.any(axis=2).all(axis=1)
+    return selected, year_mask
@@ -0,0 +1,203 @@
+"""
+Cache das séries do World Bank por país e indicador, cada uma com o instante da última coleta bem-sucedida.
+
+Uma atualização só pede de novo as séries vencidas. Quando a requisição de uma série falha, ela mantém
+o último valor obtido, continua vencida e fica marcada como falha: aparece como desatualizada no
+dashboard e é pedida de novo na próxima atualização, sem derrubar as demais.
+
+Layout (em DASHBOARD_SERIES_DIR):
+    series.npz   países (nome e ISO-3), códigos dos indicadores, anos, valores país × indicador × ano,
+                 instante da última coleta bem-sucedida de cada série (0 = nunca coletada) e
+                 se a última tentativa de coletá-la falhou
+"""
+import os
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+
+from data_api import (
+    COUNTRIES, COUNTRIES_PER_REQUEST, INDICATORS, REGION, _fetch_arrays, fetch_countries, indicator_batches,
+    region_dir
+)
+
+# Diretório do cache de séries (pode ser sobrescrito por variável de ambiente), um subdiretório por região
+SERIES_DIR = region_dir(os.environ.get(
+    "DASHBOARD_SERIES_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".series")
+))
+
+# Validade de cada série (segundos)
+MAX_AGE = 3600
+
+# Intervalo para tentar de novo quando alguma série ficou desatualizada por falha na coleta (segundos)
+RETRY_AFTER = 300
+
+_STATE = "series.npz"
+
+
+def _load_state(keys=None):
+    try:
+        with np.load(os.path.join(SERIES_DIR, _STATE), allow_pickle=False) as data:
+            return {key: data[key] for key in (keys or data.files)}
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(state):
+    # Arquivo temporário + os.replace: um leitor nunca vê o cache pela metade
+    os.makedirs(SERIES_DIR, exist_ok=True)
+    tmp_path = os.path.join(SERIES_DIR, f"series.{uuid.uuid4().hex}.tmp.npz")
+    np.savez(tmp_path, **state)
+    os.replace(tmp_path, os.path.join(SERIES_DIR, _STATE))
+
+
+def _aligned(state, names, codes, years):
+    """
+    Valores, instantes de coleta e falhas do cache reindexados para os eixos pedidos (ausentes: NaN / 0 / False).
+    """
+    values = np.full((len(names), len(codes), len(years)), np.nan)
+    fetched_at = np.zeros((len(names), len(codes)))
+    failed = np.zeros((len(names), len(codes)), dtype=bool)
+    if state is None:
+        return values, fetched_at, failed
+    country_pos = {name: i for i, name in enumerate(state["names"])}
+    code_pos = {code: i for i, code in enumerate(state["codes"])}
+    year_pos = {int(year): i for i, year in enumerate(state["years"])}
+    rows = [(i, country_pos[name]) for i, name in enumerate(names) if name in country_pos]
+    cols = [(j, code_pos[code]) for j, code in enumerate(codes) if code in code_pos]
+    steps = [(k, year_pos[int(year)]) for k, year in enumerate(years) if int(year) in year_pos]
+    if rows and cols:
+        (new_rows, old_rows), (new_cols, old_cols) = zip(*rows), zip(*cols)
+        fetched_at[np.ix_(new_rows, new_cols)] = state["fetched_at"][np.ix_(old_rows, old_cols)]
+        failed[np.ix_(new_rows, new_cols)] = state["failed"][np.ix_(old_rows, old_cols)]
+        if steps:
+            new_years, old_years = zip(*steps)
+            values[np.ix_(new_rows, new_cols, new_years)] = state["values"][np.ix_(old_rows, old_cols, old_years)]
+    return values, fetched_at, failed
+
+
+def refresh(region=REGION, start_year=2000, end_year=2025, max_age=MAX_AGE, now=None):
+    """
+    Atualiza as séries vencidas e retorna o conjunto combinado, com o mesmo formato de fetch_all_indicators.
+
+    As requisições continuam em lote (vários países e indicadores por URL), mas cada lote só inclui os
+    países que têm alguma série vencida entre os seus indicadores. Um lote que falha não altera as
+    séries dele: as vencidas ficam com o último valor obtido e marcadas como falha.
+    """
+    now = time.time() if now is None else now
+    state = _load_state()
+    try:
+        country_list = fetch_countries(region)
+    except requests.RequestException as e:
+        print(f"[ERRO] Lista de países ({region}): {e}")
+        country_list = pd.DataFrame(columns=["country", "iso3"])
+    if country_list.empty and state is not None:
+        # Lista de países indisponível: usa a do cache
+        countries = dict(zip(state["names"].tolist(), state["iso3"].tolist()))
+    else:
+        countries = dict(zip(country_list["country"], country_list["iso3"]))
+    names = sorted(countries)
+    codes = list(INDICATORS.values())
+    years = np.arange(start_year, end_year + 1)
+    values, fetched_at, failed = _aligned(state, names, codes, years)
+
+    country_index = {countries[name]: i for i, name in enumerate(names)}
+    code_index = {code: j for j, code in enumerate(codes)}
+    # Séries que falharam na última tentativa são pedidas de novo mesmo antes de vencer
+    stale = (now - fetched_at >= max_age) | failed
+    for source, batch in indicator_batches():
+        cols = [code_index[code] for code in batch]
+        rows = np.flatnonzero(stale[:, cols].any(axis=1))
+        for i in range(0, len(rows), COUNTRIES_PER_REQUEST):
+            chunk = rows[i:i + COUNTRIES_PER_REQUEST]
+            try:
+                arrays, complete = _fetch_arrays(
+                    batch, source, start_year, end_year, {names[r]: countries[names[r]] for r in chunk},
+                    country_index, {code: k for k, code in enumerate(batch)}
+                )
+            except requests.RequestException as e:
+                print(f"[ERRO] {';'.join(batch)}: {e}")
+                complete = False
+            block = np.ix_(chunk, cols)
+            if not complete:
+                failed[block] |= stale[block]
+                continue
+            values[block] = np.nan
+            in_range = (arrays["year"] >= start_year) & (arrays["year"] <= end_year)
+            values[
+                arrays["country"][in_range],
+                np.asarray(cols)[arrays["indicator"][in_range]],
+                arrays["year"][in_range] - start_year
+            ] = arrays["value"][in_range]
+            fetched_at[block] = now
+            failed[block] = False
+    if failed.any():
+        print(f"[ERRO] {int(failed.sum())} série(s) não atualizada(s); mantidos os últimos valores obtidos")
+
+    _save_state({
+        "names": np.asarray(names, dtype=str), "iso3": np.asarray([countries[name] for name in names], dtype=str),
+        "codes": np.asarray(codes, dtype=str), "years": years, "values": values, "fetched_at": fetched_at,
+        "failed": failed,
+    })
+    return _to_frame(values, names, years)
+
+
+def _to_frame(values, names, years):
+    """
+    Cubo país × indicador × ano -> uma linha por país e ano com algum valor, uma coluna por rótulo.
+    """
+    n_countries, n_indicators, n_years = values.shape
+    table = values.transpose(0, 2, 1).reshape(-1, n_indicators)
+    rows = np.flatnonzero(~np.isnan(table).all(axis=1))
+    if len(rows) == 0:
+        return pd.DataFrame(columns=["country", "date", *INDICATORS])
+    df = pd.DataFrame(table[rows], columns=list(INDICATORS))
+    df.insert(0, "date", pd.to_datetime((years[rows % n_years]).astype(str), format="%Y"))
+    df.insert(0, "country", np.asarray(names, dtype=object)[rows // n_years])
+    return df
+
+
+def iso3_codes():
+    """
+    Código ISO-3 de cada país pelo nome, sem acessar a rede: os da última coleta da região e, para os
+    demais, a lista fixa da América do Sul.
+    """
+    codes = dict(COUNTRIES)
+    state = _load_state(["names", "iso3"])
+    if state is not None:
+        codes.update(zip(state["names"].tolist(), state["iso3"].tolist()))
+    return codes
+
+
+def has_failures():
+    """
+    Se alguma série ficou com o último valor obtido porque a última coleta dela falhou.
+    """
+    state = _load_state(["failed"])
+    return state is not None and bool(state["failed"].any())
+
+
+def failed_series():
+    """
+    Séries cuja última tentativa de coleta falhou (exibidas com o último valor obtido).
+
+    Retorna:
+    DataFrame com colunas: country, indicator (rótulo), fetched_at (horário local, NaT se nunca coletada)
+    """
+    state = _load_state(["names", "codes", "fetched_at", "failed"])
+    columns = ["country", "indicator", "fetched_at"]
+    if state is None:
+        return pd.DataFrame(columns=columns)
+    labels = {code: label for label, code in INDICATORS.items()}
+    rows, cols = np.nonzero(state["failed"])
+    fetched = state["fetched_at"][rows, cols]
+    return pd.DataFrame({
+        "country": state["names"][rows].astype(object),
+        "indicator": [labels.get(code, code) for code in state["codes"][cols]],
+        "fetched_at": pd.to_datetime(np.where(fetched > 0, fetched, np.nan), unit="s", utc=True)
+        .tz_convert(datetime.now().astimezone().tzinfo),
+    }, columns=columns)
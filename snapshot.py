@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from data_api import region_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# Diretório compartilhado pelos processos do dashboard (pode ser sobrescrito por variável de ambiente), um subdiretório por região
+SNAPSHOT_DIR = region_dir(os.environ.get(
+    "DASHBOARD_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshot")
+))
+
+# Quantidade de versões antigas mantidas em disco além da atual
+KEEP_VERSIONS = 3
+
+# Espera depois de uma coleta que falhou (erro ou nenhum dado) antes de tentar de novo (segundos)
+RETRY_BACKOFF = 300
+
+_POINTER = "CURRENT"
+_LOCK = "refresh.lock"
+_FAILED = "refresh.failed"
+
+
+class Dataset(NamedTuple):
+    """
+    Versão publicada do conjunto de dados, com as colunas numéricas mapeadas em memória.
+    """
+    version: str
+    created_at: float
+    path: str
+    df: pd.DataFrame
+    countries: tuple
+    indicators: tuple
+    years: np.ndarray
+    cube: np.ndarray  # valores país × indicador × ano (NaN onde não há dado)
+
+
+def build_cube(df, countries, indicators, years):
+    """
+    Monta o array país × indicador × ano a partir do DataFrame longo (country, date, indicadores...).
+    """
+    cube = np.full((len(countries), len(indicators), len(years)), np.nan)
+    if df.empty:
+        return cube
+    country_idx = pd.Categorical(df["country"], categories=countries).codes
+    year_idx = df["date"].dt.year.to_numpy() - years[0]
+    cube[country_idx, :, year_idx] = df[list(indicators)].to_numpy(dtype=float)
+    return cube
+
+
+def _version_dir(version):
+    return os.path.join(SNAPSHOT_DIR, f"v-{version}")
+
+
+def _read_pointer():
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, _POINTER), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_pointer(version, created_at):
+    # Escreve em arquivo temporário e troca com os.replace: leitores veem a versão antiga ou a nova, nunca metade
+    tmp_path = os.path.join(SNAPSHOT_DIR, f"{_POINTER}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "created_at": created_at}, f)
+    os.replace(tmp_path, os.path.join(SNAPSHOT_DIR, _POINTER))
+
+
+def current_version():
+    """
+    Retorna (versão, instante de publicação) do snapshot atual, ou (None, None) se não houver.
+    """
+    pointer = _read_pointer()
+    if not pointer or not os.path.isdir(_version_dir(pointer["version"])):
+        return None, None
+    return pointer["version"], pointer["created_at"]
+
+
+def publish(df):
+    """
+    Grava o DataFrame e seus derivados como arquivos .npy em um diretório versionado e aponta CURRENT para ele.
+
+    A versão é o hash do conteúdo: publicar os mesmos dados apenas renova o instante de publicação.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    indicators = tuple(col for col in df.columns if col not in ["country", "date"])
+    if df.empty:
+        countries, years = (), np.arange(0)
+    else:
+        countries = tuple(sorted(df["country"].unique()))
+        year_values = df["date"].dt.year
+        years = np.arange(year_values.min(), year_values.max() + 1)
+    cube = build_cube(df, countries, indicators, years)
+
+    digest = hashlib.sha1()
+    digest.update(json.dumps([countries, indicators, years.tolist()]).encode("utf-8"))
+    digest.update(np.ascontiguousarray(cube).tobytes())
+    version = digest.hexdigest()[:12]
+    created_at = time.time()
+
+    if not os.path.isdir(_version_dir(version)):
+        tmp_dir = os.path.join(SNAPSHOT_DIR, f"tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        country_codes = pd.Categorical(df["country"], categories=countries).codes.astype(np.int32)
+        np.save(os.path.join(tmp_dir, "rows_country.npy"), country_codes)
+        np.save(os.path.join(tmp_dir, "rows_date.npy"), df["date"].to_numpy(dtype="datetime64[ns]"))
+        for i, name in enumerate(indicators):
+            np.save(os.path.join(tmp_dir, f"col_{i:03d}.npy"), df[name].to_numpy(dtype=float))
+        np.save(os.path.join(tmp_dir, "cube.npy"), cube)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": version,
+                "countries": countries,
+                "indicators": indicators,
+                "years": years.tolist()
+            }, f, ensure_ascii=False)
+        try:
+            os.rename(tmp_dir, _version_dir(version))
+        except OSError:
+            # Outro processo publicou a mesma versão ao mesmo tempo
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _write_pointer(version, created_at)
+    _prune(version)
+    return version
+
+
+def _prune(current):
+    """
+    Remove versões antigas, mantendo as KEEP_VERSIONS mais recentes além da atual.
+    """
+    old = [
+        entry.path for entry in os.scandir(SNAPSHOT_DIR)
+        if entry.is_dir() and entry.name.startswith("v-") and entry.name != f"v-{current}"
+    ]
+    old.sort(key=os.path.getmtime, reverse=True)
+    for path in old[KEEP_VERSIONS:]:
+        # No POSIX, processos que ainda mapeiam os arquivos continuam lendo normalmente
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def load(version, created_at=None):
+    """
+    Abre uma versão publicada mapeando os arrays em memória (somente leitura, sem cópia).
+    """
+    path = _version_dir(version)
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    countries = tuple(meta["countries"])
+    indicators = tuple(meta["indicators"])
+    country_codes = np.load(os.path.join(path, "rows_country.npy"), mmap_mode="r")
+
+    columns = {
+        # Os nomes dos países são objetos Python e precisam ser materializados por processo
+        "country": np.asarray(countries, dtype=object)[country_codes] if countries else np.array([], dtype=object),
+        "date": np.load(os.path.join(path, "rows_date.npy"), mmap_mode="r"),
+    }
+    for i, name in enumerate(indicators):
+        columns[name] = np.load(os.path.join(path, f"col_{i:03d}.npy"), mmap_mode="r")
+    # copy=False mantém cada coluna numérica apontando para as páginas mapeadas
+    df = pd.DataFrame(columns, copy=False)
+
+    return Dataset(
+        version=version,
+        created_at=created_at if created_at is not None else os.path.getmtime(path),
+        path=path,
+        df=df,
+        countries=countries,
+        indicators=indicators,
+        years=np.asarray(meta["years"], dtype=int),
+        cube=np.load(os.path.join(path, "cube.npy"), mmap_mode="r"),
+    )
+
+
+def derived(dataset, name, builder):
+    """
+    Retorna um array derivado da versão, calculando-o uma única vez entre todos os processos.
+
+    builder(dataset) deve retornar um np.ndarray; o resultado é gravado como <name>.npy no diretório
+    da versão e mapeado em memória nas chamadas seguintes.
+    """
+    target = os.path.join(dataset.path, f"{name}.npy")
+    if os.path.exists(target):
+        return np.load(target, mmap_mode="r")
+
+    result = np.asarray(builder(dataset))
+    try:
+        tmp_path = os.path.join(dataset.path, f"{name}.{uuid.uuid4().hex}.tmp.npy")
+        np.save(tmp_path, result)
+        os.replace(tmp_path, target)
+        return np.load(target, mmap_mode="r")
+    except OSError:
+        # Versão removida ou diretório somente leitura: usa o resultado em memória
+        return result
+
+
+def _last_failure():
+    """
+    Instante da última coleta que falhou, ou None se a última deu certo.
+    """
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, _FAILED), encoding="utf-8") as f:
+            return json.load(f)["failed_at"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _record_failure(reason):
+    tmp_path = os.path.join(SNAPSHOT_DIR, f"{_FAILED}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"failed_at": time.time(), "reason": reason}, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(SNAPSHOT_DIR, _FAILED))
+
+
+def refresh(fetch, max_age):
+    """
+    Publica uma nova versão com fetch() se a atual estiver ausente ou mais velha que max_age segundos.
+
+    Uma trava de arquivo garante que só um processo coleta por vez; os demais não esperam a coleta
+    e seguem com a versão publicada (só esperam quando ainda não há nenhuma). Depois de uma coleta que falhou (erro ou nenhum dado),
+    nenhum processo tenta de novo antes de RETRY_BACKOFF segundos: segue a versão atual (ou nenhuma).
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(SNAPSHOT_DIR, _LOCK), "w") as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Outro processo já está coletando
+                version, created_at = current_version()
+                if version is not None:
+                    return version, created_at
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            version, created_at = current_version()
+            if version is not None and time.time() - created_at < max_age:
+                return version, created_at
+
+            failed_at = _last_failure()
+            if failed_at is not None and time.time() - failed_at < RETRY_BACKOFF:
+                return version, created_at
+
+            try:
+                df = fetch()
+            except Exception as e:
+                _record_failure(str(e))
+                raise
+            if df.empty:
+                _record_failure("nenhum dado coletado")
+                return version, created_at
+            publish(df)
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, _FAILED))
+            except FileNotFoundError:
+                pass
+            return current_version()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
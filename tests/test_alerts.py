@@ -0,0 +1,175 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import alerts
+import series_cache
+from benchmark_escala import _synthetic_data
+from risk import calculate_risk_scores, risk_category
+
+INDICATOR = "Inflação (% anual)"
+YEARS = list(range(2015, 2021))
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(alerts, "ALERT_DIR", str(tmp_path / "alerts"))
+    monkeypatch.setattr(alerts, "WEBHOOK_URL", None)
+    monkeypatch.setattr(series_cache, "SERIES_DIR", str(tmp_path / "series"))
+
+
+def rule(kind, threshold, label=INDICATOR):
+    return {"name": f"{kind} {threshold}", "indicator": "", "kind": kind, "threshold": threshold, "label": label}
+
+
+def frame(values):
+    """
+    DataFrame no formato da coleta com um indicador: {país: [valor de cada ano de YEARS]}.
+    """
+    rows = [(country, pd.Timestamp(year=year, month=1, day=1), value)
+            for country, series in values.items() for year, value in zip(YEARS, series)]
+    return pd.DataFrame(rows, columns=["country", "date", INDICATOR])
+
+
+def changes(*cells):
+    """
+    Mudanças no formato de vintages.record a partir de (país, ano, anterior, novo).
+    """
+    return pd.DataFrame(
+        [(country, INDICATOR, year, previous, value) for country, year, previous, value in cells],
+        columns=["country", "indicator", "year", "previous", "value"]
+    )
+
+
+def fired(result):
+    return sorted(zip(result["country"], result["year"]))
+
+
+@pytest.mark.parametrize("kind, threshold, before, after, expected", [
+    ("above", 10, 5, 15, True),
+    ("above", 10, 12, 15, False),    # já estava acima
+    ("above", 10, 15, 5, False),
+    ("below", 0, 5, -1, True),
+    ("below", 0, -2, -1, False),
+    ("below", 0, -1, 5, False),
+    ("above", 10, np.nan, 15, True),  # célula nova
+    ("above", 10, 15, np.nan, False),  # célula removida
+])
+def test_value_rules(kind, threshold, before, after, expected):
+    df = frame({"Brazil": [1, 1, 1, 1, 1, after], "Chile": [1] * 6}).dropna()
+    result = alerts.evaluate(changes(("Brazil", 2020, before, after)), df, [rule(kind, threshold)])
+    assert fired(result) == ([("Brazil", 2020)] if expected else [])
+    if expected:
+        row = result.iloc[0]
+        assert row["rule"] == f"{kind} {threshold}" and row["value"] == after
+        if np.isnan(before):
+            assert np.isnan(row["previous"])
+        else:
+            assert row["previous"] == before
+
+
+def test_old_years_do_not_fire():
+    df = frame({"Brazil": [50, 1, 1, 1, 1, 1]})
+    result = alerts.evaluate(changes(("Brazil", 2015, 1, 50)), df, [rule("above", 10)])
+    assert result.empty
+
+
+def test_change_rules_look_at_next_year():
+    # 2019 revisado de 100 para 80: queda de 20% em 2019 e alta de 25% em 2020
+    df = frame({"Brazil": [100, 100, 100, 100, 80, 100]})
+    cells = changes(("Brazil", 2019, 100, 80))
+    assert fired(alerts.evaluate(cells, df, [rule("drop", 10)])) == [("Brazil", 2019)]
+    assert fired(alerts.evaluate(cells, df, [rule("rise", 10)])) == [("Brazil", 2020)]
+    assert alerts.evaluate(cells, df, [rule("drop", 30)]).empty
+    rise = alerts.evaluate(cells, df, [rule("rise", 10)]).iloc[0]
+    assert "25.0%" in rise["message"]
+
+
+def test_change_rules_do_not_fire_again():
+    df = frame({"Brazil": [100, 100, 100, 100, 70, 60]})
+    # 2019 já era uma queda de 20%; a revisão para 70 só aprofunda
+    assert alerts.evaluate(changes(("Brazil", 2019, 80, 70)), df, [rule("drop", 10)]).empty
+
+
+def test_no_changes():
+    df = frame({"Brazil": [1] * 6})
+    assert alerts.evaluate(changes(), df, [rule("above", 0)]).empty
+
+
+def test_risk_category_change():
+    df = _synthetic_data(12, 6)
+    last_year = df["date"].max()
+    latest = df["date"] == last_year
+    before = df.copy()
+    after = df.copy()
+    # Um país passa da menor para a maior inflação e desemprego: sobe de categoria
+    country = df["country"].iloc[0]
+    target = latest & (df["country"] == country)
+    for label in (INDICATOR, "Desemprego (% força de trabalho)"):
+        before.loc[target, label] = df.loc[latest, label].min() - 1
+        after.loc[target, label] = df.loc[latest, label].max() + 1
+    cells = pd.DataFrame({
+        "country": country, "indicator": [INDICATOR, "Desemprego (% força de trabalho)"], "year": last_year.year,
+        "previous": before.loc[target, [INDICATOR, "Desemprego (% força de trabalho)"]].to_numpy()[0],
+        "value": after.loc[target, [INDICATOR, "Desemprego (% força de trabalho)"]].to_numpy()[0],
+    })
+
+    old, new = calculate_risk_scores(before), calculate_risk_scores(after)
+    moved = sorted(c for c in new.index if risk_category(old[c]) != risk_category(new[c]))
+    assert country in moved
+
+    result = alerts.evaluate(cells, after, [rule("risk_category", 0, label=None)])
+    assert sorted(result["country"]) == moved
+    row = result[result["country"] == country].iloc[0]
+    assert row["previous"] == pytest.approx(old[country]) and row["value"] == pytest.approx(new[country])
+    assert risk_category(old[country]) in row["message"] and risk_category(new[country]) in row["message"]
+
+    # Sem mudança em indicador com peso, a regra de risco nem é avaliada
+    cells["indicator"] = "Taxa de câmbio (LCU/US$)"
+    assert alerts.evaluate(cells, after, [rule("risk_category", 0, label=None)]).empty
+
+
+def test_process_records_and_recent(monkeypatch):
+    monkeypatch.setattr(alerts, "load_rules", lambda: [rule("above", 10)])
+    df = frame({"Brazil": [1, 1, 1, 1, 1, 15], "Chile": [1, 1, 1, 1, 1, 20]})
+    assert alerts.process(changes(), df, timestamp=100).empty
+
+    alerts.process(changes(("Brazil", 2020, 5, 15)), df, timestamp=100)
+    alerts.process(changes(("Chile", 2020, 5, 20)), df, timestamp=200)
+    with open(os.path.join(alerts.ALERT_DIR, alerts._LOG), encoding="utf-8") as f:
+        logged = [json.loads(line) for line in f]
+    assert [(r["timestamp"], r["country"]) for r in logged] == [(100, "Brazil"), (200, "Chile")]
+
+    recent = alerts.recent(0)
+    assert list(recent.columns) == alerts._COLUMNS
+    assert recent["country"].tolist() == ["Chile", "Brazil"]
+    assert alerts.recent(100)["country"].tolist() == ["Chile"]
+    assert alerts.recent(200).empty
+
+
+def test_recent_reads_rotated_log(monkeypatch):
+    monkeypatch.setattr(alerts, "load_rules", lambda: [rule("above", 10)])
+    # Registro e blocos pequenos: rotação e linhas cortadas entre blocos
+    monkeypatch.setattr(alerts, "MAX_LOG_BYTES", 600)
+    monkeypatch.setattr(alerts, "_READ_BLOCK", 50)
+    df = frame({"Brazil": [1, 1, 1, 1, 1, 15]})
+    for t in range(1, 21):
+        alerts.process(changes(("Brazil", 2020, 5, 15)), df, timestamp=t)
+    path = os.path.join(alerts.ALERT_DIR, alerts._LOG)
+    assert os.path.exists(f"{path}.1")
+    assert os.path.getsize(path) < alerts.MAX_LOG_BYTES + 200
+
+    with open(path, encoding="utf-8") as f:
+        first_current = json.loads(f.readline())["timestamp"]
+    with open(f"{path}.1", encoding="utf-8") as f:
+        first_rotated = json.loads(f.readline())["timestamp"]
+    assert alerts.recent(0)["timestamp"].tolist() == list(range(20, first_rotated - 1, -1))
+    assert alerts.recent(first_current)["timestamp"].tolist() == list(range(20, first_current, -1))
+    assert alerts.recent(first_current - 2)["timestamp"].tolist() == list(range(20, first_current - 2, -1))
+
+
+def test_recent_without_log():
+    assert alerts.recent(0).empty
@@ -0,0 +1,45 @@
+import statistics
+import tracemalloc
+
+import pytest
+
+import alerts
+import benchmark_alocacoes
+import series_cache
+import snapshot
+import vintages
+from benchmark_escala import _synthetic_data
+
+# Conjunto pequeno e poucas reexecuções, com o mesmo orçamento do benchmark completo
+COUNTRIES = 12
+YEARS = 26
+RERUNS = 3
+
+
+@pytest.fixture
+def published(tmp_path, monkeypatch):
+    """
+    Snapshot sintético em um diretório temporário; o app só o lê, sem coleta no World Bank.
+    """
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setattr(vintages, "VINTAGE_DIR", str(tmp_path / "vintages"))
+    monkeypatch.setattr(series_cache, "SERIES_DIR", str(tmp_path / "series"))
+    monkeypatch.setattr(alerts, "ALERT_DIR", str(tmp_path / "alerts"))
+    df = _synthetic_data(COUNTRIES, YEARS, seed=0)
+    snapshot.publish(df)
+    countries = sorted(df["country"].unique())
+    indicators = [col for col in df.columns if col not in ["country", "date"]]
+    return countries, indicators
+
+
+@pytest.mark.parametrize("mode", ["pais", "comparacao"])
+def test_rerun_allocation_peak_within_budget(published, mode):
+    countries, indicators = published
+    tracemalloc.start()
+    try:
+        peaks, _ = benchmark_alocacoes.measure_mode(mode, countries, indicators, RERUNS, seed=0)
+    finally:
+        tracemalloc.stop()
+
+    assert len(peaks) == RERUNS
+    assert statistics.median(peaks) / 2 ** 20 < benchmark_alocacoes.BUDGET_MB
@@ -0,0 +1,113 @@
+import csv
+import gzip
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import api_server
+import series_cache
+import snapshot
+from benchmark_escala import _synthetic_data
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    """
+    Servidor em uma porta livre lendo um snapshot sintético publicado em um diretório temporário.
+    """
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+    monkeypatch.setattr(series_cache, "SERIES_DIR", str(tmp_path / "series"))
+    monkeypatch.setattr(api_server, "_state", {"version": None, "dataset": None, "risk": None, "quality": None})
+    snapshot.publish(_synthetic_data(12, 26))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), api_server.Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, **headers):
+    """
+    (status, cabeçalhos, corpo já descomprimido) de um GET; erros HTTP também são devolvidos.
+    """
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            status, head, body = response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        status, head, body = e.code, e.headers, e.read()
+    if head.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+    return status, head, body.decode("utf-8")
+
+
+def parse(head, body):
+    if head["Content-Type"].startswith("text/csv"):
+        return list(csv.DictReader(io.StringIO(body)))
+    return json.loads(body)
+
+
+@pytest.mark.parametrize("path", ["/version", "/dataset?country=Brazil,Chile&year=2020:2022", "/latest", "/risk"])
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+def test_ok_then_not_modified(base_url, path, fmt):
+    sep = "&" if "?" in path else "?"
+    status, head, body = get(f"{base_url}{path}{sep}format={fmt}")
+    assert status == 200
+    assert head["Content-Type"].startswith("application/json" if fmt == "json" else "text/csv")
+    assert head["ETag"].startswith('W/"')
+    assert head["ETag"].endswith('-csv"') == (fmt == "csv")
+    assert parse(head, body)
+
+    status, head_304, body = get(f"{base_url}{path}{sep}format={fmt}", **{"If-None-Match": head["ETag"]})
+    assert status == 304
+    assert head_304["ETag"] == head["ETag"]
+    assert body == ""
+
+
+def test_formats_have_same_records(base_url):
+    _, json_head, json_body = get(f"{base_url}/dataset?country=Brazil&year=2015:2020")
+    _, csv_head, csv_body = get(f"{base_url}/dataset?country=Brazil&year=2015:2020", Accept="text/csv")
+    records, rows = parse(json_head, json_body), parse(csv_head, csv_body)
+    assert csv_head["Content-Type"].startswith("text/csv")
+    assert len(records) == len(rows) == 6
+    assert list(records[0]) == list(rows[0])
+    assert [r["year"] for r in records] == [int(r["year"]) for r in rows]
+
+
+def test_etag_is_per_representation(base_url):
+    _, head, _ = get(f"{base_url}/latest")
+    status, _, _ = get(f"{base_url}/latest?format=csv", **{"If-None-Match": head["ETag"]})
+    assert status == 200
+
+
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+def test_gzip(base_url, fmt):
+    status, head, body = get(f"{base_url}/dataset?format={fmt}", **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert head["Content-Encoding"] == "gzip"
+    assert "Accept" in head["Vary"]
+    assert parse(head, body)
+
+
+@pytest.mark.parametrize("query", ["/dataset?year=abc", "/dataset?country=Atlantida", "/risk?country=Atlantida",
+                                   "/latest?format=xml"])
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+def test_bad_request_is_json(base_url, query, fmt):
+    status, head, body = get(f"{base_url}{query}", Accept=f"text/{fmt}", **{"If-None-Match": "*"})
+    assert status == 400
+    assert head["Content-Type"].startswith("application/json")
+    assert "erro" in json.loads(body)
+
+
+@pytest.mark.parametrize("fmt", ["json", "csv"])
+def test_unknown_route(base_url, fmt):
+    status, head, body = get(f"{base_url}/nada?format={fmt}")
+    assert status == 404
+    assert "erro" in json.loads(body)
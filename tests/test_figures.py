@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import figures
+
+SERIES = pd.DataFrame({"date": pd.to_datetime(["2019", "2020", "2021"]), "value": [1.5e12, 2e12, np.nan]})
+
+
+@pytest.mark.parametrize("indicator", ["PIB (US$ atual)", "NY.GDP.MKTP.CD"])
+def test_gdp_axis_is_scaled(indicator):
+    fig = figures.indicator_series(SERIES, indicator, "Brazil")
+    assert fig.layout.yaxis.ticksuffix == " TRI"
+    np.testing.assert_allclose(fig.data[0].y, [1.5, 2.0, np.nan])
+
+
+def test_other_indicators_keep_values():
+    fig = figures.indicator_series(SERIES, "Inflação (% anual)", "Brazil")
+    assert fig.layout.yaxis.ticksuffix is None
+    np.testing.assert_allclose(fig.data[0].y, SERIES["value"])
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import registry
+from formatting import _CURRENCY_SCALES, format_number, format_rule, format_series
+
+# Limites de cada faixa de magnitude, logo abaixo e logo acima, com os dois sinais
+BOUNDARIES = [
+    v
+    for threshold, _, _ in _CURRENCY_SCALES
+    for base in (threshold, np.nextafter(threshold, 0), threshold * (1 - 1e-9), threshold - 0.5, threshold + 0.5)
+    for v in (base, -base)
+]
+VALUES = [
+    np.nan, 0.0, -0.0, 0.004, 0.005, -0.05, 0.05, 1.25, -1.25, 99.95, 999.5, -999.5, 123456.789,
+    1e15, -1e15, np.inf, -np.inf, *BOUNDARIES,
+]
+
+RULES = (
+    [entry["code"] for entry in registry.REGISTRY]
+    + [entry["label"] for entry in registry.REGISTRY]
+    + ["RISK_SCORE", "PIB per capita", "GDP growth", "Indicador desconhecido"]
+)
+
+
+def test_every_format_is_covered():
+    assert {format_rule(rule) for rule in RULES} == {"currency", "percent", "exchange", "score", "default"}
+
+
+@pytest.mark.parametrize("rule", RULES)
+def test_series_matches_scalar(rule):
+    values = pd.Series(VALUES, index=[f"v{i}" for i in range(len(VALUES))])
+    result = format_series(values, rule)
+    assert result.index.equals(values.index)
+    assert result.tolist() == [format_number(v, rule) for v in VALUES]
+
+
+@pytest.mark.parametrize("rule", ["NY.GDP.MKTP.CD", "FP.CPI.TOTL.ZG", "RISK_SCORE"])
+def test_series_without_values(rule):
+    assert format_series(pd.Series([np.nan, None], dtype=float), rule).tolist() == ["-", "-"]
+    assert format_series(pd.Series([], dtype=float), rule).empty
+
+
+def test_currency_scales():
+    assert format_number(1e12, "NY.GDP.MKTP.CD") == "US$ 1.00 TRI"
+    assert format_number(-2.5e9, "NY.GDP.MKTP.CD") == "US$ -2.50 BI"
+    assert format_number(999_999.4, "NY.GDP.MKTP.CD") == "US$ 999,999"
+    assert format_number(1_000_000, "NY.GDP.MKTP.CD") == "US$ 1.00 MI"
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+import nowcast
+
+YEARS = np.arange(2000, 2021)
+
+
+def reference_ar1(series, steps):
+    """
+    AR(1) de uma série, ano a ano, para comparar com a versão vetorizada.
+    """
+    idx = np.flatnonzero(~np.isnan(series))
+    last = idx[-1]
+    window = [i for i in idx if i > last - nowcast.FIT_WINDOW]
+    mean = np.mean(series[window])
+    pairs = [(i - 1, i) for i in window if i - 1 in window]
+    cross = sum((series[i] - mean) * (series[j] - mean) for i, j in pairs)
+    lagged = sum((series[i] - mean) ** 2 for i, _ in pairs)
+    if len(pairs) < nowcast.MIN_FIT_POINTS or lagged == 0:
+        return np.full(len(steps), series[last])
+    phi = np.clip(cross / lagged, -nowcast.MAX_PHI, nowcast.MAX_PHI)
+    return mean + phi ** np.asarray(steps) * (series[last] - mean)
+
+
+def reference_trend(series, steps):
+    idx = np.flatnonzero(~np.isnan(series))
+    last = idx[-1]
+    window = idx[idx > last - nowcast.FIT_WINDOW]
+    if len(window) < nowcast.MIN_FIT_POINTS:
+        return np.full(len(steps), series[last])
+    slope, intercept = np.polyfit(window - last, series[window], 1)
+    return intercept + slope * np.asarray(steps)
+
+
+@pytest.fixture
+def cube():
+    rng = np.random.default_rng(0)
+    values = rng.normal(10, 3, (6, 4, len(YEARS))).cumsum(axis=-1)
+    # Séries terminando em anos diferentes e sem lacunas internas (a interpolação é testada à parte)
+    for c in range(values.shape[0]):
+        for i in range(values.shape[1]):
+            values[c, i, len(YEARS) - 1 - (c + i) % 4:] = np.nan
+    return values
+
+
+@pytest.mark.parametrize("method, reference", [("ar1", reference_ar1), ("trend", reference_trend)])
+def test_projection_matches_reference(cube, method, reference):
+    filled, estimated, years = nowcast.nowcast(cube, YEARS, YEARS[-1], method)
+    assert (years == YEARS).all()
+    for c in range(cube.shape[0]):
+        for i in range(cube.shape[1]):
+            series = cube[c, i]
+            last = np.flatnonzero(~np.isnan(series))[-1]
+            future = np.arange(last + 1, len(YEARS))
+            np.testing.assert_allclose(filled[c, i, future], reference(series, future - last))
+            np.testing.assert_array_equal(filled[c, i, :last + 1], series[:last + 1])
+            assert estimated[c, i].sum() == len(future)
+
+
+def test_trend_continues_line():
+    series = np.where(YEARS <= 2016, 2.0 * (YEARS - 2000) + 1, np.nan)[None, None, :]
+    filled, _, _ = nowcast.nowcast(series, YEARS, 2020, "trend")
+    np.testing.assert_allclose(filled[0, 0, -4:], 2.0 * (np.arange(2017, 2021) - 2000) + 1)
+
+
+def test_short_series_repeats_last_value():
+    series = np.full((1, 1, len(YEARS)), np.nan)
+    series[0, 0, 10:12] = [3.0, 5.0]
+    for method in nowcast.METHODS:
+        filled, estimated, _ = nowcast.nowcast(series, YEARS, 2015, method)
+        np.testing.assert_allclose(filled[0, 0, 12:16], 5.0)
+        assert np.isnan(filled[0, 0, 16:]).all()
+        assert estimated[0, 0].sum() == 4
+
+
+def test_interior_gaps_are_interpolated():
+    series = np.arange(len(YEARS), dtype=float)[None, None, :]
+    series[0, 0, [3, 4, 9]] = np.nan
+    filled, estimated, _ = nowcast.nowcast(series, YEARS, YEARS[-1])
+    np.testing.assert_allclose(filled[0, 0], np.arange(len(YEARS)))
+    assert np.flatnonzero(estimated[0, 0]).tolist() == [3, 4, 9]
+
+
+@pytest.mark.parametrize("method", nowcast.METHODS)
+def test_horizon_cutoff(method):
+    series = np.where(YEARS <= 2010, YEARS - 2000.0, np.nan)[None, None, :]
+    filled, estimated, _ = nowcast.nowcast(series, YEARS, YEARS[-1], method)
+    last = 10
+    projected = slice(last + 1, last + 1 + nowcast.MAX_HORIZON)
+    assert np.isfinite(filled[0, 0, projected]).all()
+    assert estimated[0, 0, projected].all()
+    assert np.isnan(filled[0, 0, last + 1 + nowcast.MAX_HORIZON:]).all()
+    assert not estimated[0, 0, last + 1 + nowcast.MAX_HORIZON:].any()
+
+
+@pytest.mark.parametrize("method", nowcast.METHODS)
+def test_target_beyond_years_extends_axis(method):
+    series = np.arange(len(YEARS), dtype=float)[None, None, :]
+    filled, estimated, years = nowcast.nowcast(series, YEARS, 2023, method)
+    assert years[-3:].tolist() == [2021, 2022, 2023]
+    assert np.isfinite(filled).all()
+    assert estimated[0, 0, -3:].all() and not estimated[0, 0, :-3].any()
+
+
+@pytest.mark.parametrize("method", nowcast.METHODS)
+def test_all_nan_series_stay_nan(method):
+    cube = np.full((2, 3, len(YEARS)), np.nan)
+    cube[0, 0] = np.arange(len(YEARS))
+    filled, estimated, _ = nowcast.nowcast(cube, YEARS, 2022, method)
+    assert np.isnan(filled[1]).all() and np.isnan(filled[0, 1:]).all()
+    assert not estimated[1].any() and not estimated[0, 1:].any()
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        nowcast.nowcast(np.zeros((1, 1, 3)), [2000, 2001, 2002], 2002, "arima")
@@ -0,0 +1,44 @@
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import profiling
+
+# Página perfilada que para no meio, como o app.py sem países selecionados
+PAGE = """
+import streamlit as st
+st.markdown("antes")
+st.stop()
+st.markdown("depois")
+"""
+
+
+def test_import_keeps_streamlit_stop():
+    assert st.stop is not profiling._stop
+
+
+def test_overlapping_runs_restore_stop():
+    original = st.stop
+    with profiling._stop_patched():
+        assert st.stop is profiling._stop
+        with profiling._stop_patched():
+            pass
+        # Outra execução perfilada ainda em andamento: continua substituído
+        assert st.stop is profiling._stop
+    assert st.stop is original
+
+
+def test_stop_ends_only_profiled_script(tmp_path):
+    page = tmp_path / "pagina.py"
+    page.write_text(PAGE, encoding="utf-8")
+
+    def app(path):
+        import streamlit as st
+        import profiling
+        profiling.run_profiled(path, "cpu")
+        st.markdown("fim")
+
+    at = AppTest.from_function(app, args=(str(page),), default_timeout=30).run()
+    assert not at.exception
+    assert [m.value for m in at.markdown] == ["antes", "fim"]
+    assert [e.label for e in at.expander] == ["Perfil da execução (cpu)"]
+    assert st.stop is not profiling._stop
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import providers
+
+GDP = "PIB (US$ atual)"
+INFLATION = "Inflação (% anual)"
+
+
+class FakeProvider(providers.Provider):
+    """
+    Provedor com células fixas; com `release` definido, o fetch() só termina quando o evento é sinalizado.
+    """
+    def __init__(self, name, precedence, cells, timeout=5, release=None):
+        self.name = name
+        self.precedence = precedence
+        self.timeout = timeout
+        self.cells = cells
+        self.release = release
+        self.calls = 0
+
+    def fetch(self, start_year, end_year):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(10)
+        return pd.DataFrame(self.cells, columns=["country", "indicator", "year", "value"])
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(providers, "PROVIDER_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        providers, "fetch_countries", lambda region: pd.DataFrame({"iso3": ["BRA", "CHL"], "country": ["Brazil", "Chile"]})
+    )
+
+
+def value(df, country, year, label):
+    row = df[(df["country"] == country) & (df["date"].dt.year == year)]
+    return row[label].iloc[0] if len(row) else np.nan
+
+
+def test_reconcile_prefers_higher_precedence():
+    low = pd.DataFrame({
+        "country": ["Brazil", "Brazil", "Chile"], "indicator": [GDP, INFLATION, GDP],
+        "year": [2020, 2020, 2021], "value": [1.0, 4.0, 3.0],
+    })
+    high = pd.DataFrame({"country": ["Brazil"], "indicator": [GDP], "year": [2020], "value": [2.0]})
+
+    df = providers.reconcile([(0, low), (10, high)])
+
+    assert value(df, "Brazil", 2020, GDP) == 2.0
+    # Células que só o provedor de menor precedência tem continuam no resultado
+    assert value(df, "Brazil", 2020, INFLATION) == 4.0
+    assert value(df, "Chile", 2021, GDP) == 3.0
+    assert np.isnan(value(df, "Chile", 2021, INFLATION))
+
+
+def test_reconcile_order_does_not_matter():
+    a = pd.DataFrame({"country": ["Brazil"], "indicator": [GDP], "year": [2020], "value": [1.0]})
+    b = pd.DataFrame({"country": ["Brazil"], "indicator": [GDP], "year": [2020], "value": [2.0]})
+
+    assert value(providers.reconcile([(5, a), (1, b)]), "Brazil", 2020, GDP) == 1.0
+    assert value(providers.reconcile([(1, b), (5, a)]), "Brazil", 2020, GDP) == 1.0
+
+
+def test_collect_maps_iso3_and_applies_precedence():
+    base = FakeProvider("base", 0, [("BRA", "NY.GDP.MKTP.CD", 2020, 1.0), ("CHL", "NY.GDP.MKTP.CD", 2020, 5.0)])
+    override = FakeProvider("override", 10, [("Brazil", GDP, 2020, 2.0)])
+
+    df = providers.collect(2019, 2021, [base, override])
+
+    assert value(df, "Brazil", 2020, GDP) == 2.0
+    assert value(df, "Chile", 2020, GDP) == 5.0
+
+
+def test_slow_provider_falls_back_to_cache_without_holding_others():
+    release = threading.Event()
+    slow = FakeProvider("lento", 10, [("BRA", "NY.GDP.MKTP.CD", 2020, 1.0)], timeout=0.2)
+    fast = FakeProvider("rapido", 0, [("BRA", "NY.GDP.MKTP.CD", 2020, 9.0), ("CHL", "NY.GDP.MKTP.CD", 2020, 5.0)])
+    # Primeira coleta sem atraso: o resultado do provedor lento fica em cache
+    providers.collect(2019, 2021, [slow, fast])
+
+    slow.cells = [("BRA", "NY.GDP.MKTP.CD", 2020, 2.0)]
+    slow.release = release
+    started = time.monotonic()
+    try:
+        df = providers.collect(2019, 2021, [slow, fast])
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    # O provedor lento entra com o cache (1.0, não o valor novo), e a coleta não espera além do prazo dele
+    assert value(df, "Brazil", 2020, GDP) == 1.0
+    assert value(df, "Chile", 2020, GDP) == 5.0
+    assert elapsed < 2
+    assert fast.calls == 2
+
+
+def test_slow_provider_without_cache_is_left_out():
+    release = threading.Event()
+    slow = FakeProvider("lento_sem_cache", 10, [("BRA", "NY.GDP.MKTP.CD", 2020, 1.0)], timeout=0.2, release=release)
+    fast = FakeProvider("rapido_sem_cache", 0, [("BRA", "NY.GDP.MKTP.CD", 2020, 9.0)])
+    try:
+        df = providers.collect(2019, 2021, [slow, fast])
+    finally:
+        release.set()
+
+    assert value(df, "Brazil", 2020, GDP) == 9.0
+
+
+def test_provider_still_running_is_not_called_again():
+    release = threading.Event()
+    slow = FakeProvider("ocupado", 0, [("BRA", "NY.GDP.MKTP.CD", 2020, 1.0)], timeout=0.2, release=release)
+    other = FakeProvider("outro", 0, [("CHL", "NY.GDP.MKTP.CD", 2020, 5.0)])
+    try:
+        providers.collect(2019, 2021, [slow, other])
+        providers.collect(2019, 2021, [slow, other])
+        assert slow.calls == 1
+    finally:
+        release.set()
+
+    # Terminada a chamada pendente, a trava é liberada e a próxima coleta chama o provedor de novo
+    deadline = time.monotonic() + 5
+    while providers._busy_lock(slow).locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    slow.release = None
+    providers.collect(2019, 2021, [slow, other])
+    assert slow.calls == 2
+
+
+def test_unknown_countries_are_dropped(capsys):
+    cells = pd.DataFrame({
+        "country": ["BRA", "Chile", "Atlântida", "XYZ"], "indicator": ["NY.GDP.MKTP.CD"] * 4,
+        "year": [2020] * 4, "value": [1.0, 2.0, 3.0, 4.0],
+    })
+
+    normalized = providers._normalize(cells, {"BRA": "Brazil", "CHL": "Chile"}, 2019, 2021)
+
+    # ISO-3 e nomes da região são aceitos; os demais saem e aparecem no aviso
+    assert sorted(normalized["country"]) == ["Brazil", "Chile"]
+    assert "Atlântida, XYZ" in capsys.readouterr().out
+
+
+def test_countries_kept_without_country_list():
+    cells = pd.DataFrame({"country": ["Brazil"], "indicator": [GDP], "year": [2020], "value": [1.0]})
+
+    assert providers._normalize(cells, {}, 2019, 2021)["country"].tolist() == ["Brazil"]
+
+
+def test_country_list_failure_uses_known_countries(monkeypatch, tmp_path):
+    def offline(region):
+        raise ConnectionError("sem conexão")
+    monkeypatch.setattr(providers, "fetch_countries", offline)
+    monkeypatch.setattr(providers.series_cache, "SERIES_DIR", str(tmp_path / "series"))
+    base = FakeProvider("base", 0, [("BRA", "NY.GDP.MKTP.CD", 2020, 1.0), ("XYZ", "NY.GDP.MKTP.CD", 2020, 5.0)])
+    other = FakeProvider("other", 10, [("Chile", GDP, 2020, 2.0)])
+
+    df = providers.collect(2019, 2021, [base, other])
+
+    # Sem a lista, os ISO-3 conhecidos (lista fixa da América do Sul) continuam virando nomes
+    assert sorted(df["country"]) == ["Brazil", "Chile"]
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import series_cache
+from data_api import INDICATORS
+
+COUNTRIES = {"Argentina": "ARG", "Brazil": "BRA", "Chile": "CHL"}
+START, END = 2018, 2020
+NOW = 1_700_000_000
+LABELS = {code: label for label, code in INDICATORS.items()}
+# Lotes menores que os do registro, para que uma falha atinja só parte dos indicadores
+BATCHES = [("2", list(INDICATORS.values())[i:i + 2]) for i in range(0, len(INDICATORS), 2)]
+
+
+class FakeSource:
+    """
+    _fetch_arrays falso: registra os lotes pedidos e responde com valores que identificam a rodada.
+
+    `outcome` diz o que acontece com cada lote (pelo primeiro código): "ok", "partial" (páginas
+    incompletas) ou "error" (exceção de rede).
+    """
+    def __init__(self):
+        self.round = 0
+        self.outcome = {}
+        self.calls = []
+
+    def __call__(self, batch, source, start_year, end_year, countries, country_index, indicator_index):
+        self.calls.append((batch[0], sorted(countries.values())))
+        outcome = self.outcome.get(batch[0], "ok")
+        if outcome == "error":
+            raise requests.ConnectionError("sem conexão")
+        rows = [
+            (country_index[iso3], indicator_index[code], year, value_of(self.round, name, code, year))
+            for name, iso3 in countries.items() for code in batch for year in range(start_year, end_year + 1)
+        ]
+        if outcome == "partial":
+            rows = rows[:len(rows) // 2]
+        country, indicator, year, value = (np.array(col) for col in zip(*rows))
+        return {"country": country, "indicator": indicator, "year": year, "value": value}, outcome == "ok"
+
+
+def value_of(round_, country, code, year):
+    return round_ * 1000 + list(COUNTRIES).index(country) * 100 + list(INDICATORS.values()).index(code) + year / 10000
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(series_cache, "SERIES_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        series_cache, "fetch_countries",
+        lambda region: pd.DataFrame({"country": list(COUNTRIES), "iso3": list(COUNTRIES.values())})
+    )
+    monkeypatch.setattr(series_cache, "indicator_batches", lambda: BATCHES)
+    fake = FakeSource()
+    # series_cache importa _fetch_arrays pelo nome: o patch é no próprio módulo
+    monkeypatch.setattr(series_cache, "_fetch_arrays", fake)
+    return fake
+
+
+def refresh(source, now):
+    source.round += 1
+    source.calls = []
+    return series_cache.refresh(start_year=START, end_year=END, now=now)
+
+
+def rounds(df):
+    """
+    Rodada de origem de cada série (país, código), lida dos valores.
+    """
+    result = {}
+    for label, code in INDICATORS.items():
+        for row in df[["country", "date", label]].dropna().itertuples():
+            assert row[3] == pytest.approx(value_of(int(row[3] // 1000), row.country, code, row.date.year))
+            result.setdefault((row.country, code), set()).add(int(row[3] // 1000))
+    return result
+
+
+def series_of(batch_codes):
+    return {(country, code) for country in COUNTRIES for code in batch_codes}
+
+
+def test_complete_then_fresh(source):
+    df = refresh(source, NOW)
+    assert len(source.calls) == len(BATCHES)
+    assert all(countries == sorted(COUNTRIES.values()) for _, countries in source.calls)
+    assert all(origin == {1} for origin in rounds(df).values())
+    assert series_cache.failed_series().empty
+    assert not series_cache.has_failures()
+
+    # Nada vencido: nenhuma requisição, mesmos valores
+    again = refresh(source, NOW + 10)
+    assert source.calls == []
+    pd.testing.assert_frame_equal(again, df)
+
+
+def test_failed_and_partial_batches_keep_last_values(source):
+    batches = [codes for _, codes in BATCHES]
+    assert len(batches) >= 3
+    refresh(source, NOW)
+
+    source.outcome = {batches[0][0]: "error", batches[1][0]: "partial"}
+    df = refresh(source, NOW + series_cache.MAX_AGE)
+    assert len(source.calls) == len(batches)
+    kept = series_of(batches[0]) | series_of(batches[1])
+    for key, origin in rounds(df).items():
+        assert origin == ({1} if key in kept else {2}), key
+
+    failed = series_cache.failed_series()
+    assert series_cache.has_failures()
+    assert set(zip(failed["country"], failed["indicator"])) == {(c, LABELS[code]) for c, code in kept}
+    # O horário exibido é o da última coleta bem-sucedida
+    assert (failed["fetched_at"] == pd.Timestamp(NOW, unit="s", tz="UTC")).all()
+
+    # Antes de vencer, só os lotes com falha são pedidos de novo
+    source.outcome = {}
+    df = refresh(source, NOW + series_cache.MAX_AGE + 60)
+    assert sorted(first for first, _ in source.calls) == sorted([batches[0][0], batches[1][0]])
+    for key, origin in rounds(df).items():
+        assert origin == ({3} if key in kept else {2}), key
+    assert series_cache.failed_series().empty
+
+
+def test_only_stale_countries_are_requested(source):
+    refresh(source, NOW)
+    COUNTRIES["Uruguay"] = "URY"
+    try:
+        df = refresh(source, NOW + 60)
+        assert len(source.calls) == len(BATCHES)
+        assert all(countries == ["URY"] for _, countries in source.calls)
+        origin = rounds(df)
+        assert all(origin[("Uruguay", code)] == {2} for code in INDICATORS.values())
+        assert all(origin[(c, code)] == {1} for c in ("Argentina", "Brazil", "Chile") for code in INDICATORS.values())
+    finally:
+        del COUNTRIES["Uruguay"]
+
+
+def test_country_list_unavailable_uses_cache(source, monkeypatch):
+    refresh(source, NOW)
+
+    def offline(region):
+        raise requests.ConnectionError("sem conexão")
+    monkeypatch.setattr(series_cache, "fetch_countries", offline)
+    df = refresh(source, NOW + series_cache.MAX_AGE)
+    assert sorted(df["country"].unique()) == sorted(COUNTRIES)
+    assert all(origin == {2} for origin in rounds(df).values())
+    assert series_cache.iso3_codes()["Chile"] == "CHL"
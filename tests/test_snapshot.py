@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import snapshot
+from benchmark_escala import _synthetic_data
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+
+
+class SlowFetch:
+    """
+    fetch() que avisa quando começou e só termina quando `release` é sinalizado.
+    """
+    def __init__(self, df):
+        self.df = df
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(10)
+        return self.df
+
+
+def start_refresh(fetch, results, max_age=0):
+    thread = threading.Thread(target=lambda: results.append(snapshot.refresh(fetch, max_age=max_age)))
+    thread.start()
+    return thread
+
+
+def test_overlapping_refresh_returns_published_version():
+    snapshot.publish(_synthetic_data(4, 10, seed=1))
+    old = snapshot.current_version()
+
+    slow = SlowFetch(_synthetic_data(4, 10, seed=2))
+    results = []
+    first = start_refresh(slow, results)
+    assert slow.started.wait(10)
+
+    # Enquanto a primeira coleta segura a trava, a segunda chamada volta na hora com a versão publicada
+    second = SlowFetch(_synthetic_data(4, 10, seed=3))
+    assert snapshot.refresh(second, max_age=0) == old
+    assert second.calls == 0
+
+    slow.release.set()
+    first.join(10)
+    assert slow.calls == 1
+    assert results[0][0] != old[0]
+    assert snapshot.current_version() == results[0]
+
+
+def test_overlapping_refresh_waits_without_version():
+    slow = SlowFetch(_synthetic_data(4, 10, seed=1))
+    results = []
+    first = start_refresh(slow, results)
+    assert slow.started.wait(10)
+
+    # Sem versão publicada não há o que servir: a segunda chamada espera e reaproveita a coleta da primeira
+    second = SlowFetch(_synthetic_data(4, 10, seed=2))
+    waiting = start_refresh(second, results, max_age=3600)
+    waiting.join(0.2)
+    assert waiting.is_alive()
+
+    slow.release.set()
+    first.join(10)
+    waiting.join(10)
+    assert slow.calls == 1
+    assert second.calls == 0
+    assert results[0] == results[1] == snapshot.current_version()
@@ -0,0 +1,165 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import vintages
+
+COUNTRIES = ["Argentina", "Brazil", "Chile"]
+INDICATORS = ["PIB", "Inflação"]
+YEARS = list(range(2015, 2021))
+START = 1_700_000_000
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(vintages, "VINTAGE_DIR", str(tmp_path))
+
+
+def wide(state):
+    """
+    DataFrame no formato da coleta (country, date, uma coluna por indicador) a partir de {célula: valor}.
+    """
+    rows = [{"country": c, "date": pd.Timestamp(year=y, month=1, day=1)} for c in COUNTRIES for y in YEARS]
+    df = pd.DataFrame(rows)
+    for indicator in INDICATORS:
+        df[indicator] = [state.get((c, indicator, y), np.nan) for c in COUNTRIES for y in YEARS]
+    return df
+
+
+def history(n, seed=0):
+    """
+    Estados sucessivos de uma fonte que revisa, remove e acrescenta células; alguns repetem o anterior.
+    """
+    rng = np.random.default_rng(seed)
+    cells = [(c, i, y) for c in COUNTRIES for i in INDICATORS for y in YEARS]
+    state = {cell: float(rng.integers(100)) for cell in cells if rng.random() < 0.8}
+    states = [dict(state)]
+    for step in range(1, n):
+        state = dict(state)
+        if step % 7 != 0:
+            for k in rng.choice(len(cells), 3, replace=False):
+                cell = cells[k]
+                if cell in state and rng.random() < 0.2:
+                    del state[cell]
+                else:
+                    state[cell] = float(rng.integers(100))
+        states.append(state)
+    return states
+
+
+def record_all(states, first=0):
+    """
+    Registra os estados a partir do índice `first`, uma coleta por minuto; retorna os instantes usados.
+    """
+    stamps = []
+    for k, state in enumerate(states[first:], start=first):
+        stamps.append(START + 60 * k)
+        vintages.record(wide(state), timestamp=stamps[-1])
+    return stamps
+
+
+def naive_as_of(states, when):
+    """
+    Estado esperado em `when`, repetindo as coletas em ordem (sem índice nem estados completos).
+    """
+    current = {}
+    for k, state in enumerate(states):
+        if START + 60 * k <= when:
+            current = state
+    return current
+
+
+def as_dict(frame):
+    return {(r.country, r.indicator, int(r.year)): float(r.value) for r in frame.itertuples()}
+
+
+def query_times(n):
+    # Antes da primeira coleta, exatamente em cada coleta e entre duas coletas
+    return [START - 1] + [START + 60 * k + offset for k in range(n) for offset in (0, 30)]
+
+
+def test_as_of_matches_naive_replay():
+    states = history(50)
+    record_all(states)
+    entries = vintages._index()
+    assert len(entries) > 2 * vintages.CHECKPOINT_EVERY
+    assert sum(entry["checkpoint"] for entry in entries) == len(entries) // vintages.CHECKPOINT_EVERY
+
+    for when in query_times(len(states)):
+        assert as_dict(vintages.as_of(when)) == naive_as_of(states, when), when
+
+
+def test_value_as_of_matches_naive_replay():
+    states = history(50, seed=1)
+    record_all(states)
+    checkpoints = [entry["stamp"] / 1000 for entry in vintages._index() if entry["checkpoint"]]
+    cells = [(c, i, y) for c in COUNTRIES for i in INDICATORS for y in YEARS]
+
+    # Antes, em cima e depois de cada estado completo, e nas pontas do histórico
+    times = [START - 1, START, START + 60 * (len(states) - 1)]
+    times += [stamp + offset for stamp in checkpoints for offset in (-30, 0, 30)]
+    for when in times:
+        expected = naive_as_of(states, when)
+        for cell in cells:
+            assert vintages.value_as_of(*cell, when) == expected.get(cell), (cell, when)
+
+
+def test_unchanged_collections_do_not_create_vintages():
+    states = history(15)
+    record_all(states)
+    changed = sum(1 for prev, cur in zip([{}] + states, states) if prev != cur)
+    assert len(vintages._index()) == changed
+    with open(os.path.join(vintages.VINTAGE_DIR, vintages._LOG), encoding="utf-8") as f:
+        assert len(f.readlines()) == len(states)
+
+
+def test_legacy_history_without_index():
+    states = history(45, seed=2)
+    # Histórico gravado antes do índice: só os arquivos de mudanças, sem estados completos
+    record_all(states[:15])
+    os.remove(os.path.join(vintages.VINTAGE_DIR, vintages._INDEX))
+    legacy = vintages._index()
+    assert len(legacy) == len(os.listdir(os.path.join(vintages.VINTAGE_DIR, vintages._CHANGES)))
+    assert not any(entry["checkpoint"] for entry in legacy)
+    for when in query_times(15):
+        assert as_dict(vintages.as_of(when)) == naive_as_of(states[:15], when)
+
+    # A próxima coleta grava o índice com as vintages antigas primeiro e a contagem dos estados completos continua
+    record_all(states, first=15)
+    entries = vintages._index()
+    assert [entry["stamp"] for entry in entries[:len(legacy)]] == [entry["stamp"] for entry in legacy]
+    assert [k + 1 for k, entry in enumerate(entries) if entry["checkpoint"]] == [
+        n for n in range(1, len(entries) + 1) if n % vintages.CHECKPOINT_EVERY == 0
+    ]
+    for when in query_times(len(states)):
+        assert as_dict(vintages.as_of(when)) == naive_as_of(states, when)
+
+
+def test_latest_revisions():
+    states = history(3, seed=3)
+    last = dict(states[-1])
+    existing = sorted(last)
+    last[existing[0]] += 1
+    del last[existing[1]]
+    new_cell = next(cell for cell in sorted(
+        (c, i, y) for c in COUNTRIES for i in INDICATORS for y in YEARS
+    ) if cell not in states[-1])
+    last[new_cell] = 5.0
+    record_all(states + [last])
+
+    revisions = vintages.latest_revisions()
+    revised = {(r.country, r.indicator, int(r.year)): (r.previous, r.value) for r in revisions.itertuples()}
+    assert revised[existing[0]] == (states[-1][existing[0]], states[-1][existing[0]] + 1)
+    assert revised[existing[1]][0] == states[-1][existing[1]] and np.isnan(revised[existing[1]][1])
+    # Células novas não são revisões
+    assert new_cell not in revised
+    assert set(revised) == {existing[0], existing[1]}
+
+
+def test_empty_history():
+    assert not vintages.has_history()
+    assert vintages.as_of(START).empty
+    assert vintages.value_as_of("Brazil", "PIB", 2020, START) is None
+    assert vintages.latest_revisions().empty
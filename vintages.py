@@ -0,0 +1,243 @@
+import bisect
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from data_api import region_dir
+
+# Diretório do histórico de coletas (pode ser sobrescrito por variável de ambiente), um subdiretório por região
+VINTAGE_DIR = region_dir(os.environ.get(
+    "DASHBOARD_VINTAGE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".vintages")
+))
+
+# A cada tantas vintages com mudanças, grava também o estado completo (ponto de partida das consultas)
+CHECKPOINT_EVERY = 20
+
+_LOG = "log.jsonl"
+_LATEST = "latest.npz"
+_CHANGES = "changes"
+_CHECKPOINTS = "checkpoints"
+_INDEX = "index.jsonl"
+
+_KEYS = ["country", "indicator", "year"]
+
+
+def _cells(df):
+    """
+    Converte o DataFrame largo (country, date, indicadores...) em células (país, indicador, ano, valor).
+    """
+    long_df = df.melt(id_vars=["country", "date"], var_name="indicator", value_name="value")
+    long_df = long_df.dropna(subset=["value"])
+    return pd.DataFrame({
+        "country": long_df["country"].astype(str).to_numpy(),
+        "indicator": long_df["indicator"].astype(str).to_numpy(),
+        "year": long_df["date"].dt.year.to_numpy(dtype=np.int32),
+        "value": long_df["value"].to_numpy(dtype=float),
+    })
+
+
+def _save(path, cells):
+    # Grava em temporário e troca com os.replace para que leitores nunca vejam arquivo pela metade
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp.npz"
+    # Colunas de texto viram arrays unicode de largura fixa (carregáveis sem pickle)
+    arrays = {
+        col: cells[col].to_numpy(dtype=str) if cells[col].dtype == object else cells[col].to_numpy()
+        for col in cells.columns
+    }
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _load(path):
+    with np.load(path, allow_pickle=False) as data:
+        return pd.DataFrame({key: data[key] for key in data.files})
+
+
+def _latest_state():
+    path = os.path.join(VINTAGE_DIR, _LATEST)
+    if not os.path.exists(path):
+        return pd.DataFrame({
+            "country": np.array([], dtype=str), "indicator": np.array([], dtype=str),
+            "year": np.array([], dtype=np.int32), "value": np.array([], dtype=float)
+        })
+    return _load(path)
+
+
+def has_history():
+    """
+    Se já existe alguma coleta registrada (a próxima será comparada com ela).
+    """
+    return os.path.exists(os.path.join(VINTAGE_DIR, _LATEST))
+
+
+def _scan_changes():
+    """
+    Vintages com mudanças listadas direto do diretório (históricos gravados antes do índice).
+    """
+    folder = os.path.join(VINTAGE_DIR, _CHANGES)
+    if not os.path.isdir(folder):
+        return []
+    stamps = sorted(int(name[:-4]) for name in os.listdir(folder) if name.endswith(".npz") and ".tmp" not in name)
+    return [{"stamp": stamp, "checkpoint": False} for stamp in stamps]
+
+
+def _index():
+    """
+    Vintages com mudanças em ordem cronológica: instante (ms) e se há estado completo gravado nela.
+    """
+    try:
+        with open(os.path.join(VINTAGE_DIR, _INDEX), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return _scan_changes()
+
+
+def _append_index(entries):
+    with open(os.path.join(VINTAGE_DIR, _INDEX), "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def record(df, timestamp=None):
+    """
+    Registra uma coleta como nova vintage, guardando só as células que mudaram desde a anterior.
+
+    Células novas têm previous = NaN; células que sumiram da fonte têm value = NaN.
+    Coletas sem mudança só acrescentam uma linha ao log. A cada CHECKPOINT_EVERY vintages com
+    mudanças, o estado completo fica gravado em checkpoints/ para limitar as consultas no tempo.
+
+    Retorna o DataFrame de mudanças (country, indicator, year, previous, value).
+    """
+    timestamp = time.time() if timestamp is None else timestamp
+    os.makedirs(os.path.join(VINTAGE_DIR, _CHANGES), exist_ok=True)
+
+    current = _cells(df)
+    previous = _latest_state()
+    merged = previous.merge(current, on=_KEYS, how="outer", suffixes=("_previous", ""))
+    changed = merged[~(
+        (merged["value_previous"] == merged["value"])
+        | (merged["value_previous"].isna() & merged["value"].isna())
+    )]
+    changes = pd.DataFrame({
+        "country": changed["country"].astype(str).to_numpy(),
+        "indicator": changed["indicator"].astype(str).to_numpy(),
+        "year": changed["year"].to_numpy(dtype=np.int32),
+        "previous": changed["value_previous"].to_numpy(dtype=float),
+        "value": changed["value"].to_numpy(dtype=float),
+    })
+
+    if not changes.empty:
+        stamp = int(timestamp * 1000)
+        index = _index()
+        if not os.path.exists(os.path.join(VINTAGE_DIR, _INDEX)) and index:
+            # Histórico anterior ao índice: as vintages já gravadas entram no índice primeiro
+            _append_index(index)
+        checkpoint = (len(index) + 1) % CHECKPOINT_EVERY == 0
+        _save(os.path.join(VINTAGE_DIR, _CHANGES, f"{stamp}.npz"), changes)
+        if checkpoint:
+            os.makedirs(os.path.join(VINTAGE_DIR, _CHECKPOINTS), exist_ok=True)
+            _save(os.path.join(VINTAGE_DIR, _CHECKPOINTS, f"{stamp}.npz"), current)
+        _save(os.path.join(VINTAGE_DIR, _LATEST), current)
+        _append_index([{"stamp": stamp, "checkpoint": checkpoint}])
+
+    with open(os.path.join(VINTAGE_DIR, _LOG), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": timestamp, "changes": len(changes)}) + "\n")
+    return changes
+
+
+def _change_files(since=None, until=None):
+    """
+    Lista (instante, caminho) das vintages com mudanças, em ordem cronológica.
+    """
+    entries = _index()
+    stamps = [entry["stamp"] / 1000 for entry in entries]
+    first = 0 if since is None else bisect.bisect_right(stamps, since)
+    last = len(entries) if until is None else bisect.bisect_right(stamps, until)
+    return [
+        (stamps[i], os.path.join(VINTAGE_DIR, _CHANGES, f"{entries[i]['stamp']}.npz"))
+        for i in range(first, last)
+    ]
+
+
+def _replay_from(when):
+    """
+    Ponto de partida para reconstruir o instante `when`: o caminho do último estado completo gravado
+    até `when` (ou None) e as vintages com mudanças posteriores a ele, em ordem cronológica.
+    """
+    entries = _index()
+    stamps = [entry["stamp"] / 1000 for entry in entries]
+    last = bisect.bisect_right(stamps, when)
+    first, checkpoint = 0, None
+    for i in range(last - 1, -1, -1):
+        if entries[i]["checkpoint"]:
+            first, checkpoint = i + 1, os.path.join(VINTAGE_DIR, _CHECKPOINTS, f"{entries[i]['stamp']}.npz")
+            break
+    files = [os.path.join(VINTAGE_DIR, _CHANGES, f"{entries[i]['stamp']}.npz") for i in range(first, last)]
+    return checkpoint, files
+
+
+def changes_since(since=None):
+    """
+    Mudanças registradas depois do instante `since` (padrão: só as da vintage com mudanças mais recente).
+
+    Retorna DataFrame com country, indicator, year, previous, value e vintage (instante da coleta).
+    """
+    files = _change_files(since=since)
+    if since is None:
+        files = files[-1:]
+    frames = [_load(path).assign(vintage=pd.to_datetime(stamp, unit="s")) for stamp, path in files]
+    if not frames:
+        return pd.DataFrame(columns=["country", "indicator", "year", "previous", "value", "vintage"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def latest_revisions():
+    """
+    Valores revisados (já existentes e alterados ou removidos) na vintage com mudanças mais recente.
+    """
+    changes = changes_since()
+    return changes[changes["previous"].notna()].reset_index(drop=True)
+
+
+def value_as_of(country, indicator, year, when):
+    """
+    Valor de uma célula como estava no instante `when` (None se ainda não existia ou tinha sido removida).
+
+    Percorre do fim para o começo só as vintages posteriores ao último estado completo até `when` e,
+    se nenhuma alterou a célula, lê o valor nesse estado completo.
+    """
+    checkpoint, files = _replay_from(when)
+    for path in reversed(files):
+        changes = _load(path)
+        hit = changes[
+            (changes["country"] == country) & (changes["indicator"] == indicator) & (changes["year"] == year)
+        ]
+        if not hit.empty:
+            value = hit["value"].iloc[0]
+            return None if np.isnan(value) else float(value)
+    if checkpoint is not None:
+        state = _load(checkpoint)
+        hit = state[(state["country"] == country) & (state["indicator"] == indicator) & (state["year"] == year)]
+        if not hit.empty:
+            return float(hit["value"].iloc[0])
+    return None
+
+
+def as_of(when):
+    """
+    Estado completo das células no instante `when`: o último estado completo gravado até `when`,
+    com as mudanças posteriores a ele aplicadas em ordem.
+    """
+    checkpoint, files = _replay_from(when)
+    frames = [_load(checkpoint)] if checkpoint is not None else []
+    frames += [_load(path)[_KEYS + ["value"]] for path in files]
+    if not frames:
+        return pd.DataFrame(columns=_KEYS + ["value"])
+    # Uma única concatenação; para cada célula vale a última mudança até `when`
+    state = pd.concat(frames, ignore_index=True).drop_duplicates(subset=_KEYS, keep="last")
+    return state.dropna(subset=["value"]).reset_index(drop=True)
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Estatísticas de janela (anos início..fim) das séries do cubo país × indicador × ano: média e desvio padrão
+# em tempo constante por somas acumuladas; mínimo e máximo direto na fatia das séries selecionadas.
+
+
+def prefix_sums(cube):
+    """
+    Somas acumuladas de cada série, ignorando NaN.
+
+    Os valores são centrados na média da série antes de somar os quadrados, para que a variância de
+    séries grandes (PIB em US$) não perca precisão na subtração.
+
+    Retorna:
+    array (4, países, indicadores, anos + 1): contagem, soma, soma dos quadrados (acumuladas) e o centro
+    de cada série (repetido no eixo dos anos)
+    """
+    present = ~np.isnan(cube)
+    n = present.sum(axis=-1)
+    center = np.where(present, cube, 0.0).sum(axis=-1) / np.maximum(n, 1)
+    shifted = np.where(present, cube - center[..., None], 0.0)
+    sums = np.zeros((4,) + cube.shape[:-1] + (cube.shape[-1] + 1,))
+    np.cumsum(present, axis=-1, out=sums[0, ..., 1:])
+    np.cumsum(shifted, axis=-1, out=sums[1, ..., 1:])
+    np.cumsum(shifted * shifted, axis=-1, out=sums[2, ..., 1:])
+    sums[3] = center[..., None]
+    return sums
+
+
+def window(sums, cube, country_idx, indicator_idx, start, end):
+    """
+    Estatísticas das séries selecionadas entre as posições de ano start e end (inclusive).
+
+    country_idx e indicator_idx podem ser inteiros ou arrays de mesmo formato. Contagem, média e desvio
+    não dependem do tamanho da janela; mínimo e máximo percorrem só os anos da janela das séries
+    selecionadas (no máximo algumas dezenas de valores por série), sem tabelas extras por versão.
+
+    Retorna:
+    dict com count, mean, std (amostral, como o describe() do pandas), min e max (NaN sem dados)
+    """
+    count = sums[0, country_idx, indicator_idx, end + 1] - sums[0, country_idx, indicator_idx, start]
+    total = sums[1, country_idx, indicator_idx, end + 1] - sums[1, country_idx, indicator_idx, start]
+    squares = sums[2, country_idx, indicator_idx, end + 1] - sums[2, country_idx, indicator_idx, start]
+    center = sums[3, country_idx, indicator_idx, 0]
+
+    # fmin/fmax ignoram NaN (e dão NaN só em janelas sem nenhum dado) sem o aviso de np.nanmin
+    values = np.asarray(cube[country_idx, indicator_idx, start:end + 1], dtype=float)
+    low = np.fmin.reduce(values, axis=-1, initial=np.nan)
+    high = np.fmax.reduce(values, axis=-1, initial=np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        variance = (squares - total * mean) / (count - 1)
+    return {
+        "count": count.astype(int) if isinstance(count, np.ndarray) else int(count),
+        "mean": np.where(count > 0, mean + center, np.nan),
+        "std": np.where(count > 1, np.sqrt(np.maximum(variance, 0.0)), np.nan),
+        "min": np.where(count > 0, low, np.nan),
+        "max": np.where(count > 0, high, np.nan),
+    }